@@ -0,0 +1,252 @@
+# batch.py
+"""
+Compile many KJPL programs in parallel.
+
+    python batch.py [-j N] [-O LEVEL] [--lexer fast] [--parser ply] [--cache-dir DIR] [--out-dir DIR] FILE...
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import compiler
+from cache import CompilationCache
+
+# -------------------------------------
+# Results
+# -------------------------------------
+# c_code is None when the unit failed; error and error_type then describe why
+UnitResult = namedtuple("UnitResult", ["unit", "c_code", "error", "error_type", "source_bytes", "seconds"])
+
+
+class BatchResult:
+    """
+    Per-unit results in submission order plus aggregate throughput.
+    """
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed = elapsed  # Wall-clock seconds for the whole batch
+
+    @property
+    def failures(self):
+        return [result for result in self.results if result.c_code is None]
+
+    @property
+    def source_bytes(self):
+        return sum(result.source_bytes for result in self.results)
+
+    @property
+    def files_per_second(self):
+        return len(self.results) / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.source_bytes / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return (
+            f"Compiled {len(self.results)} units ({len(self.failures)} failed) in {self.elapsed:.2f} s: "
+            f"{self.files_per_second:.1f} files/s, {self.bytes_per_second / 1e6:.2f} MB/s"
+        )
+
+
+# -------------------------------------
+# Batch API
+# -------------------------------------
+# Source text to compile as a unit; name stands for it in the UnitResult
+Source = namedtuple("Source", ["text", "name"], defaults=(None,))
+
+
+def compile_many(units, workers=None, opt_level=0, lexer_backend="ply", cache_dir=None, chunksize=None,
+                 parser_backend="ply"):
+    """
+    Compile every unit and return a BatchResult.
+
+    A unit is the path of a KJPL file (str or os.PathLike) or a Source
+    holding KJPL text. Units are spread over `workers` processes (default:
+    one per CPU); each worker loads the PLY tables and builds its compiler
+    once, then compiles its share of the units. Files are read inside the
+    workers. With workers=1 everything runs in this process.
+
+    Compilation errors, including unreadable files, are captured per unit
+    rather than raised. With cache_dir, the workers share an on-disk
+    compilation cache.
+    """
+    units = list(units)
+    workers = workers or os.cpu_count() or 1
+    options = {
+        "opt_level": opt_level, "lexer_backend": lexer_backend, "parser_backend": parser_backend,
+        "cache_dir": cache_dir,
+    }
+
+    start = time.perf_counter()
+    if workers == 1 or len(units) <= 1:
+        with _quiet_compiler_logging():  # As in the workers, for this batch only
+            results = [_compile_unit(unit, options) for unit in units]
+    else:
+        if chunksize is None:
+            # A few chunks per worker balances load without a round trip per unit
+            chunksize = max(1, len(units) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(options,)) as pool:
+            results = list(pool.map(_compile_unit, units, itertools.repeat(options), chunksize=chunksize))
+    return BatchResult(results, time.perf_counter() - start)
+
+
+def compile_source(source, options=None, unit=None):
+    """
+    Compile KJPL source text in this process and return its UnitResult,
+    with errors captured in it. options holds compile_many's compiler
+    options (opt_level, lexer_backend, parser_backend, cache_dir); missing
+    ones take compile_many's defaults. The compiler for a set of options
+    is built once per process and shared by its threads.
+    """
+    start = time.perf_counter()
+    return _compile_text(_compiler_for(options or {}), source, unit, start)
+
+
+def warm_up(options=None):
+    """
+    Build this process's compiler for options and run the pipeline once,
+    so the first real unit does not pay for table loading or lazy setup.
+    """
+    options = options or {}
+    _compiler_for(options)
+    compiler.KJPLCompiler(
+        lexer_backend=options.get("lexer_backend", "ply"), opt_level=options.get("opt_level", 0),
+        parser_backend=options.get("parser_backend", "ply"),
+    ).compile(_WARMUP_SOURCE)
+
+
+# -------------------------------------
+# Worker Side
+# -------------------------------------
+_compilers = {}  # Options -> this process's KJPLCompiler for them
+
+# Warm-up program touching every pipeline stage
+_WARMUP_SOURCE = "x = 1; while (x < 2) { x = x + 1; } if (x == 2) { print(x); }"
+
+
+def init_worker(options):
+    """
+    Initializer for pool processes that compile with compile_source():
+    quiets the compiler's per-stage logging and warms up.
+    """
+    compiler.logger.setLevel(logging.WARNING)  # Per-stage INFO lines would dominate a batch
+    warm_up(options)
+
+
+class _QuietThreadFilter(logging.Filter):
+    """
+    Drops records below WARNING that one thread logs, leaving other
+    threads' records alone.
+    """
+
+    def __init__(self, thread):
+        super().__init__()
+        self.thread = thread
+
+    def filter(self, record):
+        return record.thread != self.thread or record.levelno >= logging.WARNING
+
+
+@contextmanager
+def _quiet_compiler_logging():
+    """
+    Quiet the compiler's per-stage logging for the calling thread only; the
+    logger's level is shared, so changing it would race with other threads.
+    """
+    quiet = _QuietThreadFilter(threading.get_ident())
+    compiler.logger.addFilter(quiet)
+    try:
+        yield
+    finally:
+        compiler.logger.removeFilter(quiet)
+
+
+def _compiler_for(options):
+    key = tuple(sorted(options.items()))
+    kjpl_compiler = _compilers.get(key)
+    if kjpl_compiler is None:
+        cache_dir = options.get("cache_dir")
+        kjpl_compiler = _compilers.setdefault(key, compiler.KJPLCompiler(
+            cache=CompilationCache(cache_dir=cache_dir) if cache_dir else None,
+            lexer_backend=options.get("lexer_backend", "ply"), opt_level=options.get("opt_level", 0),
+            parser_backend=options.get("parser_backend", "ply"),
+        ))
+    return kjpl_compiler
+
+
+def _compile_unit(unit, options):
+    start = time.perf_counter()
+    if isinstance(unit, Source):
+        return _compile_text(_compiler_for(options), unit.text, unit.name, start)
+    try:
+        with open(unit, "r", encoding="utf-8") as f:
+            source = f.read()
+    except Exception as e:
+        return UnitResult(unit, None, str(e), type(e).__name__, 0, time.perf_counter() - start)
+    return _compile_text(_compiler_for(options), source, unit, start)
+
+
+def _compile_text(kjpl_compiler, source, unit, start):
+    source_bytes = len(source.encode("utf-8", "replace"))
+    try:
+        c_code = kjpl_compiler.compile(source)
+    except Exception as e:
+        return UnitResult(unit, None, str(e), type(e).__name__, source_bytes, time.perf_counter() - start)
+    return UnitResult(unit, c_code, None, None, source_bytes, time.perf_counter() - start)
+
+
+# -------------------------------------
+# Command Line
+# -------------------------------------
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("files", nargs="+", help="KJPL source files")
+    arg_parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    arg_parser.add_argument("-O", "--opt-level", type=int, default=0, choices=compiler.KJPLCompiler.OPT_LEVELS)
+    arg_parser.add_argument("--lexer", default="ply", choices=compiler.KJPLCompiler.LEXER_BACKENDS)
+    arg_parser.add_argument("--parser", default="rd", choices=compiler.KJPLCompiler.PARSER_BACKENDS)
+    arg_parser.add_argument("--cache-dir", default=None, help="on-disk compilation cache shared by the workers")
+    arg_parser.add_argument("--out-dir", default=None, help="write NAME.c here instead of next to each source")
+    args = arg_parser.parse_args(argv)
+
+    # Refuse inputs that would overwrite each other's output before compiling any
+    outputs = {unit: _output_path(unit, args.out_dir) for unit in args.files}
+    counts = Counter(os.path.normcase(os.path.abspath(path)) for path in outputs.values())
+    clashes = [unit for unit, path in outputs.items() if counts[os.path.normcase(os.path.abspath(path))] > 1]
+    if clashes:
+        arg_parser.error(f"these inputs would write the same output file: {' '.join(clashes)}")
+
+    batch = compile_many(
+        args.files, workers=args.workers, opt_level=args.opt_level,
+        lexer_backend=args.lexer, cache_dir=args.cache_dir, parser_backend=args.parser,
+    )
+
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+    for result in batch.results:
+        if result.c_code is None:
+            print(f"{result.unit}: {result.error_type}: {result.error}", file=sys.stderr)
+            continue
+        with open(outputs[result.unit], "w", encoding="utf-8") as f:
+            f.write(result.c_code)
+
+    print(batch.summary(), file=sys.stderr)
+    return 1 if batch.failures else 0
+
+
+def _output_path(unit, out_dir):
+    stem = os.path.splitext(os.path.basename(unit))[0]
+    return os.path.join(out_dir or os.path.dirname(unit), stem + ".c")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
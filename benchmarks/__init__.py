@@ -0,0 +1,6 @@
+# benchmarks/__init__.py
+"""
+Performance benchmarks for the KJPL compiler.
+
+Run from the repository root, e.g. `python -m benchmarks.startup`.
+"""
@@ -0,0 +1,87 @@
+# benchmarks/ast_memory.py
+"""
+AST memory benchmark: parse a large synthetic program and report node count
+and bytes for the slotted ast_nodes tree, next to an equivalent tree of plain
+__dict__-based objects.
+
+    python -m benchmarks.ast_memory [--statements N]
+"""
+import argparse
+import tracemalloc
+
+import fastlexer
+from parser import parser, ast_nodes
+
+SNIPPET = """\
+total = total + value * 3 - (limit / 2);
+if (total >= {i}) {{ print(total); }} else {{ total = {i}; }}
+while (count != {i}) {{ count = count + 1; }}
+"""
+
+
+def _plain_init(self, fields):
+    for field, value in fields:
+        setattr(self, field, value)
+
+# Stand-ins for the previous node classes: same fields, stored in __dict__
+PLAIN_CLASSES = {cls: type(cls.__name__, (), {"__init__": _plain_init}) for cls in ast_nodes.KINDS}
+
+
+def make_source(statements):
+    return "".join(SNIPPET.format(i=i) for i in range(statements))
+
+
+def count_nodes(node):
+    if isinstance(node, list):
+        return sum(count_nodes(item) for item in node)
+    if not isinstance(node, ast_nodes.Node):
+        return 0
+    return 1 + sum(count_nodes(getattr(node, field)) for field in node._fields)
+
+
+def to_plain(node):
+    if isinstance(node, list):
+        return [to_plain(item) for item in node]
+    if not isinstance(node, ast_nodes.Node):
+        return node
+    fields = [(field, to_plain(getattr(node, field))) for field in node._fields]
+    fields.append(("lineno", node.lineno))
+    return PLAIN_CLASSES[type(node)](fields)
+
+
+def measure(build):
+    """
+    Return (result, bytes still allocated by build()).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--statements", type=int, default=20000)
+    args = arg_parser.parse_args()
+
+    source = make_source(args.statements)
+    tokens = list(fastlexer.tokenize(source))
+
+    def parse():
+        token_iter = iter(tokens)
+        return parser.parse(tokenfunc=lambda: next(token_iter, None))
+
+    ast, slotted_bytes = measure(parse)
+    nodes = count_nodes(ast)
+    _, plain_bytes = measure(lambda: to_plain(ast))
+
+    print(f"nodes: {nodes} ({len(source)} bytes of source)")
+    for name, size in (("__slots__", slotted_bytes), ("__dict__", plain_bytes)):
+        print(f"{name:>10}: {size / 1e6:8.2f} MB, {size / nodes:6.1f} bytes/node")
+    print(f"   saving: {1 - slotted_bytes / plain_bytes:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/concurrency.py
+"""
+Concurrency stress test: compile a corpus of KJPL programs from many threads
+through one shared compiler and check every result (C code or error) against
+a serial compilation of the same program.
+
+    python -m benchmarks.concurrency [--threads N] [--programs N] [--rounds N]
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import CompilationCache
+from compiler import KJPLCompiler
+
+
+def make_program(rng, index):
+    """
+    Build a small program whose output depends on index. Every fifth one
+    has a semantic error, so error messages are checked for bleed as well.
+    """
+    names = [f"v{index}_{n}" for n in range(rng.randint(2, 6))]
+    lines = [f"{names[0]} = {index};"]
+    for position, name in enumerate(names[1:], 1):
+        operand = rng.choice(names[:position])
+        lines.append(f"{name} = {operand} * {rng.randint(1, 9)} + {rng.randint(0, 99)};")
+    counter = names[-1]
+    lines.append(f"while ({counter} < {index + 200}) {{ {counter} = {counter} + {rng.randint(1, 7)}; }}")
+    lines.append(f"if ({names[0]} > {rng.randint(0, 50)}) {{ s{index} = \"big\"; }} else {{ s{index} = \"small\"; }}")
+    lines.append(f"print(s{index});")
+    lines.append(f"f{index} = {index}.5; print(f{index} * 2.0);")
+    if index % 5 == 4:
+        lines.append(f"bad = {names[0]} + s{index};")
+    lines.append(f"print({counter});")
+    return "\n".join(lines)
+
+
+def outcome(compiler, source):
+    try:
+        return compiler.compile(source)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def stress(compiler, corpus, expected, threads, rounds, seed):
+    """
+    Compile the corpus `rounds` times, each round in a different order,
+    from `threads` threads. Return the number of mismatches and the time.
+    """
+    rng = random.Random(seed)
+    jobs = [index for _ in range(rounds) for index in rng.sample(range(len(corpus)), len(corpus))]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda index: outcome(compiler, corpus[index]), jobs))
+    elapsed = time.perf_counter() - start
+    mismatches = sum(result != expected[index] for index, result in zip(jobs, results))
+    return mismatches, len(jobs), elapsed
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--threads", type=int, default=8)
+    arg_parser.add_argument("--programs", type=int, default=200)
+    arg_parser.add_argument("--rounds", type=int, default=3)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.ERROR)  # Expected failures are logged too
+    sys.setswitchinterval(1e-5)  # Switch threads often to provoke interleavings
+
+    rng = random.Random(args.seed)
+    corpus = [make_program(rng, index) for index in range(args.programs)]
+
+    failed = False
+    for opt_level in KJPLCompiler.OPT_LEVELS:
+        for lexer_backend in KJPLCompiler.LEXER_BACKENDS:
+            serial = KJPLCompiler(lexer_backend=lexer_backend, opt_level=opt_level)
+            expected = [outcome(serial, source) for source in corpus]
+            configurations = {
+                "fresh": lambda: KJPLCompiler(lexer_backend=lexer_backend, opt_level=opt_level),
+                "pooled": lambda: KJPLCompiler(lexer_backend=lexer_backend, opt_level=opt_level, pooled=True),
+                "pooled + caches": lambda: KJPLCompiler(
+                    cache=CompilationCache(max_memory_entries=args.programs // 2),
+                    stage_cache=CompilationCache(max_memory_entries=args.programs),
+                    lexer_backend=lexer_backend, opt_level=opt_level, pooled=True,
+                ),
+            }
+            for name, make_compiler in configurations.items():
+                mismatches, jobs, elapsed = stress(
+                    make_compiler(), corpus, expected, args.threads, args.rounds, args.seed,
+                )
+                failed = failed or mismatches > 0
+                print(
+                    f"opt {opt_level} {lexer_backend:<4} {name:<16} {jobs} compiles in {elapsed:6.2f} s "
+                    f"({jobs / elapsed:7.1f}/s), {mismatches} mismatches"
+                )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
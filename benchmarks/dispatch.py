@@ -0,0 +1,83 @@
+# benchmarks/dispatch.py
+"""
+Visitor dispatch micro-benchmark: generate C for a ~100k-node AST with the
+per-kind dispatch table and with the previous getattr-per-node dispatch.
+
+    python -m benchmarks.dispatch [--nodes N] [--runs N]
+"""
+import argparse
+import time
+
+from codegen import CodeGenerator
+from parser import ast_nodes
+from semantic import SemanticAnalyzer
+
+
+class ReflectiveCodeGenerator(CodeGenerator):
+    """
+    CodeGenerator with the old dispatch: build the method name and getattr it.
+    """
+    def visit(self, node):
+        method_name = f'visit_{type(node).__name__}'
+        method = getattr(self, method_name, self.generic_visit)
+        return method(node)
+
+
+def balanced_expression(depth, counter):
+    """
+    Build a balanced +/* tree of 2**depth leaves; counter[0] tracks nodes.
+    """
+    counter[0] += 1
+    if depth == 0:
+        return ast_nodes.NumberNode(value=counter[0] % 100)
+    operator = "+" if depth % 2 else "*"
+    return ast_nodes.BinaryOpNode(
+        left=balanced_expression(depth - 1, counter),
+        operator=operator,
+        right=balanced_expression(depth - 1, counter),
+    )
+
+
+def make_program(nodes):
+    counter = [1]  # The ProgramNode
+    statements = []
+    while counter[0] < nodes:
+        counter[0] += 2  # AssignmentNode and its IdentifierNode
+        statements.append(ast_nodes.AssignmentNode(
+            identifier=ast_nodes.IdentifierNode(name=f"v{len(statements)}"),
+            expression=balanced_expression(6, counter),
+        ))
+    return ast_nodes.ProgramNode(statements=statements), counter[0]
+
+
+def best_of(func, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--nodes", type=int, default=100_000)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    program, nodes = make_program(args.nodes)
+    results = {
+        "codegen (getattr)": best_of(lambda: ReflectiveCodeGenerator().generate(program), args.runs),
+        "codegen (table)": best_of(lambda: CodeGenerator().generate(program), args.runs),
+        "semantic (table)": best_of(lambda: SemanticAnalyzer().analyze(program), args.runs),
+    }
+
+    print(f"nodes: {nodes}")
+    for name, seconds in results.items():
+        print(f"{name:>18}: {seconds * 1000:8.1f} ms, {seconds / nodes * 1e9:6.0f} ns/node")
+    speedup = results["codegen (getattr)"] / results["codegen (table)"]
+    print(f"{'codegen speedup':>18}: {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
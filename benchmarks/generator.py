@@ -0,0 +1,194 @@
+# benchmarks/generator.py
+"""
+Synthetic KJPL program generator for the benchmarks.
+
+    python -m benchmarks.generator [--shape NAME] [--size N] [--seed N] > program.kjpl
+
+Every shape produces a program that compiles without errors, with loops
+that terminate, so the output can also be built and run. `size` is the
+approximate number of top-level statements.
+"""
+import argparse
+import random
+import string
+
+# Tunables of the individual shapes
+CHAIN_LENGTH = 200        # Operands per expression in "expressions"
+NESTING_DEPTH = 24        # Block depth in "nested"
+STRING_LENGTH = 4096      # Characters per literal in "strings"
+COMMENT_LINES = 4         # Comment lines per statement in "comments"
+VARIABLES = 64            # Distinct variables a program cycles through
+
+OPERATORS = ("+", "-", "*")
+COMPARISONS = ("<", ">", "==", "!=", "<=", ">=")
+
+
+def _declarations():
+    """
+    Give every variable a value first so later statements can read any of them.
+    """
+    return [f"v{index} = {index};" for index in range(VARIABLES)]
+
+
+def _operand(rng):
+    if rng.random() < 0.5:
+        return f"v{rng.randrange(VARIABLES)}"
+    return str(rng.randint(1, 99))
+
+
+def _expression(rng, operands):
+    """
+    An int expression of `operands` leaves. Division only by nonzero literals.
+    """
+    parts = [_operand(rng)]
+    for _ in range(operands - 1):
+        if rng.random() < 0.15:
+            parts.append(f"/ {rng.randint(1, 9)}")
+        else:
+            parts.append(f"{rng.choice(OPERATORS)} {_operand(rng)}")
+        if rng.random() < 0.05:
+            parts = ["(" + " ".join(parts) + ")"]
+    return " ".join(parts)
+
+
+def _condition(rng):
+    return f"{_operand(rng)} {rng.choice(COMPARISONS)} {_operand(rng)}"
+
+
+def _assignment(rng):
+    return f"v{rng.randrange(VARIABLES)} = {_expression(rng, rng.randint(1, 4))};"
+
+
+# --------------------------
+# Shapes
+# --------------------------
+def assignments(rng, size):
+    """
+    Many short assignments and prints.
+    """
+    lines = _declarations()
+    for _ in range(size):
+        if rng.random() < 0.1:
+            lines.append(f"print(v{rng.randrange(VARIABLES)});")
+        else:
+            lines.append(_assignment(rng))
+    return lines
+
+
+def expressions(rng, size):
+    """
+    Long left-leaning expression chains.
+    """
+    lines = _declarations()
+    for _ in range(size):
+        lines.append(f"v{rng.randrange(VARIABLES)} = {_expression(rng, CHAIN_LENGTH)};")
+    return lines
+
+
+def nested(rng, size):
+    """
+    Deeply nested if/else and single-pass while blocks.
+    """
+    lines = _declarations()
+    counter = 0
+    while len(lines) < size + VARIABLES:
+        opened = []
+        for depth in range(NESTING_DEPTH):
+            indent = "    " * depth
+            if rng.random() < 0.5:
+                lines.append(f"{indent}if ({_condition(rng)}) {{")
+                opened.append(("if", indent))
+            else:
+                # Runs exactly once, so even deep nests finish instantly
+                name = f"w{counter}"
+                counter += 1
+                lines.append(f"{indent}{name} = 0;")
+                lines.append(f"{indent}while ({name} < 1) {{")
+                lines.append(f"{indent}    {name} = {name} + 1;")
+                opened.append(("while", indent))
+            lines.append(f"{indent}    {_assignment(rng)}")
+        for kind, indent in reversed(opened):
+            if kind == "if" and rng.random() < 0.5:
+                lines.append(f"{indent}}} else {{")
+                lines.append(f"{indent}    {_assignment(rng)}")
+            lines.append(f"{indent}}}")
+    return lines
+
+
+def strings(rng, size):
+    """
+    Huge string literals, assigned, compared and printed.
+    """
+    alphabet = string.ascii_letters + string.digits + " .,;:!?-"
+    lines = _declarations()
+    for index in range(size // 3 + 1):
+        text = "".join(rng.choice(alphabet) for _ in range(STRING_LENGTH))
+        cut = rng.randrange(STRING_LENGTH)
+        text = text[:cut] + '\\"' + text[cut:]  # An escaped quote somewhere inside
+        lines.append(f's{index} = "{text}";')
+        lines.append(f"if (s{index} != s{max(0, index - 1)}) {{ print(s{index}); }}")
+        lines.append(_assignment(rng))
+    return lines
+
+
+def comments(rng, size):
+    """
+    Statements buried in line and block comments.
+    """
+    words = ("the", "loop", "counter", "total", "value", "checks", "bound", "note", "todo", "result")
+    lines = _declarations()
+    for index in range(size):
+        for line in range(COMMENT_LINES):
+            text = " ".join(rng.choice(words) for _ in range(rng.randint(4, 12)))
+            if line % 2:
+                lines.append(f"/* {text}\n   {text} */")
+            else:
+                lines.append(f"// {text}")
+        lines.append(_assignment(rng))
+    return lines
+
+
+def mixed(rng, size):
+    """
+    A blend of every other shape.
+    """
+    parts = [shape for name, shape in SHAPES.items() if name != "mixed"]
+    lines = _declarations()
+    share = max(1, size // len(parts))
+    for shape in parts:
+        lines += shape(rng, share)[VARIABLES:]
+    return lines
+
+
+SHAPES = {
+    "assignments": assignments,
+    "expressions": expressions,
+    "nested": nested,
+    "strings": strings,
+    "comments": comments,
+    "mixed": mixed,
+}
+
+
+def generate(shape, size, seed=0):
+    """
+    Return the source of a synthetic program of the given shape.
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape '{shape}'. Expected one of {tuple(SHAPES)}.")
+    lines = SHAPES[shape](random.Random(seed), size)
+    lines += [f"print(v{index});" for index in range(4)]  # Make the result observable
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--shape", default="mixed", choices=SHAPES)
+    arg_parser.add_argument("--size", type=int, default=1000)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+    print(generate(args.shape, args.size, args.seed), end="")
+
+
+if __name__ == "__main__":
+    main()
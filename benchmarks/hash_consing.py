@@ -0,0 +1,99 @@
+# benchmarks/hash_consing.py
+"""
+Hash-consing benchmark: parse machine-generated programs that repeat the
+same subexpressions, as a tree and as a hash-consed DAG, and compare AST
+memory and the time of the stages that memoize per shared node.
+
+    python -m benchmarks.hash_consing [--statements N] [--distinct N] [--runs N]
+"""
+import argparse
+import logging
+import random
+import tracemalloc
+
+import fastlexer
+import rdparser
+from benchmarks.generator import VARIABLES, _declarations, _expression
+from compiler import KJPLCompiler
+from metrics import CompilationMetrics
+from parser import ExpressionInterner, ast_nodes
+from visitor import count_nodes
+
+STAGES = ("syntax", "semantic", "codegen")
+
+
+def make_source(statements, distinct, seed=0):
+    """
+    A program whose statements draw their expressions from `distinct`
+    generated ones, the way templated or unrolled code repeats itself.
+    """
+    rng = random.Random(seed)
+    expressions = [_expression(rng, rng.randint(4, 24)) for _ in range(distinct)]
+    lines = _declarations()
+    for index in range(statements):
+        expression = rng.choice(expressions)
+        if index % 4 == 3:
+            lines.append(f"if ({expression} > {rng.choice(expressions)}) {{ print({expression}); }}")
+        else:
+            lines.append(f"v{rng.randrange(VARIABLES)} = {expression};")
+    return "\n".join(lines) + "\n"
+
+
+def ast_bytes(tokens, node_factory):
+    """
+    Return (AST, bytes it holds): the interner itself is dropped after the
+    parse, as the compiler drops it.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ast = rdparser.parse(tokens, node_factory)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return ast, after - before
+
+
+def stage_times(source, intern_expressions, runs):
+    """
+    Return the C code and the best time of each stage over `runs` compiles.
+    """
+    kjpl_compiler = KJPLCompiler(lexer_backend="fast", parser_backend="rd", intern_expressions=intern_expressions)
+    best = dict.fromkeys(STAGES, float("inf"))
+    for _ in range(runs):
+        metrics = CompilationMetrics()
+        c_code = kjpl_compiler.compile(source, metrics=metrics)
+        for stage in STAGES:
+            best[stage] = min(best[stage], metrics.stages[stage].wall_time)
+    return c_code, best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--statements", type=int, default=20000)
+    arg_parser.add_argument("--distinct", type=int, default=50)
+    arg_parser.add_argument("--runs", type=int, default=3)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    source = make_source(args.statements, args.distinct)
+    tokens = list(fastlexer.tokenize(source))
+    tree, tree_bytes = ast_bytes(tokens, ast_nodes)
+    interner = ExpressionInterner()
+    _, dag_bytes = ast_bytes(tokens, interner)
+    print(f"{count_nodes(tree)} nodes in the tree, {len(interner.table)} distinct expression nodes "
+          f"({interner.requests} requested, {len(interner.shared)} shared)")
+    print(f"      tree: {tree_bytes / 1e6:8.2f} MB")
+    print(f"       dag: {dag_bytes / 1e6:8.2f} MB  ({1 - dag_bytes / tree_bytes:.0%} less)")
+
+    plain_code, plain = stage_times(source, False, args.runs)
+    interned_code, interned = stage_times(source, True, args.runs)
+    if plain_code != interned_code:
+        raise SystemExit("Hash-consed compilation generated different C")
+    print(f"{'stage':<10}{'tree':>10}{'dag':>10}{'speedup':>9}")
+    for stage in STAGES:
+        print(f"{stage:<10}{plain[stage] * 1000:>10.1f}{interned[stage] * 1000:>10.1f}"
+              f"{plain[stage] / interned[stage]:>8.2f}x")
+    print("times in ms, best of --runs; the C code is identical")
+
+
+if __name__ == "__main__":
+    main()
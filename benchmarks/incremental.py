@@ -0,0 +1,202 @@
+# benchmarks/incremental.py
+"""
+Incremental compilation benchmark: check that a CompilationSession agrees
+with a full compilation after every edit of random edit scripts, then
+compare the latency of compile-as-you-type edits with that of compiling
+the whole document, as the document grows.
+
+    python -m benchmarks.incremental [--sizes 1000,10000,100000] [--scripts N] [--edits N] [--error-scripts N]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import random
+import re
+import statistics
+import time
+
+import fastlexer
+import rdparser
+from benchmarks.generator import generate
+from compiler import KJPLCompiler
+from incremental import CompilationSession
+from parser import dump_ast
+
+# Fragments random edits insert, many of them unbalanced on purpose
+SNIPPETS = [
+    "x = 1;", "v1 = v2 + 3;\n", "print(v3);", "}", "{", "if (v1 < v2) { ", "else { v5 = 2; }",
+    "/*", "*/", "// note\n", "\n", " ", "(", ")", ";", "+ 4", "= ", "true", "1.5", "v0",
+    "while (v9 > 100) { v9 = v9 - 1; }", 's = "hi";', '"',
+]
+
+TYPED = "v7 = v7 * 2 + (v3 - 1);\n"
+
+# Lines random edits insert into generated programs
+TYPING_LINES = ("print(v1);\n", "v2 = v2 + 1;\n", "if (v3 > 4) { v3 = 4; }\n")
+
+# Statements of the documents with semantic errors: variables read before
+# they are assigned, assigned values of different types, and so on
+ERROR_LINES = [
+    "s = b;\n", "print(s);\n", "b = 1;\n", 'b = "text";\n', "c = b + 1;\n", "if (b > 1) { d = b; }\n",
+    "print(d);\n", "while (c < 3) { c = c + 1; }\n", "e = 1.5;\n", "f = e / 5;\n", "print(f);\n",
+    "g = true;\n", "if (g == b) { print(g); }\n", "if (1 > 2) { h = 1; } print(h);\n",
+]
+
+
+def random_edit(rng, text, lines=TYPING_LINES):
+    """
+    Return an (offset, length, replacement) edit of text: mostly the edits
+    of someone typing (changing literals, inserting one of lines, deleting
+    lines), sometimes arbitrary damage.
+    """
+    choice = rng.random()
+    if choice < 0.3:
+        numbers = [m.span() for m in re.finditer(r"\b\d+\b", text)]
+        if numbers:
+            start, end = rng.choice(numbers)
+            return start, end - start, str(rng.randint(0, 999))
+    if choice < 0.5:
+        line_ends = [m.end() for m in re.finditer(r"\n", text)]
+        if line_ends:
+            return rng.choice(line_ends), 0, rng.choice(lines)
+    if choice < 0.6:
+        spans = [m.span() for m in re.finditer(r"[^\n{}]*;\n", text)]  # Lines without braces
+        if spans:
+            start, end = rng.choice(spans)
+            return start, end - start, ""
+    offset = rng.randrange(len(text) + 1)
+    length = min(rng.randrange(20), len(text) - offset) if rng.random() < 0.5 else 0
+    return offset, length, rng.choice(SNIPPETS) if rng.random() < 0.8 else ""
+
+
+def outcome(function, *args):
+    with contextlib.redirect_stdout(io.StringIO()):  # Illegal characters are reported on stdout
+        try:
+            return function(*args)
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+
+
+def validate(scripts, edits, seed, errors=False):
+    """
+    Run random edit scripts at every supported opt level, comparing the
+    session with a full compilation after each edit. Returns the number of
+    edits checked and how many of them left a program that compiles.
+
+    The documents are generated programs, or with errors, ERROR_LINES in
+    random order, edited mostly by inserting more of them.
+    """
+    checked = compiled = 0
+    for script in range(scripts):
+        for opt_level in CompilationSession.OPT_LEVELS:
+            rng = random.Random(seed + script)
+            full = KJPLCompiler(parser_backend="rd", lexer_backend="fast", opt_level=opt_level)
+            if errors:
+                lines = ERROR_LINES
+                document = "".join(rng.choice(ERROR_LINES) for _ in range(rng.randint(1, 12)))
+            else:
+                lines = TYPING_LINES
+                document = generate("mixed", 20, seed + script)
+            session = CompilationSession(document, opt_level=opt_level)
+            undo = None
+            for step in range(edits):
+                if undo is not None and rng.random() < 0.8:
+                    edit, undo = undo, None  # Take the last edit back, as editors do
+                else:
+                    edit = random_edit(rng, session.text, lines)
+                    offset, length, replacement = edit
+                    undo = (offset, len(replacement), session.text[offset:offset + length])
+                with contextlib.redirect_stdout(io.StringIO()):
+                    session.edit(*edit)
+                expected = outcome(full.compile, session.text)
+                actual = outcome(session.compile)
+                if actual != expected:
+                    raise SystemExit(
+                        f"Script {script} opt {opt_level} edit {step}: session and full compilation differ\n"
+                        f"document: {session.text[:300]!r}\n"
+                        f"session: {actual[:300]}\nfull:    {expected[:300]}"
+                    )
+                if expected.startswith("#include"):
+                    tree = outcome(lambda: dump_ast(rdparser.parse(fastlexer.tokenize(session.text))))
+                    if outcome(lambda: dump_ast(session.program())) != tree:
+                        raise SystemExit(f"Script {script} opt {opt_level} edit {step}: ASTs differ")
+                    compiled += 1
+                checked += 1
+    return checked, compiled
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    outcome(function, *args)
+    return time.perf_counter() - start
+
+
+def measure(size, seed):
+    """
+    Time full compilations of a document of `size` statements against
+    typing a statement into its middle one keystroke at a time and editing
+    a literal, each followed by compile().
+    """
+    source = generate("assignments", size, seed)
+    full = KJPLCompiler(parser_backend="rd", lexer_backend="fast")
+    full_time = min(timed(full.compile, source) for _ in range(3))
+
+    start = time.perf_counter()
+    session = CompilationSession(source)
+    session.compile()
+    build_time = time.perf_counter() - start
+
+    offset = session.text.index("\n", len(session.text) // 2) + 1
+    keystrokes = []
+    for index, char in enumerate(TYPED):
+        start = time.perf_counter()
+        session.edit(offset + index, 0, char)
+        outcome(session.compile)
+        keystrokes.append(time.perf_counter() - start)
+
+    rng = random.Random(seed)
+    literal_edits = []
+    numbers = [m.span() for m in re.finditer(r"\b\d+\b", session.text)]
+    for _ in range(20):
+        start, end = rng.choice(numbers)
+        begin = time.perf_counter()
+        session.edit(start, end - start, str(rng.randint(100, 999))[:end - start].rjust(end - start, "1"))
+        outcome(session.compile)
+        literal_edits.append(time.perf_counter() - begin)
+    return {
+        "bytes": len(source),
+        "full": full_time,
+        "build": build_time,
+        "keystroke_median": statistics.median(keystrokes),
+        "keystroke_max": max(keystrokes),
+        "literal_median": statistics.median(literal_edits),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--sizes", default="1000,10000,100000")
+    arg_parser.add_argument("--scripts", type=int, default=10, help="random edit scripts to validate")
+    arg_parser.add_argument("--edits", type=int, default=100, help="edits per script")
+    arg_parser.add_argument("--error-scripts", type=int, default=100,
+                            help="random edit scripts to validate on documents with semantic errors")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    checked, compiled = validate(args.scripts, args.edits, args.seed)
+    print(f"{checked} edits match full compilation ({compiled} left a valid program)")
+    checked, compiled = validate(args.error_scripts, 20, args.seed, errors=True)
+    print(f"{checked} edits of documents with errors match full compilation ({compiled} left a valid program)")
+
+    print(f"{'statements':>10}{'KiB':>9}{'full ms':>10}{'build ms':>10}{'key ms':>9}{'key max':>9}{'literal ms':>11}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        result = measure(size, args.seed)
+        print(f"{size:>10}{result['bytes'] / 1024:>9.1f}{result['full'] * 1000:>10.1f}{result['build'] * 1000:>10.1f}"
+              f"{result['keystroke_median'] * 1000:>9.2f}{result['keystroke_max'] * 1000:>9.2f}"
+              f"{result['literal_median'] * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# benchmarks/ir_runtime.py
+"""
+Runtime benchmark for the IR optimizations: compile loop-heavy KJPL
+programs at every optimization level, build the C with gcc and time the
+executables. Outputs must match across levels.
+
+    python -m benchmarks.ir_runtime [--iterations N] [--runs N] [--cflags=-O0,-O2]
+"""
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from string import Template
+
+from compiler import KJPLCompiler
+
+# `opaque` values are computed by a loop so no level can fold them to constants
+PRELUDE = """
+k = 0; while (k < 7) { k = k + 1; }
+m = 0; while (m < 3) { m = m + 1; }
+"""
+
+WORKLOADS = {
+    # k * k + m * m is recomputed every iteration
+    "invariant": PRELUDE + """
+n = 0; total = 0;
+while (n < $iterations) {
+    scale = k * k + m * m;
+    total = total + scale / 29;
+    n = n + 1;
+}
+print(total);
+""",
+    # The same subexpression three times per statement
+    "common subexpressions": PRELUDE + """
+i = 0; acc = 0;
+while (i < $iterations) {
+    j = i / 64;
+    acc = acc + (j * k + m) / 1024 + (j * k + m) / 2048 + (j * k + m) / 4096;
+    acc = acc - acc / 1000000 * 1000000;
+    i = i + 1;
+}
+print(acc);
+""",
+    # The inner loop's invariant depends on the outer counter only
+    "nested": PRELUDE + """
+i = 0; s = 0;
+while (i < $outer) {
+    j = 0;
+    while (j < 1000) {
+        s = s + (i * k + m * m) / 100 - j / 500;
+        j = j + 1;
+    }
+    s = s - s / 1000000 * 1000000;
+    i = i + 1;
+}
+print(s);
+""",
+}
+
+
+def build(c_code, path, cflags):
+    with open(path + ".c", "w", encoding="utf-8") as f:
+        f.write(c_code)
+    subprocess.run(["gcc", *cflags, "-o", path, path + ".c"], check=True)
+
+
+def best_run(path, runs):
+    best = float("inf")
+    output = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([path], capture_output=True, text=True, check=True)
+        best = min(best, time.perf_counter() - start)
+        output = result.stdout
+    return best, output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--iterations", type=int, default=20_000_000)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--cflags", default="-O0,-O2",
+                            help="comma-separated gcc settings to compare, one build each")
+    args = arg_parser.parse_args()
+
+    if shutil.which("gcc") is None:
+        sys.exit("gcc not found")
+    logging.disable(logging.INFO)
+
+    levels = KJPLCompiler.OPT_LEVELS
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, template in WORKLOADS.items():
+            source = Template(template).substitute(iterations=args.iterations, outer=args.iterations // 1000)
+            c_codes = {level: KJPLCompiler(opt_level=level).compile(source) for level in levels}
+            print(f"{name}:")
+            for cflags in args.cflags.split(","):
+                times = {}
+                outputs = set()
+                for level, c_code in c_codes.items():
+                    path = os.path.join(workdir, f"{name.replace(' ', '_')}_{level}")
+                    build(c_code, path, cflags.split())
+                    times[level], output = best_run(path, args.runs)
+                    outputs.add(output)
+                if len(outputs) != 1:
+                    sys.exit(f"{name}: output differs between optimization levels")
+                cells = "  ".join(f"opt {level}: {seconds * 1000:7.1f} ms" for level, seconds in times.items())
+                speedup = times[levels[0]] / times[levels[-1]]
+                print(f"  gcc {cflags:<4} {cells}  speedup {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
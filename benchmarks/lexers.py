@@ -0,0 +1,133 @@
+# benchmarks/lexers.py
+"""
+Compare the ply lexer with the fast lexer: check that both produce the same
+tokens for a large generated program and that the PLY parser recovers from
+syntax errors the same way on either's tokens, then time each.
+
+    python -m benchmarks.lexers [--statements N] [--runs N]
+"""
+import argparse
+import contextlib
+import io
+import logging
+import time
+
+import fastlexer
+import lexer
+import parser
+from benchmarks.generator import generate
+from compiler import KJPLCompiler
+
+SNIPPET = """\
+// running total
+total = total + value_{i} * 3 - (limit / 2);
+if (total >= {i}) {{ print(total); }} else {{ flag = 1.5e3; }}
+/* a comment spanning
+   two lines */
+while (count != {i}) {{ count = count + 1; name = "item \\"{i}\\""; }}
+"""
+
+
+# Programs with syntax errors: PLY's error recovery sets attributes on the
+# token it fails at, so both backends' tokens must survive it
+BROKEN = ["x = ; print(x);", "x = 1; y = (2 + ; z = 3; print(z);", "if (x) { y = 1; } print(2);"]
+
+
+def make_source(statements):
+    return "".join(SNIPPET.format(i=i) for i in range(statements))
+
+
+def ply_tokens(source):
+    lexer.lexer.input(source)
+    lexer.lexer.lineno = 1
+    return list(lexer.lexer)
+
+
+def fast_tokens(source):
+    return list(fastlexer.tokenize(source))
+
+
+def as_tuples(toks):
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in toks]
+
+
+def ply_parse(toks):
+    """
+    Parse toks with the PLY parser; return what p_error printed and the AST.
+    """
+    token_iter = iter(toks)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ast = parser.parser.parse(lexer=lexer.lexer.clone(), tokenfunc=lambda: next(token_iter, None))
+    return output.getvalue(), parser.dump_ast(ast) if ast else None
+
+
+def outcome(function, *args):
+    """
+    Return what function printed and returned, or the error it raised.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        try:
+            result = function(*args)
+        except Exception as e:
+            result = f"{type(e).__name__}: {e}"
+    return output.getvalue(), result
+
+
+def check_stream(sources, chunk_sizes=(7, 64, 1 << 16)):
+    """
+    Check that compile_stream, reading each source a few characters or a
+    whole chunk at a time, does what compile does with the fast lexer.
+    """
+    kjpl_compiler = KJPLCompiler(lexer_backend="fast")
+    for source in sources:
+        expected = outcome(kjpl_compiler.compile, source)
+        for chunk_size in chunk_sizes:
+            actual = outcome(kjpl_compiler.compile_stream, io.StringIO(source), chunk_size)
+            if actual != expected:
+                raise SystemExit(f"{source[:200]!r} compiles differently streamed in chunks of {chunk_size}")
+
+
+def best_of(func, source, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(source)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--statements", type=int, default=5000)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    source = make_source(args.statements)
+    expected = as_tuples(ply_tokens(source))
+    actual = as_tuples(fast_tokens(source))
+    if actual != expected:
+        for index, (want, got) in enumerate(zip(expected, actual)):
+            if want != got:
+                raise SystemExit(f"Token {index} differs: ply {want!r}, fast {got!r}")
+        raise SystemExit(f"Token counts differ: ply {len(expected)}, fast {len(actual)}")
+    print(f"{len(expected)} tokens identical across backends ({len(source)} bytes)")
+    for broken in BROKEN:
+        want, got = ply_parse(ply_tokens(broken)), ply_parse(fast_tokens(broken))
+        if got != want:
+            raise SystemExit(f"{broken!r} parses differently: ply tokens {want!r}, fast tokens {got!r}")
+    print(f"{len(BROKEN)} programs with syntax errors parse the same from both backends' tokens")
+    check_stream([generate("mixed", 50, 0), make_source(20)] + BROKEN)
+    print("compile_stream matches compile, syntax errors included")
+
+    ply_time = best_of(ply_tokens, source, args.runs)
+    fast_time = best_of(fast_tokens, source, args.runs)
+    for name, seconds in (("ply", ply_time), ("fast", fast_time)):
+        print(f"{name:>5}: {seconds * 1000:8.1f} ms, {len(expected) / seconds / 1e6:6.2f} M tokens/s")
+    print(f"speedup: {ply_time / fast_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# benchmarks/loop_runtime.py
+"""
+Loop emission benchmark: build loop-heavy KJPL programs with the structured
+while/for emission and with the previous label/goto emission, compile both
+with gcc and time the executables. Outputs must match.
+
+    python -m benchmarks.loop_runtime [--iterations N] [--runs N] [--cflags=-O2]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from string import Template
+
+from benchmarks.ir_runtime import WORKLOADS, best_run, build
+from codegen import CodeGenerator
+from parser import parser
+
+LOOP_WORKLOADS = dict(WORKLOADS)
+LOOP_WORKLOADS["counted"] = """
+i = 0; s = 0;
+while (i < $iterations) {
+    s = s + i / 3 - i / 5;
+    s = s - s / 1000000 * 1000000;
+    i = i + 1;
+}
+print(s);
+"""
+
+
+class GotoCodeGenerator(CodeGenerator):
+    """
+    CodeGenerator with the old while emission: a label, a negated test and
+    a backward goto.
+    """
+    label_counter = 0
+
+    def visit_WhileNode(self, node):
+        self._declare_assigned(node.body)
+        condition = self.visit(node.condition)
+        self.label_counter += 2
+        loop_start = f"label_{self.label_counter - 1}"
+        loop_end = f"label_{self.label_counter}"
+
+        self._add_line(f"{loop_start}:")
+        self._add_line(f"if (!({condition})) goto {loop_end};")
+        self.indent_level += 1
+        for stmt in node.body:
+            self.visit(stmt)
+        self._add_line(f"goto {loop_start};")
+        self.indent_level -= 1
+        self._add_line(f"{loop_end}:;")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--iterations", type=int, default=20_000_000)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--cflags", default="-O2",
+                            help="comma-separated gcc settings to compare, one build each")
+    args = arg_parser.parse_args()
+
+    if shutil.which("gcc") is None:
+        sys.exit("gcc not found")
+
+    emitters = {"goto": GotoCodeGenerator, "structured": CodeGenerator}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, template in LOOP_WORKLOADS.items():
+            source = Template(template).substitute(iterations=args.iterations, outer=args.iterations // 1000)
+            ast = parser.parse(source)
+            c_codes = {emitter: cls().generate(ast) for emitter, cls in emitters.items()}
+            print(f"{name}:")
+            for cflags in args.cflags.split(","):
+                times = {}
+                outputs = set()
+                for emitter, c_code in c_codes.items():
+                    path = os.path.join(workdir, f"{name.replace(' ', '_')}_{emitter}")
+                    build(c_code, path, cflags.split())
+                    times[emitter], output = best_run(path, args.runs)
+                    outputs.add(output)
+                if len(outputs) != 1:
+                    sys.exit(f"{name}: output differs between loop emissions")
+                cells = "  ".join(f"{emitter}: {seconds * 1000:7.1f} ms" for emitter, seconds in times.items())
+                speedup = times["goto"] / times["structured"]
+                print(f"  gcc {cflags:<4} {cells}  speedup {speedup:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# benchmarks/parsers.py
+"""
+Compare the PLY parser with the recursive-descent parser: check that both
+build the same AST for a corpus of programs and report the same first error
+for broken ones, then time each on a large generated program.
+
+    python -m benchmarks.parsers [--statements N] [--runs N] [--shape NAME]
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import fastlexer
+import lexer
+import parser
+import rdparser
+from benchmarks.concurrency import make_program
+from benchmarks.generator import SHAPES, generate
+
+EDGE_CASES = [
+    "",
+    "x = 1;",
+    "if (1 < 2) { } else { }",
+    "while (x != 0) { }",
+    "x = ((((1))));",
+    "x = 1 - 2 - 3; y = 8 / 4 / 2; z = 1 + 2 * 3 - 4 / 5;",
+    "x = (1 + 2) * (3 - 4) / (5 + (6 * 7));",
+    'name = "a \\"quoted\\" name"; flag = true; other = FALSE; f = 1.5e3;',
+    "If (a >= b) { Print(a); } ELSE { while (b <= a) { b = b + 1; } }",
+    "x = 1;\n\n// comment\n/* block\n comment */\ny = x\n  +\n  2;\nprint(y\n);",
+    "if (a == b) { if (c > d) { x = 1; } } else { if (e < f) { } else { y = 2; } }",
+]
+
+BROKEN = [
+    "x = ;",
+    "x = 1; y = ;  z = 2;",
+    "print(1)",
+    "x = 1; }",
+    "if (x) { }",
+    "x = (1 + 2;",
+    "x = 1 y = 2;",
+    "let x = 1;",
+    "if (1 < 2) { x = 1; ",
+    "while (1 < 2 < 3) { }",
+    "x = 1 +;",
+    "} x = 1;",
+]
+
+
+def corpus(seed):
+    programs = list(EDGE_CASES)
+    for shape in SHAPES:
+        programs += [generate(shape, 100, seed + offset) for offset in range(3)]
+    rng = random.Random(seed)
+    programs += [make_program(rng, index) for index in range(100)]
+    return programs
+
+
+def ply_parse(tokens):
+    token_iter = iter(tokens)
+    return parser.parser.parse(lexer=None, tokenfunc=lambda: next(token_iter, None))
+
+
+def ply_first_error(tokens):
+    """
+    Return the first message p_error printed while parsing, or None.
+    """
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        ply_parse(tokens)
+    messages = output.getvalue().splitlines()
+    return messages[0] if messages else None
+
+
+def rd_first_error(tokens):
+    try:
+        rdparser.parse(tokens)
+    except SyntaxError as e:
+        return str(e)
+    return None
+
+
+def ply_tokens(source):
+    token_lexer = lexer.lexer.clone()
+    token_lexer.input(source)
+    return list(token_lexer)
+
+
+def validate(programs):
+    for index, source in enumerate(programs):
+        tokens = list(fastlexer.tokenize(source))
+        expected = parser.dump_ast(ply_parse(tokens) or parser.ast_nodes.ProgramNode([], lineno=1))
+        actual = parser.dump_ast(rdparser.parse(tokens))
+        if actual != expected:
+            raise SystemExit(f"Program {index} parses differently:\n{source[:500]}")
+    for source in BROKEN:
+        for tokens in (ply_tokens(source), list(fastlexer.tokenize(source))):
+            expected, actual = ply_first_error(tokens), rd_first_error(tokens)
+            if actual != expected:
+                raise SystemExit(f"{source!r}: ply reports {expected!r}, rd raises {actual!r}")
+
+
+def best_of(func, tokens, runs):
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(tokens)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--statements", type=int, default=100_000)
+    arg_parser.add_argument("--runs", type=int, default=3)
+    arg_parser.add_argument("--shape", default="assignments", choices=SHAPES)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    programs = corpus(args.seed)
+    validate(programs)
+    print(f"{len(programs)} programs parse identically, {len(BROKEN)} broken ones fail at the same token")
+
+    tokens = list(fastlexer.tokenize(generate(args.shape, args.statements, args.seed)))
+    if parser.dump_ast(ply_parse(tokens)) != parser.dump_ast(rdparser.parse(tokens)):
+        raise SystemExit("The benchmark program parses differently")
+    ply_time = best_of(ply_parse, tokens, args.runs)
+    rd_time = best_of(rdparser.parse, tokens, args.runs)
+    print(f"{args.shape}, {args.statements} statements, {len(tokens)} tokens")
+    for name, seconds in (("ply", ply_time), ("rd", rd_time)):
+        print(f"{name:>5}: {seconds * 1000:8.1f} ms, {len(tokens) / seconds / 1e6:6.2f} M tokens/s")
+    print(f"speedup: {ply_time / rd_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
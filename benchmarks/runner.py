@@ -0,0 +1,76 @@
+# benchmarks/runner.py
+"""
+Native runner benchmark: compile, build and run a corpus of programs with
+a cold artifact cache, serially and in parallel, then again with a warm
+cache, and report where the time goes.
+
+    python -m benchmarks.runner [--programs N] [-j N] [--cflags=-O2]
+"""
+import argparse
+import logging
+import os
+import random
+import time
+
+from benchmarks.concurrency import make_program
+from benchmarks.generator import SHAPES, generate
+from runner import NativeRunner
+
+
+def corpus(count, seed):
+    rng = random.Random(seed)
+    programs = [generate(shape, 50, seed) for shape in SHAPES if shape != "strings"]
+    index = 0
+    while len(programs) < count:
+        if index % 5 != 4:  # Without the semantic errors
+            programs.append(make_program(rng, index))
+        index += 1
+    return programs[:count]
+
+
+def measure(runner, programs, workers):
+    start = time.perf_counter()
+    results = runner.run_many(programs, workers=workers)
+    elapsed = time.perf_counter() - start
+    failures = [result for result in results if result.stdout is None or result.returncode != 0]
+    if failures:
+        raise SystemExit(f"{len(failures)} programs failed, e.g. {failures[0].error_type}: {failures[0].error}")
+    totals = {
+        field: sum(getattr(result, field) for result in results)
+        for field in ("compile_time", "build_time", "run_time")
+    }
+    return elapsed, totals, [result.stdout for result in results]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--programs", type=int, default=40)
+    arg_parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    arg_parser.add_argument("--cflags", default="-O2")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    programs = corpus(args.programs, args.seed)
+    print(f"{len(programs)} programs, {args.workers} workers, cflags {args.cflags}")
+    print(f"{'pass':<16}{'wall ms':>10}{'compile ms':>12}{'build ms':>10}{'run ms':>9}")
+    outputs = None
+    for name, workers, fresh in (("cold, serial", 1, True), ("cold, parallel", args.workers, True),
+                                 ("warm", args.workers, False)):
+        if fresh:
+            if outputs is not None:
+                runner.close()
+            runner = NativeRunner(cflags=args.cflags.split())  # In a new temporary directory
+        elapsed, totals, results = measure(runner, programs, workers)
+        if outputs is not None and results != outputs:
+            raise SystemExit(f"{name}: outputs differ from the first pass")
+        outputs = results
+        print(f"{name:<16}{elapsed * 1000:>10.1f}{totals['compile_time'] * 1000:>12.1f}"
+              f"{totals['build_time'] * 1000:>10.1f}{totals['run_time'] * 1000:>9.1f}")
+    stats = runner.stats()
+    runner.close()
+    print(f"warm pass: {stats['hits']} cache hits after {stats['builds']} builds")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+# benchmarks/server_load.py
+"""
+Load test for the compile server: keep-alive clients post KJPL programs to
+/compile concurrently and the latency distribution is reported. A share of
+the requests repeat a small set of hot programs, which the server coalesces
+while they are in flight.
+
+    python -m benchmarks.server_load [--requests N] [--concurrency N] [--hot F] [--connect HOST:PORT]
+
+Without --connect a server is started in this process on a free port.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import sys
+import time
+from collections import Counter
+
+import server
+from benchmarks.concurrency import make_program
+
+
+async def post(reader, writer, path, payload):
+    """
+    Send one request on a keep-alive connection; return (status, body).
+    """
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"POST {path} HTTP/1.1\r\nHost: load\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def get_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b"GET /stats HTTP/1.1\r\nHost: load\r\nConnection: close\r\n\r\n")
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b"\r\n\r\n", 1)[1])
+
+
+async def client(host, port, sources, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for source in sources:
+            start = time.perf_counter()
+            status, body = await post(reader, writer, "/compile", {"code": source})
+            latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+            if status == 200:
+                payload = json.loads(body)
+                if not (payload.get("c_code") or payload.get("error")):
+                    statuses["malformed"] += 1
+    finally:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+async def run(args, host, port):
+    rng = random.Random(args.seed)
+    hot = [make_program(rng, index) for index in range(8)]
+    sources = [
+        rng.choice(hot) if rng.random() < args.hot else make_program(rng, 1000 + index)
+        for index in range(args.requests)
+    ]
+    latencies = []
+    statuses = Counter()
+    shares = [sources[offset::args.concurrency] for offset in range(args.concurrency)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, share, latencies, statuses) for share in shares))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"{len(latencies)} requests from {args.concurrency} connections in {elapsed:.2f} s "
+          f"({len(latencies) / elapsed:.1f} req/s)")
+    print("latency: " + "  ".join(
+        f"{name} {percentile(latencies, fraction) * 1000:.1f} ms"
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+    ))
+    print("status: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    print("server: " + json.dumps(await get_stats(host, port)))
+
+
+async def run_with_local_server(args):
+    service = server.CompileService(workers=args.workers, executor=args.executor, max_pending=args.max_pending)
+    ready = asyncio.get_running_loop().create_future()
+    task = asyncio.create_task(server.serve("127.0.0.1", 0, service, ready.set_result))
+    host, port = await ready
+    # Let every worker start and load its tables before timing
+    await asyncio.gather(*(client(host, port, ["x = 1; print(x);"], [], Counter()) for _ in range(4)))
+    try:
+        await run(args, host, port)
+    finally:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--requests", type=int, default=2000)
+    arg_parser.add_argument("--concurrency", type=int, default=32)
+    arg_parser.add_argument("--hot", type=float, default=0.5, help="fraction of requests for the hot programs")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--connect", default=None, help="HOST:PORT of a running server")
+    arg_parser.add_argument("-j", "--workers", type=int, default=None, help="local server workers")
+    arg_parser.add_argument("--executor", default="process", choices=server.CompileService.EXECUTORS)
+    arg_parser.add_argument("--max-pending", type=int, default=64)
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.ERROR)
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        asyncio.run(run(args, host, int(port)))
+    else:
+        asyncio.run(run_with_local_server(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
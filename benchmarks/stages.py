@@ -0,0 +1,154 @@
+# benchmarks/stages.py
+"""
+Per-stage throughput benchmark: compile synthetic programs of every shape
+and size and record the time spent in each compiler stage; with --output,
+write the results to JSON. With --compare, report stages that got slower
+than in an earlier results file.
+
+    python -m benchmarks.stages [--shapes a,b] [--sizes 100,1000] [--opt-levels 0,2]
+                                [--lexers ply,fast] [--runs N] [--memory]
+                                [--output FILE] [--compare OLD.json] [--threshold 0.1]
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+import compiler
+from benchmarks.generator import SHAPES, generate
+from compiler import KJPLCompiler
+from metrics import CompilationMetrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(source, opt_level, lexer_backend, runs, track_memory):
+    """
+    Compile source `runs` times and summarize every stage across the runs.
+    """
+    kjpl_compiler = KJPLCompiler(opt_level=opt_level, lexer_backend=lexer_backend)
+    samples = []
+    for _ in range(runs):
+        metrics = CompilationMetrics()
+        kjpl_compiler.compile(source, metrics=metrics)
+        samples.append(metrics)
+
+    result = {
+        "bytes": len(source.encode("utf-8")),
+        "tokens": samples[0].tokens,
+        "ast_nodes": samples[0].ast_nodes,
+        "wall_time": {"min": min(m.wall_time for m in samples), "median": statistics.median(m.wall_time for m in samples)},
+        "stages": {},
+    }
+    for stage in samples[0].stages:
+        wall = [m.stages[stage].wall_time for m in samples]
+        cpu = [m.stages[stage].cpu_time for m in samples]
+        result["stages"][stage] = {
+            "min": min(wall),
+            "median": statistics.median(wall),
+            "cpu_median": statistics.median(cpu),
+            "bytes_per_second": result["bytes"] / min(wall) if min(wall) else None,
+        }
+
+    if track_memory:
+        # A separate run: tracing would distort the timings above
+        metrics = CompilationMetrics(track_memory=True)
+        kjpl_compiler.compile(source, metrics=metrics)
+        for stage, record in metrics.stages.items():
+            result["stages"][stage]["peak_memory"] = record.peak_memory
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "compiler_version": compiler.__version__,
+        "stage_versions": KJPLCompiler.STAGE_VERSIONS,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(old, new, threshold):
+    """
+    Return a line for each stage whose median time grew by more than threshold.
+    """
+    baseline = {(r["shape"], r["size"], r["opt_level"], r["lexer"]): r for r in old["results"]}
+    regressions = []
+    for result in new["results"]:
+        before = baseline.get((result["shape"], result["size"], result["opt_level"], result["lexer"]))
+        if before is None:
+            continue
+        for stage, timing in result["stages"].items():
+            previous = before["stages"].get(stage)
+            if not previous or not previous["median"]:
+                continue
+            change = timing["median"] / previous["median"] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{result['shape']} size {result['size']} opt {result['opt_level']} {result['lexer']}: "
+                    f"{stage} {previous['median'] * 1000:.2f} -> {timing['median'] * 1000:.2f} ms (+{change:.0%})"
+                )
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--shapes", default=",".join(SHAPES))
+    arg_parser.add_argument("--sizes", default="100,1000")
+    arg_parser.add_argument("--opt-levels", default="0,2")
+    arg_parser.add_argument("--lexers", default="ply,fast")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--memory", action="store_true", help="also record peak memory per stage")
+    arg_parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    arg_parser.add_argument("--compare", default=None, help="earlier results file to check for regressions")
+    arg_parser.add_argument("--threshold", type=float, default=0.1, help="slowdown reported as a regression")
+    args = arg_parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    results = []
+    for shape in args.shapes.split(","):
+        for size in (int(size) for size in args.sizes.split(",")):
+            source = generate(shape, size, args.seed)
+            for opt_level in (int(level) for level in args.opt_levels.split(",")):
+                for lexer_backend in args.lexers.split(","):
+                    result = measure(source, opt_level, lexer_backend, args.runs, args.memory)
+                    result.update(shape=shape, size=size, opt_level=opt_level, lexer=lexer_backend)
+                    results.append(result)
+                    stages = "  ".join(
+                        f"{stage} {timing['median'] * 1000:.2f}" for stage, timing in result["stages"].items()
+                    )
+                    print(f"{shape:<12} {size:>6} opt {opt_level} {lexer_backend:<4} "
+                          f"{result['bytes'] / 1024:8.1f} KiB  total {result['wall_time']['median'] * 1000:8.2f} ms  "
+                          f"[ms] {stages}")
+
+    report = {"environment": environment(), "runs": args.runs, "seed": args.seed, "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
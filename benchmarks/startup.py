@@ -0,0 +1,97 @@
+# benchmarks/startup.py
+"""
+Cold-start benchmark: time a fresh interpreter importing the compiler with
+and without the shipped lexer/parser tables, and time building the lexer and
+parser objects in-process both ways.
+
+    python -m benchmarks.startup [--runs N]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INTERPRETER = "pass"
+WITH_TABLES = "import lexer, parser"
+# Setting a sys.modules entry to None makes importing it raise ImportError,
+# which forces lexer.py and parser.py down their full-build fallback.
+WITHOUT_TABLES = (
+    "import sys; sys.modules['kjpl_lextab'] = None; sys.modules['kjpl_parsetab'] = None; "
+    "import lexer, parser"
+)
+
+
+def time_import(code, runs):
+    """
+    Return wall-clock seconds for each run of code in a new interpreter.
+    """
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def time_build(runs):
+    """
+    Return mean milliseconds to construct the lexer and parser objects from
+    the shipped tables and from a full build.
+    """
+    from ply import lex, yacc
+    import lexer
+    import parser
+
+    def mean_ms(build):
+        start = time.perf_counter()
+        for _ in range(runs):
+            build()
+        return (time.perf_counter() - start) / runs * 1000
+
+    return {
+        "lexer (tables)": mean_ms(lexer._build_lexer),
+        "lexer (full)": mean_ms(lambda: lex.lex(module=lexer)),
+        "parser (tables)": mean_ms(parser._build_parser),
+        "parser (full)": mean_ms(lambda: yacc.yacc(
+            module=parser, debug=False, write_tables=False, errorlog=yacc.NullLogger())),
+    }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--runs", type=int, default=10)
+    args = arg_parser.parse_args()
+
+    results = {
+        "interpreter": time_import(INTERPRETER, args.runs),
+        "shipped tables": time_import(WITH_TABLES, args.runs),
+        "full build": time_import(WITHOUT_TABLES, args.runs),
+    }
+
+    for name, samples in results.items():
+        print(f"{name:>15}: median {statistics.median(samples) * 1000:8.1f} ms, "
+              f"min {min(samples) * 1000:8.1f} ms over {len(samples)} runs")
+
+    # Compare the time spent importing the compiler, net of interpreter startup
+    base = statistics.median(results["interpreter"])
+    with_tables = statistics.median(results["shipped tables"]) - base
+    without_tables = statistics.median(results["full build"]) - base
+    print(f"{'import saving':>15}: {(without_tables - with_tables) * 1000:8.1f} ms")
+
+    print()
+    for name, ms in time_build(args.runs).items():
+        print(f"{name:>15}: {ms:8.3f} ms to build")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/vm.py
+"""
+Bytecode VM benchmark: check that running programs in the VM prints what
+their gcc builds print, then compare the end-to-end time of short runs:
+KJPL -> C -> gcc -> executable against KJPL -> bytecode -> VM.
+
+    python -m benchmarks.vm [--iterations 1000,10000,100000] [--runs N] [--cflags=-O2]
+"""
+import argparse
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from string import Template
+
+import vm
+from benchmarks.concurrency import make_program
+from benchmarks.generator import SHAPES, generate
+from benchmarks.ir_runtime import WORKLOADS, best_run, build
+from compiler import KJPLCompiler
+
+# Corners of the C semantics the VM has to reproduce
+EDGE_CASES = [
+    "x = 0 - 7; print(x / 2); print(7 / (0 - 2)); print((0 - 7) / (0 - 2)); print(6 / 3);",
+    "x = 2147483647; x = x + 1; print(x); y = 65536; print(y * y); print(y * 65535 * 3);",
+    "f = 1.5; print(f / 2.0); print(f * 1e10); print(f * 1e-7); print(0.1 + 0.2); print(f - f);",
+    "f = 1.0; z = 0.0; print(f / z); print((z - f) / z);",
+    's = "tab\\there\\nnew line \\\\ \\"quoted\\""; print(s); t = "\\101\\x42"; print(t);',
+    'a = "apple"; b = "banana"; if (a < b) { print(a); } else { print(b); } if (a == "apple") { print("same"); }',
+    "t = true; f = false; print(t); print(f); if (t != f) { print(t); } if (t > f) { print(1); }",
+    "i = 0; while (i < 10) { if (i == 5) { x = i * 3; } i = i + 1; } print(x);",
+    "i = 10; while (i > 0) { i = i - 3; } print(i); while (i > 100) { } print(i);",
+]
+
+
+def corpus(seed):
+    programs = list(EDGE_CASES)
+    for shape in SHAPES:
+        programs.append(generate(shape, 30, seed))
+    rng = random.Random(seed)
+    programs += [make_program(rng, index) for index in range(40) if index % 5 != 4]  # Without the semantic errors
+    programs += [Template(template).substitute(iterations=1000, outer=2) for template in WORKLOADS.values()]
+    return programs
+
+
+def validate(programs, workdir):
+    """
+    Run every program natively and in the VM, at both AST opt levels.
+    """
+    for index, source in enumerate(programs):
+        for opt_level in (0, 1):
+            compiler = KJPLCompiler(parser_backend="rd", lexer_backend="fast", opt_level=opt_level)
+            path = os.path.join(workdir, f"check_{index}_{opt_level}")
+            # -fwrapv gives signed overflow the wrapping behavior the VM implements;
+            # -w silences the trigraph warnings of random string literals
+            build(compiler.compile(source), path, ["-O0", "-fwrapv", "-w"])
+            _, expected = best_run(path, 1)
+            actual = vm.run(compiler.compile_bytecode(source))
+            if actual != expected:
+                raise SystemExit(
+                    f"Program {index} at opt {opt_level} prints differently:\n{source[:500]}\n"
+                    f"native: {expected[:300]!r}\nvm:     {actual[:300]!r}"
+                )
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def native(compiler, source, path, cflags, runs):
+    """
+    Return (KJPL to C, gcc, best run) seconds and the output.
+    """
+    translate, c_code = timed(compiler.compile, source)
+    gcc, _ = timed(build, c_code, path, cflags)
+    run, output = best_run(path, runs)
+    return (translate, gcc, run), output
+
+
+def bytecode(compiler, source, runs):
+    """
+    Return (KJPL to bytecode, best run) seconds and the output.
+    """
+    translate, code = timed(compiler.compile_bytecode, source)
+    runs = [timed(vm.run, code) for _ in range(runs)]
+    return (translate, min(seconds for seconds, _ in runs)), runs[0][1]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--iterations", default="1000,10000,100000")
+    arg_parser.add_argument("--runs", type=int, default=3)
+    arg_parser.add_argument("--cflags", default="-O2")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    if shutil.which("gcc") is None:
+        sys.exit("gcc not found")
+    logging.disable(logging.CRITICAL)
+
+    compiler = KJPLCompiler(parser_backend="rd", lexer_backend="fast")
+    with tempfile.TemporaryDirectory() as workdir:
+        programs = corpus(args.seed)
+        validate(programs, workdir)
+        print(f"{len(programs)} programs print the same natively and in the VM")
+
+        print(f"{'workload':<22}{'iterations':>11}{'to C':>8}{'gcc':>8}{'exe':>8}{'native':>9}"
+              f"{'to bc':>8}{'vm':>9}{'total':>9}  winner")
+        for name, template in WORKLOADS.items():
+            for iterations in (int(count) for count in args.iterations.split(",")):
+                source = Template(template).substitute(iterations=iterations, outer=max(1, iterations // 1000))
+                path = os.path.join(workdir, name.replace(" ", "_"))
+                native_times, expected = native(compiler, source, path, args.cflags.split(), args.runs)
+                vm_times, actual = bytecode(compiler, source, args.runs)
+                if actual != expected:
+                    sys.exit(f"{name}: the VM prints {actual!r}, the executable {expected!r}")
+                native_total, vm_total = sum(native_times), sum(vm_times)
+                winner = "vm" if vm_total < native_total else "native"
+                cells = "".join(f"{seconds * 1000:>8.1f}" for seconds in native_times)
+                print(f"{name:<22}{iterations:>11}{cells}{native_total * 1000:>9.1f}"
+                      f"{vm_times[0] * 1000:>8.1f}{vm_times[1] * 1000:>9.1f}{vm_total * 1000:>9.1f}  {winner}")
+    print("times in ms; exe and vm are the best of --runs runs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# build_tables.py
+"""
+Generate the lexer and LALR tables shipped with the compiler.
+
+Run this after changing the token rules in lexer.py or the grammar in
+parser.py (and bump LEXER_VERSION / PARSER_VERSION), then commit the
+regenerated kjpl_lextab.py and kjpl_parsetab.py:
+
+    python build_tables.py
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LEXTAB = "kjpl_lextab"
+PARSETAB = "kjpl_parsetab"
+
+
+def build_tables(outputdir=ROOT):
+    # Make sure lexer.py and parser.py do a full build instead of loading old tables
+    for name in (LEXTAB, PARSETAB):
+        path = os.path.join(outputdir, f"{name}.py")
+        if os.path.exists(path):
+            os.remove(path)
+        sys.modules[name] = None
+
+    from ply import yacc
+    import lexer
+    import parser
+
+    lexer.lexer.writetab(LEXTAB, outputdir)
+    _stamp(os.path.join(outputdir, f"{LEXTAB}.py"), lexer.LEXER_VERSION)
+
+    yacc.yacc(module=parser, tabmodule=PARSETAB, outputdir=outputdir, debug=False)
+    _stamp(os.path.join(outputdir, f"{PARSETAB}.py"), parser.PARSER_VERSION)
+
+    for name in (LEXTAB, PARSETAB):
+        sys.modules.pop(name, None)
+
+
+def _stamp(path, version):
+    """
+    Record the stage version the tables were generated for.
+    """
+    with open(path, "a") as f:
+        f.write(f"_kjpl_version = {version!r}\n")
+
+
+if __name__ == "__main__":
+    build_tables()
+    print(f"Wrote {LEXTAB}.py and {PARSETAB}.py to {ROOT}")
@@ -0,0 +1,210 @@
+# cache.py
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class CompilationCache:
+    """
+    Content-addressed cache for compiled KJPL programs.
+
+    Entries are keyed by a hash of the source text, the compiler version and
+    the compiler options. A bounded in-process LRU tier sits in front of an
+    optional on-disk tier whose total size is capped; least recently used
+    files are evicted first.
+
+    A cache may be shared by compilers running in several threads; the
+    memory tier and the counters are guarded by a lock, and disk entries
+    are replaced atomically.
+    """
+
+    def __init__(self, cache_dir=None, max_memory_entries=256, max_disk_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_cpu_time = 0.0  # CPU seconds not spent recompiling
+
+        self.disk_bytes = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    # --------------------------
+    # Keys
+    # --------------------------
+    @staticmethod
+    def make_key(source_code, version, options=None):
+        """
+        Hash the source text together with everything that affects the output.
+        """
+        digest = hashlib.sha256()
+        digest.update(version.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source_code.encode("utf-8"))
+        return digest.hexdigest()
+
+    # --------------------------
+    # Lookup and Storage
+    # --------------------------
+    def get(self, key):
+        """
+        Return the cached entry for key, or None on a miss.
+        """
+        with self._lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_cpu_time += entry.get("cpu_time", 0.0)
+                return entry
+
+        entry = self._disk_get(key)
+        with self._lock:
+            if entry is not None:
+                self._memory_put(key, entry)
+                self.disk_hits += 1
+                self.saved_cpu_time += entry.get("cpu_time", 0.0)
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key, entry):
+        """
+        Store an entry (a JSON-serializable dict) in both tiers.
+        """
+        with self._lock:
+            self._memory_put(key, entry)
+        if self.cache_dir:
+            self._disk_put(key, entry)
+
+    def clear(self):
+        """
+        Drop every entry from both tiers. Counters are left untouched.
+        """
+        with self._lock:
+            self.memory.clear()
+            if self.cache_dir:
+                for path, _, _ in self._disk_entries():
+                    self._remove(path)
+            self.disk_bytes = 0
+
+    def stats(self):
+        """
+        Return hit/miss counters and tier sizes as a dict.
+        """
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "saved_cpu_time": self.saved_cpu_time,
+            "memory_entries": len(self.memory),
+            "disk_bytes": self.disk_bytes,
+        }
+
+    # --------------------------
+    # Memory Tier
+    # --------------------------
+    def _memory_put(self, key, entry):
+        # Caller holds self._lock
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_memory_entries:
+            self.memory.popitem(last=False)
+
+    # --------------------------
+    # Disk Tier
+    # --------------------------
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _disk_get(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+        return entry
+
+    def _disk_put(self, key, entry):
+        data = json.dumps(entry).encode("utf-8")
+        if len(data) > self.max_disk_bytes:
+            return
+        path = self._path(key)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        # Write atomically so concurrent instances never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            self.disk_bytes += len(data) - old_size
+            if self.disk_bytes > self.max_disk_bytes:
+                self._evict()
+
+    def _evict(self):
+        """
+        Remove least recently used files until the disk tier fits its budget.
+        """
+        entries = sorted(self._disk_entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            total -= size
+        self.disk_bytes = total
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, st.st_mtime, st.st_size))
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
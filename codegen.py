@@ -1,26 +1,146 @@
 # codegen.py
+import io
+
+from parser import ast_nodes
+from symbols import C_TYPES, PRINTF_FORMATS, ZERO_VALUES, SymbolTable, literal_type
+from visitor import OPERATOR_KINDS, build_dispatch_table, infix_parts
+
+# Bump whenever the emitted C for a given AST can change
+CODEGEN_VERSION = "4"
+
+
+# --------------------------
+# Output Emitter
+# --------------------------
+class CEmitter:
+    """
+    Writes indented lines of C to a text stream (a file, an HTTP response
+    wrapped in a text layer, or an in-memory io.StringIO by default).
+
+    Lines are separated by "\n" (no trailing newline), buffered and written
+    in blocks of about buffer_size characters, and the indentation prefix
+    for each level is built only once.
+    """
+    INDENT = "    "
+
+    def __init__(self, stream=None, buffer_size=1 << 16):
+        self.stream = stream if stream is not None else io.StringIO()
+        self.buffer_size = buffer_size
+        self._parts = []
+        self._size = 0
+        self._separator = ""  # No newline before the first line
+        self._indents = [""]
+
+    def line(self, indent_level, text):
+        if indent_level >= len(self._indents):
+            self._indents += [self.INDENT * level for level in range(len(self._indents), indent_level + 1)]
+        prefix = self._indents[indent_level]
+        self._parts += (self._separator, prefix, text)
+        self._separator = "\n"
+        self._size += len(prefix) + len(text) + 1
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            self.stream.write("".join(self._parts))
+            self._parts.clear()
+            self._size = 0
+
+    def getvalue(self):
+        """
+        Return everything emitted so far (in-memory streams only).
+        """
+        self.flush()
+        return self.stream.getvalue()
+
+
 class CodeGenerator:
     def __init__(self):
-        self.output = []
+        self.emitter = None
         self.indent_level = 0
         self.current_function = None
-        self.symbol_table = {}  # Track variables and their types
-        self.label_counter = 0   # For generating unique labels
+        self.symbol_table = SymbolTable()  # Variable types, shared with semantic analysis
+        self.declared = set()              # Symbols declared in the C output so far
+        self._shared = None                # Shared nodes of a hash-consed AST
+        self._infix = {}                   # Shared node -> its C text
+        self._visitors = build_dispatch_table(self, "visit_", self.generic_visit)
 
     # --------------------------
     # Main Generation Entry Point
     # --------------------------
-    def generate(self, ast_node):
+    def generate(self, ast_node, stream=None, symbol_table=None, shared=None):
+        """
+        Generate C for ast_node. With a stream, write the code to it as it is
+        produced and return None; otherwise return the code as a string.
+
+        symbol_table is the table filled in by semantic analysis; without
+        one, each variable takes the type of the first value assigned to it.
+        shared is the set of expression nodes that occur more than once in a
+        hash-consed AST (parser.ExpressionInterner.shared); their C text is
+        generated once and reused.
+        """
+        self.reset()
+        self.emitter = CEmitter(stream)
+        if symbol_table is not None:
+            self.symbol_table = symbol_table
+        self._shared = shared
         self.visit(ast_node)
-        return "\n".join(self.output)
+        if stream is not None:
+            self.emitter.flush()
+            return None
+        return self.emitter.getvalue()
+
+    def generate_statements(self, statements, symbol_table, declared=()):
+        """
+        Return the C code of top-level statements of a program without
+        functions, as generate() emits them inside main() once the symbols
+        in declared have been declared by the statements before them.
+        Joined by newlines between the two halves of program_frame(), the
+        code of consecutive runs of statements gives the whole program.
+        """
+        self.reset()
+        self.emitter = CEmitter()
+        self.symbol_table = symbol_table
+        self.declared = set(declared)
+        self.indent_level = 1
+        for statement in statements:
+            self.visit(statement)
+        return self.emitter.getvalue()
+
+    def program_frame(self):
+        """
+        Return the C code generate() emits before and after the statements
+        of a program without functions.
+        """
+        self.reset()
+        self.emitter = CEmitter()
+        self._open_main(())
+        head = self.emitter.getvalue()
+        self.emitter = CEmitter()
+        self._close_main(())
+        tail = self.emitter.getvalue()
+        self.reset()
+        return head, tail
+
+    def reset(self):
+        """
+        Drop the output and symbols of the previous generation, including
+        one that failed halfway through.
+        """
+        self.emitter = None
+        self.indent_level = 0
+        self.current_function = None
+        self.symbol_table = SymbolTable()
+        self.declared = set()
+        self._shared = None
+        self._infix = {}
 
     # --------------------------
     # Visitor Pattern Dispatcher
     # --------------------------
     def visit(self, node):
-        method_name = f'visit_{type(node).__name__}'
-        method = getattr(self, method_name, self.generic_visit)
-        return method(node)
+        return self._visitors[node.kind](node)
 
     def generic_visit(self, node):
         raise Exception(f"No visit method for {type(node).__name__}")
@@ -29,33 +149,45 @@ class CodeGenerator:
     # AST Node Handlers
     # --------------------------
     def visit_ProgramNode(self, node):
+        functions = [stmt for stmt in node.statements if isinstance(stmt, ast_nodes.FunctionNode)]
+        self._open_main(functions)
+        
+        for stmt in node.statements:
+            if not isinstance(stmt, ast_nodes.FunctionNode):
+                self.visit(stmt)
+        
+        self._close_main(functions)
+
+    def _open_main(self, functions):
         self._add_line("#include <stdio.h>")
-        self._add_line("#include <stdlib.h>\n")
+        self._add_line("#include <stdlib.h>")
+        self._add_line("#include <stdbool.h>")
+        self._add_line("#include <string.h>\n")
         
         # Generate forward declarations first
-        for stmt in node.statements:
-            if isinstance(stmt, ast_nodes.FunctionNode):
-                self._add_line(f"int {stmt.name}({self._gen_params(stmt.params)});")
+        for function in functions:
+            self._add_line(f"int {function.name}({self._gen_params(function.params)});")
         
         self._add_line("\n// Main Program")
         self._add_line("int main() {")
         self.indent_level += 1
-        
-        for stmt in node.statements:
-            if not isinstance(stmt, ast_nodes.FunctionNode):
-                self.visit(stmt)
-        
+
+    def _close_main(self, functions):
         self.indent_level -= 1
         self._add_line("return 0;")
         self._add_line("}\n")
         
         # Generate functions
-        for stmt in node.statements:
-            if isinstance(stmt, ast_nodes.FunctionNode):
-                self.visit(stmt)
+        for function in functions:
+            self.visit(function)
 
     def visit_FunctionNode(self, node):
         self.current_function = node.name
+        self.symbol_table.enter_function(node.name)
+        self._infix = {}  # Names may resolve differently in the function's scope
+        for param in node.params:
+            symbol = self.symbol_table.resolve(param) or self.symbol_table.declare(param, "int")
+            self.declared.add(symbol)
         params = ", ".join([f"int {param}" for param in node.params])
         
         self._add_line(f"\nint {node.name}({params}) {{")
@@ -72,24 +204,30 @@ class CodeGenerator:
         
         self.indent_level -= 1
         self._add_line("}")
+        self.symbol_table.exit_function()
+        self._infix = {}
         self.current_function = None
 
     def visit_AssignmentNode(self, node):
         var_name = node.identifier.name
         expr_value = self.visit(node.expression)
         
-        # Track variable types (simplified - assumes int unless specified)
-        if var_name not in self.symbol_table:
-            self.symbol_table[var_name] = 'int'
-            self._add_line(f"int {var_name} = {expr_value};")
+        symbol = self._symbol(node.identifier, node.expression)
+        if symbol not in self.declared:
+            self.declared.add(symbol)
+            self._add_line(f"{self._declaration(symbol.type, var_name)} = {expr_value};")
         else:
             self._add_line(f"{var_name} = {expr_value};")
 
     def visit_PrintNode(self, node):
+        expr_type = self._expression_type(node.expression)
         expr_value = self.visit(node.expression)
-        self._add_line(f'printf("%d\\n", {expr_value});')
+        if expr_type == "bool":
+            expr_value = f'{expr_value} ? "true" : "false"'
+        self._add_line(f'printf("{PRINTF_FORMATS.get(expr_type, "%d")}\\n", {expr_value});')
 
     def visit_IfNode(self, node):
+        self._declare_assigned(node.then_block + (node.else_block or []))
         condition = self.visit(node.condition)
         self._add_line(f"if ({condition}) {{")
         self.indent_level += 1
@@ -107,48 +245,136 @@ class CodeGenerator:
         self._add_line("}")
 
     def visit_WhileNode(self, node):
+        self._declare_assigned(node.body)
         condition = self.visit(node.condition)
-        loop_start = self._new_label()
-        loop_end = self._new_label()
-        
-        self._add_line(f"{loop_start}:")
-        self._add_line(f"if (!({condition})) goto {loop_end};")
+        body = node.body
+        step = self._counted_loop_step(node)
+        if step is not None:
+            # The increment ends the body, so it can move into the for header
+            self._add_line(f"for (; {condition}; {step}) {{")
+            body = body[:-1]
+        else:
+            self._add_line(f"while ({condition}) {{")
         self.indent_level += 1
         
-        for stmt in node.body:
+        for stmt in body:
             self.visit(stmt)
         
-        self._add_line(f"goto {loop_start};")
         self.indent_level -= 1
-        self._add_line(f"{loop_end}:")
+        self._add_line("}")
+
+    def visit_ReturnNode(self, node):
+        ret_val = self.visit(node.expression)
+        self._add_line(f"return {ret_val};")
 
     def visit_BinaryOpNode(self, node):
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        return f"({left} {node.operator} {right})"
+        return "".join(infix_parts(node, self.visit, self._shared, self._infix))
 
     def visit_NumberNode(self, node):
         return str(node.value)
 
+    def visit_StringNode(self, node):
+        return '"' + node.value.replace('"', '\\"') + '"'
+
+    def visit_BooleanNode(self, node):
+        return "true" if node.value else "false"
+
     def visit_IdentifierNode(self, node):
-        if node.name not in self.symbol_table:
+        if self._symbol(node) not in self.declared:
             raise CodegenError(f"Undefined variable '{node.name}'")
         return node.name
 
     def visit_ConditionNode(self, node):
-        left = self.visit(node.left)
-        right = self.visit(node.right)
-        return f"({left} {node.operator} {right})"
+        if self._expression_type(node.left) == "string":
+            # Compare contents, not pointers
+            return f"(strcmp({self.visit(node.left)}, {self.visit(node.right)}) {node.operator} 0)"
+        return "".join(infix_parts(node, self.visit, self._shared, self._infix))
 
     # --------------------------
     # Helper Methods
     # --------------------------
     def _add_line(self, text):
-        self.output.append("    " * self.indent_level + text)
+        self.emitter.line(self.indent_level, text)
 
-    def _new_label(self):
-        self.label_counter += 1
-        return f"label_{self.label_counter}"
+    def _declare_assigned(self, statements):
+        """
+        Declare variables first assigned inside a block before the block
+        opens, so they stay in scope after it as they do in KJPL.
+        """
+        stack = list(reversed(statements))
+        while stack:
+            stmt = stack.pop()
+            if isinstance(stmt, ast_nodes.AssignmentNode):
+                symbol = self._symbol(stmt.identifier, stmt.expression)
+                if symbol not in self.declared:
+                    self.declared.add(symbol)
+                    zero = ZERO_VALUES.get(symbol.type, "0")
+                    self._add_line(f"{self._declaration(symbol.type, symbol.name)} = {zero};")
+            elif isinstance(stmt, ast_nodes.IfNode):
+                stack += reversed(stmt.then_block + (stmt.else_block or []))
+            elif isinstance(stmt, ast_nodes.WhileNode):
+                stack += reversed(stmt.body)
+
+    def _symbol(self, identifier, expression=None):
+        """
+        Return the Symbol an IdentifierNode refers to. Semantic analysis has
+        usually resolved it already; otherwise (e.g. for an AST restored
+        from the stage cache) resolve it by name once and keep the result.
+        An assignment target unknown to the table is declared with the
+        type of the expression assigned to it.
+        """
+        symbol = identifier.symbol
+        if symbol is None:
+            symbol = self.symbol_table.resolve(identifier.name)
+            if symbol is None and expression is not None:
+                symbol = self.symbol_table.declare(identifier.name, self._expression_type(expression))
+            identifier.symbol = symbol
+        return symbol
+
+    def _expression_type(self, node):
+        """
+        Return the KJPL type of a checked expression. Semantic analysis
+        guarantees both operands of an operator have the same type, so the
+        leftmost operand decides.
+        """
+        while node.kind in OPERATOR_KINDS:
+            node = node.left
+        if node.kind == ast_nodes.IdentifierNode.kind:
+            symbol = self._symbol(node)
+            return symbol.type if symbol is not None else "int"
+        return literal_type(node)
+
+    @staticmethod
+    def _declaration(var_type, name):
+        c_type = C_TYPES.get(var_type, "int")
+        return f"{c_type}{name}" if c_type.endswith("*") else f"{c_type} {name}"
+
+    def _counted_loop_step(self, node):
+        """
+        Return the C increment if the loop is `while (i <op> n) { ...; i = i +/- c; }`
+        with a constant c, else None.
+        """
+        condition = node.condition
+        if not node.body or not isinstance(condition.left, ast_nodes.IdentifierNode):
+            return None
+        counter = condition.left.name
+        last = node.body[-1]
+        if not isinstance(last, ast_nodes.AssignmentNode) or last.identifier.name != counter:
+            return None
+        expression = last.expression
+        if not (
+            isinstance(expression, ast_nodes.BinaryOpNode)
+            and expression.operator in ("+", "-")
+            and isinstance(expression.left, ast_nodes.IdentifierNode)
+            and expression.left.name == counter
+            and isinstance(expression.right, ast_nodes.NumberNode)
+            and type(expression.right.value) is int
+        ):
+            return None
+        step = expression.right.value
+        if step == 1:
+            return f"{counter}{expression.operator * 2}"
+        return f"{counter} {expression.operator}= {step}"
 
     def _gen_params(self, params):
         return ", ".join([f"int {p}" for p in params])
@@ -164,8 +390,6 @@ class CodegenError(Exception):
 # --------------------------
 if __name__ == "__main__":
     # Sample AST for testing
-    from parser import ast_nodes
-
     ast = ast_nodes.ProgramNode(statements=[
         ast_nodes.FunctionNode(
             name="add",
@@ -1,103 +1,590 @@
+import contextlib
 import logging
-from lexer import lexer
-from parser import parser
-from semantic import SemanticAnalyzer
-from codegen import CodeGenerator
+import queue
+import time
+from lexer import lexer, LEXER_VERSION, dump_tokens, load_tokens
+import fastlexer
+from parser import parser, clone_parser, PARSER_VERSION, ExpressionInterner, ast_nodes, dump_ast, load_ast
+import rdparser
+from semantic import SemanticAnalyzer, SEMANTIC_VERSION
+from optimizer import ConstantFolder, OPTIMIZER_VERSION
+from codegen import CodeGenerator, CODEGEN_VERSION
+from ir import lower_program, emit_c, LoweringError, IR_VERSION
+from ir_passes import optimize_cfg
+import vm
+from cache import CompilationCache
+from metrics import CompilationMetrics
+from visitor import count_nodes
+
+__version__ = "0.1.0"
 
 # --------------------------
 # Logger Setup
 # --------------------------
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("compiler.log"),
-        logging.StreamHandler()
-    ]
-)
+# Importing the compiler installs no handlers: until the application
+# configures logging, the per-stage INFO lines cost a level check each.
 logger = logging.getLogger(__name__)
 
+
+def configure_logging(level=logging.INFO, log_file="compiler.log"):
+    """
+    Send compiler logs to stderr and log_file, as the command line does.
+    """
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    logging.basicConfig(
+        level=level,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        handlers=handlers,
+    )
+
+# --------------------------
+# Per-Compilation State
+# --------------------------
+class CompilationContext:
+    """
+    The mutable objects a single compilation works with: a lexer and parser
+    cloned from shared templates (the clones share the lexer and LALR
+    tables), a semantic analyzer and a code generator.
+
+    A context serves one compilation at a time. It can be reused for the
+    next one after reset(), since nothing in it outlives a compilation.
+    """
+
+    def __init__(self, lexer_template, parser_template):
+        self.lexer = lexer_template.clone()
+        self.lexer.lineno = 1
+        self.parser = clone_parser(parser_template)
+        self.semantic_analyzer = SemanticAnalyzer()
+        self.code_generator = CodeGenerator()
+        self.metrics = None   # CompilationMetrics of the compilation, if instrumented
+        self.profiler = None  # CompilationProfiler of the compilation, if profiled
+        self.shared = None    # Expression nodes the parser hash-consed, if interning
+
+    def reset(self):
+        """
+        Drop everything the last compilation left behind.
+        """
+        self.lexer.input("")
+        self.lexer.lineno = 1
+        self.metrics = None
+        self.shared = None
+        self.semantic_analyzer.reset()
+        self.code_generator.reset()
+
 # --------------------------
 # Compiler Class
 # --------------------------
 class KJPLCompiler:
-    def __init__(self):
-        self.lexer = lexer
+    # Errors replayed from cached diagnostics
+    CACHEABLE_ERRORS = {
+        "ValueError": ValueError,
+        "SyntaxError": SyntaxError,
+    }
+
+    # Implementation version of each stage, in pipeline order
+    STAGE_VERSIONS = {
+        "lexical": LEXER_VERSION,
+        "syntax": PARSER_VERSION,
+        "semantic": SEMANTIC_VERSION,
+        "optimization": OPTIMIZER_VERSION,
+        "ir": IR_VERSION,
+        "codegen": CODEGEN_VERSION,
+    }
+
+    # Version of whole compilations for the output cache: changes whenever
+    # any stage does, so a persistent cache never serves stale C
+    OUTPUT_VERSION = __version__ + "+" + ".".join(f"{stage}{version}" for stage, version in STAGE_VERSIONS.items())
+
+    # Names in self.options that affect the output of each stage
+    STAGE_OPTIONS = {
+        "lexical": (),
+        "syntax": ("parser_backend",),
+        "semantic": (),
+        "optimization": ("opt_level",),
+        "ir": ("opt_level",),
+        "codegen": (),
+    }
+
+    # Interchangeable lexers; both produce identical token streams
+    LEXER_BACKENDS = ("ply", "fast")
+
+    # Parsers that build identical ASTs from valid programs. On a syntax
+    # error "ply" reports it and recovers by discarding input, while "rd"
+    # (rdparser) raises SyntaxError, so the choice is part of the options.
+    PARSER_BACKENDS = ("ply", "rd")
+
+    # 0: emit the AST as written; 1: constant folding and dead-branch pruning;
+    # 2: level 1, then lowering to three-address IR with dataflow optimizations
+    OPT_LEVELS = (0, 1, 2)
+
+    def __init__(self, cache=None, stage_cache=None, lexer_backend="ply", opt_level=0, pooled=False, metrics=None,
+                 parser_backend="ply", intern_expressions=False):
+        if lexer_backend not in self.LEXER_BACKENDS:
+            raise ValueError(f"Unknown lexer backend '{lexer_backend}'. Expected one of {self.LEXER_BACKENDS}.")
+        if parser_backend not in self.PARSER_BACKENDS:
+            raise ValueError(f"Unknown parser backend '{parser_backend}'. Expected one of {self.PARSER_BACKENDS}.")
+        if opt_level not in self.OPT_LEVELS:
+            raise ValueError(f"Unknown optimization level {opt_level!r}. Expected one of {self.OPT_LEVELS}.")
+        self.lexer = lexer              # Templates cloned for each compilation
+        self.lexer_backend = lexer_backend
         self.parser = parser
-        self.semantic_analyzer = SemanticAnalyzer()
-        self.code_generator = CodeGenerator()
+        self.metrics = metrics          # Optional MetricsRegistry every compile is added to
+        self.cache = cache              # Optional CompilationCache for whole outputs
+        self.stage_cache = stage_cache  # Optional CompilationCache for stage results
+        self.options = {                # Options that affect the generated code
+            "opt_level": opt_level,
+            "parser_backend": parser_backend,
+            # Hash-cons expressions while parsing (see parser.ExpressionInterner):
+            # the same C, with memory and analysis time that scale with the
+            # distinct subexpressions of repetitive, machine-generated programs
+            "intern_expressions": intern_expressions,
+        }
+        # Idle CompilationContexts kept for reuse; None builds one per compilation
+        self._pool = queue.LifoQueue() if pooled else None
 
-    def compile(self, source_code):
+    def compile(self, source_code, out=None, metrics=None, profiler=None):
         """
         Compile KJPL source code into C code.
+
+        Compilations share no mutable state besides the caches and the
+        metrics registry, which are locked, so one compiler may be used from
+        several threads at once.
+
+        With out (a text stream such as an open file), the C code is written
+        to it as it is generated and None is returned. Streamed output is not
+        stored in the compilation caches, though cache hits are still served.
+
+        With metrics (a CompilationMetrics), the time and memory spent in
+        each stage are recorded in it. With profiler (a CompilationProfiler),
+        the compilation bypasses the caches and its time is attributed to
+        lexer rules, grammar productions and visitor methods.
         """
+        return self._instrumented(metrics, self._compile_cached, source_code, out, profiler)
+
+    def _compile_cached(self, source_code, out, profiler, metrics):
+        if self.cache is None or profiler is not None:
+            return self._compile(source_code, out, metrics, profiler)
+
+        key = CompilationCache.make_key(source_code, self.OUTPUT_VERSION, self.options)
+        entry = self.cache.get(key)
+        if entry is not None:
+            logger.info("Compilation cache hit.")
+            if metrics is not None:
+                metrics.cache_hit = True
+            if entry["error"] is not None:
+                raise self.CACHEABLE_ERRORS[entry["error_type"]](entry["error"])
+            return self._deliver(entry["c_code"], out)
+        if out is not None:
+            return self._compile(source_code, out, metrics)
+
+        start = time.process_time()
+        try:
+            c_code = self._compile(source_code, None, metrics)
+        except tuple(self.CACHEABLE_ERRORS.values()) as e:
+            self.cache.put(key, {
+                "c_code": None,
+                "error": str(e),
+                "error_type": type(e).__name__,
+                "cpu_time": time.process_time() - start,
+            })
+            raise
+        self.cache.put(key, {
+            "c_code": c_code,
+            "error": None,
+            "error_type": None,
+            "cpu_time": time.process_time() - start,
+        })
+        return c_code
+
+    def _compile(self, source_code, out=None, metrics=None, profiler=None):
+        """
+        Run every compilation stage on the source code.
+        """
+        with self._context(metrics, profiler) as context:
+            if self.stage_cache is not None and profiler is None:
+                return self._compile_staged(context, source_code, out)
+            return self._compile_unstaged(context, source_code, out)
+
+    def _compile_unstaged(self, context, source_code, out=None):
         try:
             logger.info("Starting compilation process...")
 
             # Step 1: Lexical Analysis
             logger.info("Running lexical analysis...")
-            tokens = self._lexical_analysis(source_code)
+            tokens = self._stage(context, "lexical", self._lexical_analysis, context, source_code)
             logger.info("Lexical analysis completed successfully.")
 
             # Step 2: Syntax Analysis
             logger.info("Running syntax analysis...")
-            ast = self._syntax_analysis(tokens)
+            ast = self._stage(context, "syntax", self._syntax_analysis, context, tokens)
             logger.info("Syntax analysis completed successfully.")
 
             # Step 3: Semantic Analysis
             logger.info("Running semantic analysis...")
-            self._semantic_analysis(ast)
+            self._stage(context, "semantic", self._semantic_analysis, context, ast)
             logger.info("Semantic analysis completed successfully.")
 
-            # Step 4: Code Generation
+            # Step 4: Optimization
+            ast = self._stage(context, "optimization", self._optimization, context, ast)
+
+            # Step 5: Code Generation
             logger.info("Generating target code...")
-            c_code = self._code_generation(ast)
+            c_code = self._code_generation(context, ast, out)
             logger.info("Code generation completed successfully.")
 
             logger.info("Compilation process completed successfully.")
             return c_code
 
         except Exception as e:
-            logger.error(f"Compilation failed: {e}")
+            logger.error("Compilation failed: %s", e)
             raise
 
-    def _lexical_analysis(self, source_code):
+    def compile_bytecode(self, source_code, metrics=None, profiler=None):
+        """
+        Compile KJPL source code into a vm.Code object for vm.run(), which
+        executes it without a C compiler. The front end and the AST
+        optimizations are the same as for compile(); the IR passes of
+        opt_level 2 are not applied. The compilation caches are not used.
+        """
+        return self._instrumented(metrics, self._compile_bytecode, source_code, profiler)
+
+    def _compile_bytecode(self, source_code, profiler, metrics):
+        with self._context(metrics, profiler) as context:
+            try:
+                logger.info("Starting bytecode compilation...")
+                tokens = self._stage(context, "lexical", self._lexical_analysis, context, source_code)
+                ast = self._stage(context, "syntax", self._syntax_analysis, context, tokens)
+                self._stage(context, "semantic", self._semantic_analysis, context, ast)
+                ast = self._stage(context, "optimization", self._optimization, context, ast)
+                code = self._stage(
+                    context, "bytecode", vm.compile_program, ast, context.semantic_analyzer.symbol_table,
+                )
+                logger.info("Bytecode compilation completed successfully.")
+                return code
+            except Exception as e:
+                logger.error("Compilation failed: %s", e)
+                raise
+
+    def compile_stream(self, stream, chunk_size=1 << 16, out=None, metrics=None, profiler=None):
+        """
+        Compile KJPL source read incrementally from a file object or mmap.
+
+        Tokens are produced by fastlexer.tokenize_stream and fed to the parser
+        as they are scanned, so neither the source text nor the token list is
+        held in memory; with out, the C code is streamed too (see compile).
+        The compilation caches are not consulted. Lexing is timed as part
+        of the syntax stage.
+        """
+        return self._instrumented(metrics, self._compile_stream, stream, chunk_size, out, profiler)
+
+    def _compile_stream(self, stream, chunk_size, out, profiler, metrics):
+        with self._context(metrics, profiler) as context:
+            return self._compile_stream_in(context, stream, chunk_size, out)
+
+    def _compile_stream_in(self, context, stream, chunk_size, out):
+        try:
+            logger.info("Starting streaming compilation process...")
+
+            # Steps 1-2: Lexical and Syntax Analysis, interleaved
+            logger.info("Running lexical and syntax analysis...")
+            tokens = fastlexer.tokenize_stream(stream, chunk_size)
+            if context.metrics is not None:
+                tokens = context.metrics.count_tokens(tokens)
+            ast = self._stage(context, "syntax", self._syntax_analysis, context, tokens)
+            logger.info("Syntax analysis completed successfully.")
+
+            # Step 3: Semantic Analysis
+            logger.info("Running semantic analysis...")
+            self._stage(context, "semantic", self._semantic_analysis, context, ast)
+            logger.info("Semantic analysis completed successfully.")
+
+            # Step 4: Optimization
+            ast = self._stage(context, "optimization", self._optimization, context, ast)
+
+            # Step 5: Code Generation
+            logger.info("Generating target code...")
+            c_code = self._code_generation(context, ast, out)
+            logger.info("Code generation completed successfully.")
+
+            logger.info("Compilation process completed successfully.")
+            return c_code
+
+        except Exception as e:
+            logger.error("Compilation failed: %s", e)
+            raise
+
+    # --------------------------
+    # Stage-Level Caching
+    # --------------------------
+    def _compile_staged(self, context, source_code, out=None):
+        """
+        Run the pipeline, reusing any stage result cached for this source.
+
+        Stage keys are chained (each one hashes the previous key), so a stage
+        is only reused when every earlier stage would have produced the same
+        result. Later stages are looked up first so earlier ones can be
+        skipped entirely.
+        """
+        try:
+            logger.info("Starting compilation process...")
+            keys = self._stage_keys(source_code)
+
+            entry = self.stage_cache.get(keys["codegen"])
+            if entry is not None:
+                logger.info("Code generation reused from stage cache.")
+                self._stage_reused(context, "codegen")
+                return self._deliver(entry["c_code"], out)
+
+            # Steps 1-2: Lexical and Syntax Analysis
+            entry = self.stage_cache.get(keys["syntax"])
+            if entry is not None:
+                logger.info("Syntax analysis reused from stage cache.")
+                self._stage_reused(context, "syntax")
+                ast = load_ast(entry["ast"])
+            else:
+                entry = self.stage_cache.get(keys["lexical"])
+                if entry is not None:
+                    logger.info("Lexical analysis reused from stage cache.")
+                    self._stage_reused(context, "lexical")
+                    tokens = load_tokens(entry["tokens"])
+                else:
+                    logger.info("Running lexical analysis...")
+                    tokens = self._stage(context, "lexical", self._lexical_analysis, context, source_code)
+                    self.stage_cache.put(keys["lexical"], {"tokens": dump_tokens(tokens)})
+                    logger.info("Lexical analysis completed successfully.")
+
+                logger.info("Running syntax analysis...")
+                ast = self._stage(context, "syntax", self._syntax_analysis, context, tokens)
+                self.stage_cache.put(keys["syntax"], {"ast": dump_ast(ast)})
+                logger.info("Syntax analysis completed successfully.")
+
+            # Step 3: Semantic Analysis
+            semantic_analyzer = context.semantic_analyzer
+            entry = self.stage_cache.get(keys["semantic"])
+            if entry is not None:
+                logger.info("Semantic analysis reused from stage cache.")
+                self._stage_reused(context, "semantic")
+                semantic_analyzer.load_state(entry["state"])
+            else:
+                logger.info("Running semantic analysis...")
+                self._stage(context, "semantic", semantic_analyzer.analyze, ast, None, context.shared)
+                self.stage_cache.put(keys["semantic"], {"state": semantic_analyzer.dump_state()})
+            self._raise_semantic_errors(semantic_analyzer.errors)
+            logger.info("Semantic analysis completed successfully.")
+
+            # Step 4: Optimization
+            ast = self._stage(context, "optimization", self._optimization, context, ast)
+
+            # Step 5: Code Generation
+            logger.info("Generating target code...")
+            c_code = self._code_generation(context, ast, out)
+            if out is None:
+                self.stage_cache.put(keys["codegen"], {"c_code": c_code})
+            logger.info("Code generation completed successfully.")
+
+            logger.info("Compilation process completed successfully.")
+            return c_code
+
+        except Exception as e:
+            logger.error("Compilation failed: %s", e)
+            raise
+
+    def _stage_keys(self, source_code):
+        """
+        Compute the chained cache key of every stage for this source.
+        """
+        keys = {}
+        previous = source_code
+        for stage, version in self.STAGE_VERSIONS.items():
+            options = {name: self.options.get(name) for name in self.STAGE_OPTIONS[stage]}
+            previous = CompilationCache.make_key(previous, f"{stage}:{version}", options)
+            keys[stage] = previous
+        return keys
+
+    # --------------------------
+    # Instrumentation
+    # --------------------------
+    def _instrumented(self, metrics, compile_function, *args):
+        """
+        Call compile_function(*args, metrics), measuring the compilation when
+        the caller passed metrics or the compiler has a registry.
+        """
+        if metrics is None and self.metrics is not None:
+            metrics = CompilationMetrics(self.metrics.track_memory)
+        if metrics is None:
+            return compile_function(*args, None)
+
+        metrics.begin()
+        error = None
+        try:
+            return compile_function(*args, metrics)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            metrics.end(error)
+            if self.metrics is not None:
+                self.metrics.record(metrics)
+
+    def _stage(self, context, stage, function, *args):
+        """
+        Run one stage, measuring it if the compilation is instrumented.
+        """
+        if context.profiler is not None:
+            function = context.profiler.wrap("stage", stage, function)
+        metrics = context.metrics
+        if metrics is None:
+            return function(*args)
+        result = metrics.measure(stage, function, *args)
+        # Counted outside the measured call so the counting is not timed
+        if stage == "lexical":
+            metrics.tokens = len(result)
+        elif stage == "syntax":
+            metrics.ast_nodes = count_nodes(result)
+        return result
+
+    def _stage_reused(self, context, stage):
+        if context.metrics is not None:
+            context.metrics.reused(stage)
+
+    # --------------------------
+    # Per-Compilation State
+    # --------------------------
+    @contextlib.contextmanager
+    def _context(self, metrics=None, profiler=None):
+        """
+        Provide the CompilationContext for one compilation: a new one, or in
+        pooled mode an idle one from the pool (built on demand when every
+        pooled context is busy), reset and put back once the compilation
+        is over. A profiled compilation always gets a new context, which the
+        profiler instruments and which is never pooled.
+        """
+        if self._pool is None or profiler is not None:
+            context = CompilationContext(self.lexer, self.parser)
+            context.metrics = metrics
+            if profiler is not None:
+                context.profiler = profiler
+                profiler.instrument(context)
+            yield context
+            return
+        try:
+            context = self._pool.get_nowait()
+        except queue.Empty:
+            context = CompilationContext(self.lexer, self.parser)
+        context.metrics = metrics
+        try:
+            yield context
+        finally:
+            context.reset()
+            self._pool.put(context)
+
+    # --------------------------
+    # Pipeline Stages
+    # --------------------------
+    def _lexical_analysis(self, context, source_code):
         """
         Tokenize the source code.
         """
-        self.lexer.input(source_code)
-        tokens = list(self.lexer)
+        if self.lexer_backend == "fast":
+            tokens = list(fastlexer.tokenize(source_code))
+        else:
+            context.lexer.input(source_code)
+            tokens = list(context.lexer)
         if not tokens:
             raise ValueError("No tokens generated. Source code may be empty or invalid.")
         return tokens
 
-    def _syntax_analysis(self, tokens):
+    def _syntax_analysis(self, context, tokens):
         """
-        Parse tokens into an Abstract Syntax Tree (AST).
+        Parse tokens into an Abstract Syntax Tree (AST). When interning, the
+        interner is dropped once the AST is built; only its set of shared
+        nodes is kept, for the later stages to memoize on.
         """
-        ast = self.parser.parse(source_code)
+        nodes = ExpressionInterner() if self.options["intern_expressions"] else ast_nodes
+        context.shared = None if nodes is ast_nodes else nodes.shared
+        if self.options["parser_backend"] == "rd":
+            return rdparser.parse(tokens, nodes)
+        token_iter = iter(tokens)
+        context.parser.node_factory = nodes
+        try:
+            ast = context.parser.parse(lexer=context.lexer, tokenfunc=lambda: next(token_iter, None))
+        finally:
+            context.parser.node_factory = ast_nodes
         if not ast:
             raise SyntaxError("Failed to generate AST. Invalid syntax.")
         return ast
 
-    def _semantic_analysis(self, ast):
+    def _semantic_analysis(self, context, ast):
         """
         Perform semantic checks on the AST.
         """
-        errors = self.semantic_analyzer.analyze(ast)
+        errors = context.semantic_analyzer.analyze(ast, shared=context.shared)
+        self._raise_semantic_errors(errors)
+
+    def _raise_semantic_errors(self, errors):
         if errors:
             error_msg = "\n".join(errors)
             raise ValueError(f"Semantic errors found:\n{error_msg}")
 
-    def _code_generation(self, ast):
+    def _optimization(self, context, ast):
+        """
+        Simplify the AST according to the optimization level.
+        """
+        if self.options["opt_level"] == 0:
+            return ast
+        logger.info("Running optimization passes...")
+        return ConstantFolder(context.semantic_analyzer.symbol_table).optimize(ast)
+
+    def _code_generation(self, context, ast, out=None):
         """
-        Generate C code from the AST.
+        Generate C code from the AST, or stream it to out. At opt_level 2
+        the code is emitted from the optimized IR when the program can be
+        lowered to it.
         """
-        c_code = self.code_generator.generate(ast)
+        cfg = self._stage(context, "ir", self._lower_to_ir, ast) if self.options["opt_level"] >= 2 else None
+        return self._stage(context, "codegen", self._emit, context, ast, cfg, out)
+
+    def _emit(self, context, ast, cfg, out):
+        code_generator = context.code_generator
+        symbol_table = context.semantic_analyzer.symbol_table
+        if out is not None:
+            if cfg is not None:
+                emit_c(cfg, out)
+            else:
+                code_generator.generate(ast, out, symbol_table, context.shared)
+            return None
+        if cfg is not None:
+            c_code = emit_c(cfg)
+        else:
+            c_code = code_generator.generate(ast, symbol_table=symbol_table, shared=context.shared)
         if not c_code:
             raise ValueError("Failed to generate target code.")
         return c_code
 
+    def _lower_to_ir(self, ast):
+        """
+        Lower the AST to three-address IR and optimize it, or return None
+        if the program uses constructs the IR does not model.
+        """
+        try:
+            cfg = lower_program(ast)
+        except LoweringError as e:
+            logger.info("Skipping IR optimizations: %s", e)
+            return None
+        logger.info("Running IR optimization passes...")
+        return optimize_cfg(cfg)
+
+    def _deliver(self, c_code, out):
+        """
+        Return cached C code, or write it to out when streaming.
+        """
+        if out is None:
+            return c_code
+        out.write(c_code)
+        return None
+
 # --------------------------
 # Main Function
 # --------------------------
@@ -112,13 +599,14 @@ def main():
     """
 
     # Initialize and run the compiler
+    configure_logging()
     compiler = KJPLCompiler()
     try:
         c_code = compiler.compile(source_code)
         print("Generated C Code:\n")
         print(c_code)
     except Exception as e:
-        logger.error(f"Compilation failed: {e}")
+        logger.error("Compilation failed: %s", e)
 
 if __name__ == "__main__":
     main()
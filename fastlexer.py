@@ -0,0 +1,140 @@
+# fastlexer.py
+import codecs
+import re
+import lexer as ply_lexer
+from lexer import tokens, reserved
+
+# -------------------------------------
+# Token Representation
+# -------------------------------------
+class Token:
+    """
+    A token with the attributes the PLY parser reads, so tokens can be fed
+    to parser.parse() directly. PLY's error recovery sets `lexer` on the
+    token it fails at, so that is a slot as well.
+    """
+    __slots__ = ("type", "value", "lineno", "lexpos", "lexer")
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return f"Token({self.type!r}, {self.value!r}, {self.lineno}, {self.lexpos})"
+
+# -------------------------------------
+# Master Regex
+# -------------------------------------
+# Alternatives are tried in the same order ply.lex uses for lexer.py: the
+# function rules in definition order, then the string rules longest pattern
+# first, and finally any single character as an error. Ignored characters
+# are consumed as a prefix of every match, and newlines absorb the
+# whitespace that follows them, so blanks never cost a match of their own.
+_FUNCTION_RULES = (
+    "IDENTIFIER", "FLOAT_NUMBER", "INTEGER", "STRING_LITERAL",
+    "SINGLE_LINE_COMMENT", "MULTI_LINE_COMMENT",
+)
+
+_STRING_RULES = sorted(
+    (name for name in tokens if isinstance(getattr(ply_lexer, f"t_{name}", None), str)),
+    key=lambda name: len(getattr(ply_lexer, f"t_{name}")),
+    reverse=True,
+)
+
+def _build_master_regex():
+    ignore = "".join(re.escape(c) for c in ply_lexer.t_ignore)
+    parts = [f"(?P<{name}>{getattr(ply_lexer, f't_{name}').__doc__})" for name in _FUNCTION_RULES]
+    parts.append(f"(?P<newline>\\n[{ignore}\\n]*)")
+    parts += [f"(?P<{name}>{getattr(ply_lexer, f't_{name}')})" for name in _STRING_RULES]
+    parts.append("(?P<end>\\Z)")
+    parts.append("(?P<error>.)")
+    return re.compile(f"[{ignore}]*(?:" + "|".join(parts) + ")", re.VERBOSE)
+
+_master_regex = _build_master_regex()
+_simple_tokens = frozenset(_STRING_RULES)
+
+# -------------------------------------
+# Tokenizer
+# -------------------------------------
+def tokenize(data, lineno=1, start=0):
+    """
+    Yield Tokens for data, matching the ply lexer token-for-token.
+    Scanning begins at position start, which must not be inside a token;
+    lineno is the line number there.
+    """
+    yield from _scan(data, lineno, 0, final=True, start=start)
+
+def tokenize_stream(stream, chunk_size=1 << 16, encoding="utf-8"):
+    """
+    Yield Tokens for a text or binary file object or an mmap, reading
+    chunk_size units at a time. Only complete lines are scanned, so every
+    token except a /* */ comment ends inside the buffer; a comment still
+    open at the end of the buffer is carried over to the next chunk. Memory
+    is bounded by the chunk size plus the longest line or comment rather
+    than by the size of the input.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    buffer = ""
+    offset = 0              # Source position of buffer[0]
+    lineno = 1
+    open_comment = False    # buffer starts with an unterminated "/*"
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        buffer += chunk
+        if open_comment and "*/" not in buffer[-len(chunk) - 1:]:
+            continue  # Still inside the comment; nothing new to scan
+        cut = buffer.rfind("\n") + 1
+        if cut == 0:
+            continue  # No complete line yet
+        consumed, lineno = yield from _scan(buffer[:cut], lineno, offset, final=False)
+        open_comment = consumed < cut
+        buffer = buffer[consumed:]
+        offset += consumed
+
+    buffer += decoder.decode(b"", final=True)
+    yield from _scan(buffer, lineno, offset, final=True)
+
+def _scan(data, lineno, offset, final, start=0):
+    """
+    Yield tokens from data[start:], where data's first character is at
+    source position offset. Unless final, stop before a "/*" whose closing
+    "*/" is not in data yet. Returns (characters consumed, line number
+    reached).
+    """
+    for m in _master_regex.finditer(data, start):
+        kind = m.lastgroup
+        if kind == "IDENTIFIER":
+            value = m.group(kind)
+            yield Token(reserved.get(value.lower(), "IDENTIFIER"), value, lineno, offset + m.start(kind))
+        elif kind in _simple_tokens:
+            if kind == "DIVIDE" and not final and data.startswith("*", m.end()):
+                # The multi-line comment rule failed: its end is in a later chunk
+                return m.start(kind), lineno
+            yield Token(kind, m.group(kind), lineno, offset + m.start(kind))
+        elif kind == "newline":
+            lineno += m.group(kind).count("\n")
+        elif kind == "INTEGER":
+            yield Token("INTEGER", int(m.group(kind)), lineno, offset + m.start(kind))
+        elif kind == "FLOAT_NUMBER":
+            yield Token("FLOAT_NUMBER", float(m.group(kind)), lineno, offset + m.start(kind))
+        elif kind == "STRING_LITERAL":
+            value = m.group(kind)[1:-1].replace('\\"', '"').replace("\\'", "'")
+            yield Token("STRING_LITERAL", value, lineno, offset + m.start(kind))
+        elif kind == "MULTI_LINE_COMMENT":
+            lineno += m.group(kind).count("\n")
+        elif kind == "error":
+            print(f"Illegal character '{m.group(kind)}' at line {lineno}")
+        # SINGLE_LINE_COMMENT and end of input are skipped
+    return len(data), lineno
+
+def tokenize_input(input_text):
+    """
+    Same output as lexer.tokenize_input, produced by the fast backend.
+    """
+    return [{"type": t.type, "value": t.value, "line": t.lineno} for t in tokenize(input_text)]
@@ -0,0 +1,364 @@
+# incremental.py
+"""
+Incremental compilation for live editing. A CompilationSession holds one
+document, applies text edits to it and recompiles only what they affect.
+"""
+import bisect
+import itertools
+import operator
+
+import fastlexer
+from codegen import CodeGenerator
+from optimizer import ConstantFolder
+from parser import ast_nodes
+from rdparser import RecursiveDescentParser
+from semantic import SemanticAnalyzer
+from symbols import SymbolTable
+
+
+# -------------------------------------
+# Statements
+# -------------------------------------
+class _Statement:
+    """
+    One top-level statement of a session's document: its AST, or for a
+    stretch of text that failed to parse, None and the SyntaxError; the
+    line its first token was on when it was parsed; the variable names it
+    mentions; and the results of compiling it, together with the state of
+    those names it was compiled in.
+    """
+    __slots__ = (
+        "node", "error", "lineno", "names", "environment", "errors", "fragment", "declares", "c_declares", "replaced",
+    )
+
+    def __init__(self, node, lineno, error=None):
+        self.node = node
+        self.error = error
+        self.lineno = lineno
+        self.names = _names(node) if node is not None else ()
+        self.environment = None  # (type or None, declared in C) per name; None until compiled
+        self.errors = ()         # Semantic errors
+        self.fragment = ""       # C code, empty if it has errors or was optimized away, None if not generated
+        self.declares = ()       # (name, type) of the variables it declares
+        self.c_declares = ()     # Names of the variables its C code declares
+        self.replaced = []       # Declarations of compiled statements removed just before it
+
+    def declarations(self):
+        return self.declares + self.c_declares
+
+
+def _names(node):
+    """
+    Return the distinct identifiers under node in order of appearance.
+    """
+    names = {}
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if type(item) is list:
+            stack += reversed(item)
+        elif isinstance(item, ast_nodes.Node):
+            if item.kind == ast_nodes.IdentifierNode.kind:
+                names[item.name] = None
+            stack += reversed([getattr(item, field) for field in item._fields])
+    return tuple(names)
+
+
+def _count(counts, items, step):
+    for item in items:
+        count = counts.get(item, 0) + step
+        if count:
+            counts[item] = count
+        else:
+            del counts[item]
+
+
+def _shift_lines(node, delta):
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if type(item) is list:
+            stack += item
+        elif isinstance(item, ast_nodes.Node):
+            item.lineno += delta
+            stack += [getattr(item, field) for field in item._fields]
+
+
+def _common_prefix(a, b):
+    """
+    Return the length of the longest common prefix of two strings, by
+    bisecting on slice comparisons so the characters are compared in C.
+    """
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+# -------------------------------------
+# Session
+# -------------------------------------
+class CompilationSession:
+    """
+    A document being edited, compiled incrementally. compile() returns what
+    KJPLCompiler(parser_backend="rd", opt_level=opt_level).compile(text)
+    returns, or raises what it raises.
+
+    The document is kept as a list of top-level statements, each spanning
+    the text from its first token to the next statement's. An edit re-lexes
+    and re-parses from the statement it falls in (and the one before, whose
+    parse looked at the token after it) until a statement starts where an
+    old statement after the edit started; from there the old statements
+    are kept. Text that fails to parse is kept as a broken stretch, and the
+    first one is reported when compiling.
+
+    Each statement keeps its semantic errors, C fragment and declarations,
+    which depend only on the types of the variables it mentions and on
+    which of them the C code declared before it. compile() checks that
+    state for every statement and recompiles those it changed for. Apart
+    from that pass and joining the fragments, the work an edit causes is
+    proportional to the statements it touches, not to the document.
+
+    opt_level 2 is not supported: its IR passes work on the whole program.
+    """
+    OPT_LEVELS = (0, 1)
+
+    def __init__(self, text="", opt_level=0):
+        if opt_level not in self.OPT_LEVELS:
+            raise ValueError(f"Unsupported optimization level {opt_level!r}. Expected one of {self.OPT_LEVELS}.")
+        self.opt_level = opt_level
+        self.text = ""
+        self._statements = []  # _Statement per top-level statement, in order
+        self._lengths = []     # Characters from each statement's first token to the next statement's
+        self._lines = []       # Newlines in the same spans
+        self._prefix = 0       # Characters before the first statement
+        self._prefix_lines = 0
+        self._broken = 0       # Statements that failed to parse
+        self._analyzer = SemanticAnalyzer()
+        self._generator = CodeGenerator()
+        self._head, self._tail = self._generator.program_frame()
+
+        # Counters
+        self.edits = 0
+        self.statements_parsed = 0
+        self.statements_compiled = 0
+
+        self._apply(0, 0, text)
+
+    # --------------------------
+    # Editing
+    # --------------------------
+    def edit(self, offset, length, replacement):
+        """
+        Replace the length characters at offset with replacement.
+        """
+        if offset < 0 or length < 0 or offset + length > len(self.text):
+            raise ValueError(f"Edit ({offset}, {length}) is outside the document of {len(self.text)} characters.")
+        self.edits += 1
+        self._apply(offset, length, replacement)
+
+    def update(self, text):
+        """
+        Replace the document with text, as a single edit of the part that
+        differs (for clients that send the whole document every time).
+        """
+        prefix = _common_prefix(self.text, text)
+        suffix = _common_prefix(self.text[prefix:][::-1], text[prefix:][::-1])
+        if prefix == len(self.text) == len(text):
+            return
+        self.edit(prefix, len(self.text) - prefix - suffix, text[prefix:len(text) - suffix])
+
+    def _apply(self, offset, length, replacement):
+        starts = list(itertools.accumulate(self._lengths, initial=self._prefix))
+        count = len(self._statements)
+        end = offset + length
+        self.text = self.text[:offset] + replacement + self.text[end:]
+
+        containing = bisect.bisect_right(starts, offset, 0, count) - 1
+        first = max(containing - 1, 0)
+        resume = bisect.bisect_left(starts, end, 0, count)
+        self._reparse(first, resume, starts, len(replacement) - length)
+
+    def _reparse(self, first, resume, starts, delta):
+        """
+        Parse statements from statement first on until one starts where
+        statement resume or a later one started (starts are the positions
+        before the edit, which moved the statements from resume on by
+        delta), and put them in place of the statements they replace.
+        """
+        count = len(self._statements)
+        if first == 0:
+            restart, lineno = 0, 1
+        else:
+            restart, lineno = starts[first], 1 + self._prefix_lines + sum(self._lines[:first])
+        tokens = fastlexer.tokenize(self.text, lineno, restart)
+        parser = RecursiveDescentParser(tokens)
+
+        parsed = []  # (position, _Statement)
+        index = resume
+        token = parser.token
+        while token is not None:
+            while index < count and starts[index] + delta < token.lexpos:
+                index += 1
+            if index < count and starts[index] + delta == token.lexpos:
+                break  # Back in step with the old statements
+            try:
+                parsed.append((token.lexpos, _Statement(parser.statement(), token.lineno)))
+                token = parser.token
+            except SyntaxError as e:
+                # Skip to the next old statement the lexer reaches
+                parsed.append((token.lexpos, _Statement(None, token.lineno, e)))
+                token = parser.token
+                while token is not None:
+                    while index < count and starts[index] + delta < token.lexpos:
+                        index += 1
+                    if index < count and starts[index] + delta == token.lexpos:
+                        break
+                    token = next(tokens, None)
+                break
+        if token is None:
+            index = count
+
+        # Statements after the ones replaced must learn that their declarations are gone
+        replaced = []
+        for statement in self._statements[first:index]:
+            replaced += statement.replaced
+            if statement.environment is not None:
+                replaced += statement.declarations()
+            self._broken -= statement.node is None
+        if replaced and index < count:
+            self._statements[index].replaced += replaced
+        self._broken += sum(statement.node is None for _, statement in parsed)
+
+        positions = [position for position, _ in parsed]
+        positions.append(starts[index] + delta if index < count else len(self.text))
+        spans = list(zip(positions, positions[1:]))
+        self._statements[first:index] = [statement for _, statement in parsed]
+        self._lengths[first:index] = [stop - start for start, stop in spans]
+        self._lines[first:index] = [self.text.count("\n", start, stop) for start, stop in spans]
+        if first == 0:
+            self._prefix = positions[0]
+            self._prefix_lines = self.text.count("\n", 0, self._prefix)
+        self.statements_parsed += len(parsed)
+
+    # --------------------------
+    # Compiling
+    # --------------------------
+    def program(self):
+        """
+        Return the AST of the document, or raise its first syntax error.
+        """
+        self._check_syntax()
+        lineno = 1 + self._prefix_lines
+        for statement, lines in zip(self._statements, self._lines):
+            if statement.lineno != lineno:
+                # Lines were inserted or removed above since it was parsed
+                _shift_lines(statement.node, lineno - statement.lineno)
+                statement.lineno = lineno
+            lineno += lines
+        return ast_nodes.ProgramNode([statement.node for statement in self._statements], 1)
+
+    def compile(self):
+        """
+        Return the C code of the document.
+        """
+        self._check_syntax()
+        types = {}         # Variable -> KJPL type, declared by the statements so far
+        declared = set()   # Variables the C code has declared so far
+        errors = []
+        # Declarations made so far by this pass but not the last (count 1)
+        # or by the last but not this one (count -1). A statement whose names
+        # none of them mention sees the variables as it did last time.
+        changed = {}
+        changed_names = set()
+        try:
+            for statement in self._statements:
+                if statement.replaced:
+                    _count(changed, statement.replaced, -1)
+                    statement.replaced = []
+                    changed_names = {item if type(item) is str else item[0] for item in changed}
+                # Once a statement has errors compile() raises them, so
+                # code is no longer generated; a statement checked then is
+                # generated when a later pass gets to it without errors
+                generate = not errors
+                missing = generate and statement.fragment is None
+                if (
+                    missing or statement.environment is None
+                    or changed_names and not changed_names.isdisjoint(statement.names)
+                ):
+                    environment = tuple((types.get(name), name in declared) for name in statement.names)
+                    if missing or environment != statement.environment:
+                        if statement.environment is not None:
+                            _count(changed, statement.declarations(), -1)
+                        self._compile_statement(statement, environment, generate)
+                        _count(changed, statement.declarations(), 1)
+                        changed_names = {item if type(item) is str else item[0] for item in changed}
+                if statement.errors:
+                    errors += statement.errors
+                if statement.declares:
+                    types.update(statement.declares)
+                if statement.c_declares:
+                    declared.update(statement.c_declares)
+        except BaseException:
+            # The pass did not reach every statement, so none can be trusted
+            for statement in self._statements:
+                statement.environment = None
+                statement.replaced = []
+            raise
+        if errors:
+            error_msg = "\n".join(errors)
+            raise ValueError(f"Semantic errors found:\n{error_msg}")
+        fragments = filter(None, map(operator.attrgetter("fragment"), self._statements))
+        return "\n".join(itertools.chain((self._head,), fragments, (self._tail,)))
+
+    def _check_syntax(self):
+        if not self._statements:
+            raise ValueError("No tokens generated. Source code may be empty or invalid.")
+        if not self._broken:
+            return
+        for index, statement in enumerate(self._statements):
+            if statement.node is None:
+                # Parse it again so the message has current line numbers
+                starts = list(itertools.accumulate(self._lengths, initial=self._prefix))
+                self._reparse(index, index + 1, starts, 0)
+                raise self._statements[index].error
+
+    def _compile_statement(self, statement, environment, generate=True):
+        """
+        Check one statement after variables in the given state, and generate
+        its code if generate is true.
+        """
+        symbol_table = SymbolTable()
+        known = []  # Symbols of the variables declared in C before it
+        for name, (var_type, in_c) in zip(statement.names, environment):
+            if var_type is not None:
+                symbol = symbol_table.declare(name, var_type)
+                if in_c:
+                    known.append(symbol)
+        errors = self._analyzer.analyze(ast_nodes.ProgramNode([statement.node]), symbol_table)
+
+        new = [name for name, (var_type, _) in zip(statement.names, environment) if var_type is None]
+        statement.errors = tuple(errors)
+        statement.declares = tuple((name, symbol_table.lookup(name)) for name in new if name in symbol_table)
+        statement.fragment = ""
+        statement.c_declares = ()
+        if not errors and not generate:
+            statement.fragment = None
+        elif not errors:
+            statements = [statement.node]
+            if self.opt_level >= 1:
+                assigned = [name for name, (var_type, _) in zip(statement.names, environment) if var_type is not None]
+                program = ConstantFolder(symbol_table).optimize(ast_nodes.ProgramNode(statements), assigned)
+                statements = program.statements
+            statement.fragment = self._generator.generate_statements(statements, symbol_table, known)
+            declared = self._generator.declared
+            statement.c_declares = tuple(
+                name for name, (_, in_c) in zip(statement.names, environment)
+                if not in_c and symbol_table.resolve(name) in declared
+            )
+        statement.environment = environment
+        self.statements_compiled += 1
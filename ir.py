@@ -0,0 +1,366 @@
+# ir.py
+from codegen import CEmitter
+from parser import ast_nodes
+
+# Bump whenever lowering, the IR passes or IR-based C emission change
+IR_VERSION = "2"
+
+# Operators whose operands may be swapped
+COMMUTATIVE = frozenset(("+", "*"))
+
+# Negated comparison, used to fall through to the true branch
+NEGATED = {"==": "!=", "!=": "==", "<": ">=", ">=": "<", ">": "<=", "<=": ">"}
+
+
+class LoweringError(Exception):
+    pass
+
+
+# --------------------------
+# Three-Address Code
+# --------------------------
+class Instr:
+    """
+    One three-address instruction. Operands are variable names (str) or
+    int constants.
+
+        dest = a            op "copy"
+        dest = a <op> b     op in + - * /
+        print a             op "print" (no dest)
+    """
+    __slots__ = ("op", "dest", "a", "b")
+
+    def __init__(self, op, dest, a, b=None):
+        self.op = op
+        self.dest = dest
+        self.a = a
+        self.b = b
+
+    def operands(self):
+        if self.op in ("copy", "print"):
+            return (self.a,)
+        return (self.a, self.b)
+
+    def __repr__(self):
+        if self.op == "print":
+            return f"print {self.a}"
+        if self.op == "copy":
+            return f"{self.dest} = {self.a}"
+        return f"{self.dest} = {self.a} {self.op} {self.b}"
+
+
+class Branch:
+    """
+    Block terminator: `if (a <op> b) goto true_target; else goto false_target`.
+    """
+    __slots__ = ("op", "a", "b", "true_target", "false_target")
+
+    def __init__(self, op, a, b, true_target, false_target):
+        self.op = op
+        self.a = a
+        self.b = b
+        self.true_target = true_target
+        self.false_target = false_target
+
+    def operands(self):
+        return (self.a, self.b)
+
+    def successors(self):
+        return (self.true_target, self.false_target)
+
+
+class Jump:
+    __slots__ = ("target",)
+
+    def __init__(self, target):
+        self.target = target
+
+    def operands(self):
+        return ()
+
+    def successors(self):
+        return (self.target,)
+
+
+class Return:
+    __slots__ = ()
+
+    def operands(self):
+        return ()
+
+    def successors(self):
+        return ()
+
+
+class BasicBlock:
+    __slots__ = ("id", "instrs", "terminator", "preds")
+
+    def __init__(self, block_id):
+        self.id = block_id
+        self.instrs = []
+        self.terminator = None
+        self.preds = []
+
+    def successors(self):
+        return self.terminator.successors()
+
+
+class Loop:
+    """
+    A while loop in the CFG: its header, every block of the loop (header and
+    body, including nested loops) and the preheader that enters it.
+    """
+    __slots__ = ("header", "blocks", "preheader")
+
+    def __init__(self, header, blocks, preheader):
+        self.header = header
+        self.blocks = blocks
+        self.preheader = preheader
+
+
+class CFG:
+    def __init__(self):
+        self.blocks = []        # In layout order; blocks[0] is the entry
+        self.loops = []         # Innermost loops first
+        self.variables = []     # Program variables, in first-assignment order
+        self.temps = []
+
+    def new_block(self):
+        block = BasicBlock(len(self.blocks))
+        self.blocks.append(block)
+        return block
+
+    def link(self):
+        """
+        Recompute predecessor lists from the terminators.
+        """
+        for block in self.blocks:
+            block.preds = []
+        for block in self.blocks:
+            for succ in block.successors():
+                succ.preds.append(block)
+
+
+# --------------------------
+# Lowering from the AST
+# --------------------------
+class IRBuilder:
+    """
+    Lower a ProgramNode into a CFG of three-address code for main().
+    """
+
+    def __init__(self):
+        self.cfg = CFG()
+        self.current = None
+        self._names = set()
+        self._assigned = set()  # Variables assigned so far, in source order
+        self._temp_counter = 0
+        self._lowerers = {
+            ast_nodes.AssignmentNode.kind: self._lower_assignment,
+            ast_nodes.PrintNode.kind: self._lower_print,
+            ast_nodes.IfNode.kind: self._lower_if,
+            ast_nodes.WhileNode.kind: self._lower_while,
+        }
+
+    def build(self, program):
+        self._names = self._collect_names(program)
+        self.current = self.cfg.new_block()
+        self._lower_block(program.statements)
+        self.current.terminator = Return()
+        self.cfg.link()
+        return self.cfg
+
+    def _lower_block(self, statements):
+        for statement in statements:
+            lower = self._lowerers.get(statement.kind)
+            if lower is None:
+                raise LoweringError(f"Cannot lower {type(statement).__name__} to IR")
+            lower(statement)
+
+    def _lower_assignment(self, node):
+        name = node.identifier.name
+        value = self._lower_expression(node.expression, dest=name)
+        if name not in self._assigned:
+            self._assigned.add(name)
+            self.cfg.variables.append(name)
+        if value != name:
+            self.current.instrs.append(Instr("copy", name, value))
+
+    def _lower_print(self, node):
+        self.current.instrs.append(Instr("print", None, self._lower_expression(node.expression)))
+
+    def _lower_if(self, node):
+        then_block = self.cfg.new_block()
+        self._branch(node.condition, then_block, None)
+        branch = self.current.terminator
+
+        self.current = then_block
+        self._lower_block(node.then_block)
+        then_end = self.current
+
+        else_end = None
+        if node.else_block:
+            self.current = self.cfg.new_block()
+            branch.false_target = self.current
+            self._lower_block(node.else_block)
+            else_end = self.current
+
+        join = self.cfg.new_block()
+        if branch.false_target is None:
+            branch.false_target = join
+        then_end.terminator = Jump(join)
+        if else_end is not None:
+            else_end.terminator = Jump(join)
+        self.current = join
+
+    def _lower_while(self, node):
+        preheader = self.current
+        header = self.cfg.new_block()
+        preheader.terminator = Jump(header)
+
+        self.current = header
+        body = self.cfg.new_block()
+        self._branch(node.condition, body, None)
+        branch = self.current.terminator
+
+        self.current = body
+        self._lower_block(node.body)
+        self.current.terminator = Jump(header)
+
+        exit_block = self.cfg.new_block()
+        branch.false_target = exit_block
+        blocks = self.cfg.blocks[header.id:exit_block.id]
+        self.cfg.loops.append(Loop(header, blocks, preheader))  # Nested loops were appended first
+        self.current = exit_block
+
+    def _branch(self, condition, true_target, false_target):
+        a = self._lower_expression(condition.left)
+        b = self._lower_expression(condition.right)
+        self.current.terminator = Branch(condition.operator, a, b, true_target, false_target)
+
+    def _lower_expression(self, root, dest=None):
+        """
+        Emit instructions computing root and return the operand holding it.
+        The outermost operation writes straight into dest when given.
+        """
+        values = []
+        stack = [(root, False)]
+        while stack:
+            node, operands_done = stack.pop()
+            if operands_done:
+                b = values.pop()
+                a = values.pop()
+                target = dest if node is root and dest is not None else self._new_temp()
+                self.current.instrs.append(Instr(node.operator, target, a, b))
+                values.append(target)
+            elif node.kind == ast_nodes.BinaryOpNode.kind:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+            elif node.kind == ast_nodes.NumberNode.kind:
+                if type(node.value) is not int:
+                    raise LoweringError("Only int constants can be lowered to IR")
+                values.append(node.value)
+            elif node.kind == ast_nodes.IdentifierNode.kind:
+                if node.name not in self._assigned:
+                    # emit_c only declares assigned variables; leave the
+                    # error to the code generator
+                    raise LoweringError(f"Variable '{node.name}' is read before it is assigned")
+                values.append(node.name)
+            else:
+                raise LoweringError(f"Cannot lower {type(node).__name__} to IR")
+        return values[0]
+
+    def _new_temp(self):
+        while True:
+            self._temp_counter += 1
+            name = f"_t{self._temp_counter}"
+            if name not in self._names:
+                self.cfg.temps.append(name)
+                return name
+
+    @staticmethod
+    def _collect_names(program):
+        names = set()
+        stack = [program]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                stack += node
+            elif isinstance(node, ast_nodes.Node):
+                if node.kind == ast_nodes.IdentifierNode.kind:
+                    names.add(node.name)
+                stack += (getattr(node, field) for field in node._fields)
+        return names
+
+
+def lower_program(program):
+    return IRBuilder().build(program)
+
+
+# --------------------------
+# C Emission
+# --------------------------
+def emit_c(cfg, stream=None):
+    """
+    Write cfg as a C program. Returns the code as a string unless a stream
+    is given, like CodeGenerator.generate.
+    """
+    emitter = CEmitter(stream)
+    emitter.line(0, "#include <stdio.h>")
+    emitter.line(0, "#include <stdlib.h>\n")
+    emitter.line(0, "\n// Main Program")
+    emitter.line(0, "int main() {")
+
+    names = cfg.variables + cfg.temps
+    if names:
+        emitter.line(1, "int " + ", ".join(f"{name} = 0" for name in names) + ";")
+
+    following = dict(zip(cfg.blocks, cfg.blocks[1:]))
+    targets = set()
+    for block in cfg.blocks:
+        targets.update(_goto_targets(block.terminator, following.get(block)))
+
+    for block in cfg.blocks:
+        if block in targets:
+            emitter.line(0, f"B{block.id}:;")
+        for instr in block.instrs:
+            emitter.line(1, _format_instr(instr))
+        _emit_terminator(emitter, block.terminator, following.get(block))
+
+    emitter.line(0, "}\n")
+    if stream is not None:
+        emitter.flush()
+        return None
+    return emitter.getvalue()
+
+
+def _format_instr(instr):
+    if instr.op == "print":
+        return f'printf("%d\\n", {instr.a});'
+    if instr.op == "copy":
+        return f"{instr.dest} = {instr.a};"
+    return f"{instr.dest} = {instr.a} {instr.op} {instr.b};"
+
+
+def _goto_targets(terminator, following):
+    """
+    Blocks the terminator jumps to explicitly; the block that follows it
+    in the layout is reached by falling through.
+    """
+    return [succ for succ in terminator.successors() if succ is not following]
+
+
+def _emit_terminator(emitter, terminator, following):
+    if isinstance(terminator, Return):
+        emitter.line(1, "return 0;")
+    elif isinstance(terminator, Jump):
+        if terminator.target is not following:
+            emitter.line(1, f"goto B{terminator.target.id};")
+    elif terminator.true_target is following:
+        negated = NEGATED[terminator.op]
+        emitter.line(1, f"if ({terminator.a} {negated} {terminator.b}) goto B{terminator.false_target.id};")
+    else:
+        emitter.line(1, f"if ({terminator.a} {terminator.op} {terminator.b}) goto B{terminator.true_target.id};")
+        if terminator.false_target is not following:
+            emitter.line(1, f"goto B{terminator.false_target.id};")
@@ -0,0 +1,317 @@
+# ir_passes.py
+from collections import Counter
+
+from ir import Branch, Jump, COMMUTATIVE
+from optimizer import COMPARISONS, evaluate
+
+ARITHMETIC = frozenset(("+", "-", "*", "/"))
+
+
+def optimize_cfg(cfg):
+    """
+    Run the IR passes over cfg in place and return it.
+
+    Copy propagation runs again after CSE so the copies CSE leaves behind
+    are forwarded, and dead stores are removed last to clean up after all
+    of them.
+    """
+    propagate_copies(cfg)
+    eliminate_common_subexpressions(cfg)
+    propagate_copies(cfg)
+    hoist_loop_invariants(cfg)
+    eliminate_dead_stores(cfg)
+    _prune_declarations(cfg)
+    return cfg
+
+
+# --------------------------
+# Dataflow Analyses
+# --------------------------
+def liveness(cfg):
+    """
+    Return {block id: set of variables live on entry to the block}.
+    """
+    uses = {}
+    defs = {}
+    for block in cfg.blocks:
+        use, define = set(), set()
+        for instr in block.instrs:
+            use.update(v for v in instr.operands() if _is_var(v) and v not in define)
+            if instr.dest is not None:
+                define.add(instr.dest)
+        use.update(v for v in block.terminator.operands() if _is_var(v) and v not in define)
+        uses[block.id] = use
+        defs[block.id] = define
+
+    live_in = {block.id: set() for block in cfg.blocks}
+    changed = True
+    while changed:
+        changed = False
+        for block in reversed(cfg.blocks):
+            live_out = set()
+            for succ in block.successors():
+                live_out |= live_in[succ.id]
+            live = uses[block.id] | (live_out - defs[block.id])
+            if live != live_in[block.id]:
+                live_in[block.id] = live
+                changed = True
+    return live_in
+
+
+def _live_out(block, live_in):
+    live = set()
+    for succ in block.successors():
+        live |= live_in[succ.id]
+    return live
+
+
+# --------------------------
+# Copy Propagation
+# --------------------------
+def propagate_copies(cfg):
+    """
+    Replace uses of x after `x = y` with y wherever the copy reaches along
+    every path (available copies, a forward dataflow problem), and fold
+    operations whose operands become constant.
+    """
+    entry = cfg.blocks[0]
+    copies_out = {}
+    copies_in = {}
+    changed = True
+    while changed:
+        changed = False
+        for block in cfg.blocks:
+            if block is entry:
+                copies = {}
+            else:
+                # Predecessors not visited yet impose no constraint (optimistic start)
+                incoming = [copies_out[p.id] for p in block.preds if p.id in copies_out]
+                if not incoming:
+                    continue
+                copies = dict(incoming[0])
+                for other in incoming[1:]:
+                    copies = {k: v for k, v in copies.items() if other.get(k, _MISSING) == v}
+            copies_in[block.id] = copies
+            out = _transfer_copies(block, copies, rewrite=False)
+            if copies_out.get(block.id) != out:
+                copies_out[block.id] = out
+                changed = True
+
+    for block in cfg.blocks:
+        if block.id in copies_in:
+            _transfer_copies(block, copies_in[block.id], rewrite=True)
+    _remove_unreachable(cfg)
+
+
+_MISSING = object()
+
+
+def _transfer_copies(block, copies, rewrite):
+    """
+    Apply block to the available copies and return the result. With
+    rewrite, also substitute the copies into the block's operands.
+    """
+    copies = dict(copies)
+    sources = {}  # Variable source -> destinations copied from it
+    for dest, source in copies.items():
+        if _is_var(source):
+            sources.setdefault(source, set()).add(dest)
+
+    kept = []
+    for instr in block.instrs:
+        op, dest = instr.op, instr.dest
+        a = copies.get(instr.a, instr.a)
+        b = instr.b if instr.b is None else copies.get(instr.b, instr.b)
+        if op in ARITHMETIC and not _is_var(a) and not _is_var(b):
+            value = evaluate(op, a, b)
+            if value is not None:
+                op, a, b = "copy", value, None
+        if rewrite:
+            if op == "copy" and a == dest:
+                continue  # x = x
+            instr.op, instr.a, instr.b = op, a, b
+            kept.append(instr)
+
+        if dest is None:
+            continue
+        copies.pop(dest, None)
+        for stale in sources.pop(dest, ()):
+            copies.pop(stale, None)
+        if op == "copy" and a != dest:
+            copies[dest] = a
+            if _is_var(a):
+                sources.setdefault(a, set()).add(dest)
+
+    if rewrite:
+        block.instrs = kept
+        terminator = block.terminator
+        if isinstance(terminator, Branch):
+            terminator.a = copies.get(terminator.a, terminator.a)
+            terminator.b = copies.get(terminator.b, terminator.b)
+            if not _is_var(terminator.a) and not _is_var(terminator.b):
+                taken = COMPARISONS[terminator.op](terminator.a, terminator.b)
+                block.terminator = Jump(terminator.true_target if taken else terminator.false_target)
+    return copies
+
+
+def _remove_unreachable(cfg):
+    """
+    Drop blocks no longer reachable from the entry after branch folding,
+    along with the loops they contained.
+    """
+    reachable = set()
+    stack = [cfg.blocks[0]]
+    while stack:
+        block = stack.pop()
+        if block.id not in reachable:
+            reachable.add(block.id)
+            stack += block.successors()
+    if len(reachable) == len(cfg.blocks):
+        return
+    cfg.blocks = [block for block in cfg.blocks if block.id in reachable]
+    cfg.loops = [loop for loop in cfg.loops if loop.header.id in reachable]
+    for loop in cfg.loops:
+        loop.blocks = [block for block in loop.blocks if block.id in reachable]
+    cfg.link()
+
+
+# --------------------------
+# Common Subexpression Elimination
+# --------------------------
+def eliminate_common_subexpressions(cfg):
+    """
+    Within each block, turn a recomputation of `a op b` into a copy of the
+    variable that already holds it, as long as neither the operands nor
+    that variable were reassigned in between.
+    """
+    for block in cfg.blocks:
+        available = {}  # (op, a, b) -> variable holding the value
+        mentions = {}   # Variable -> keys invalidated when it is assigned
+        for instr in block.instrs:
+            key = None
+            if instr.op in ARITHMETIC:
+                key = _expression_key(instr)
+                holder = available.get(key)
+                if holder is not None:
+                    instr.op, instr.a, instr.b = "copy", holder, None
+                    key = None
+
+            dest = instr.dest
+            if dest is None:
+                continue
+            for stale in mentions.pop(dest, ()):
+                available.pop(stale, None)
+            if key is not None and dest not in (instr.a, instr.b):
+                available[key] = dest
+                for name in (instr.a, instr.b, dest):
+                    if _is_var(name):
+                        mentions.setdefault(name, []).append(key)
+
+
+def _expression_key(instr):
+    if instr.op in COMMUTATIVE:
+        a, b = sorted((instr.a, instr.b), key=str)
+        return (instr.op, a, b)
+    return (instr.op, instr.a, instr.b)
+
+
+# --------------------------
+# Loop-Invariant Code Motion
+# --------------------------
+def hoist_loop_invariants(cfg):
+    """
+    Move computations whose operands do not change inside a while loop to
+    the loop's preheader, innermost loops first so an invariant can climb
+    through several levels.
+
+    An instruction is hoisted only if its destination is assigned once in
+    the loop and is not live on entry to the loop header (so no use inside
+    or after the loop can see an older value), and it cannot trap: the
+    loop may run zero times, and a division by a variable might then
+    execute when the original program would not have.
+    """
+    live_in = liveness(cfg)
+    for loop in cfg.loops:
+        assigned = Counter(
+            instr.dest for block in loop.blocks for instr in block.instrs if instr.dest is not None
+        )
+        live_at_header = live_in[loop.header.id]
+        hoisted = []
+        changed = True
+        while changed:
+            changed = False
+            for block in loop.blocks:
+                kept = []
+                for instr in block.instrs:
+                    if _is_invariant(instr, assigned, live_at_header):
+                        hoisted.append(instr)
+                        assigned[instr.dest] -= 1
+                        changed = True  # Instructions using dest may now be invariant too
+                    else:
+                        kept.append(instr)
+                block.instrs = kept
+        loop.preheader.instrs += hoisted
+        for instr in hoisted:
+            live_in[loop.header.id].add(instr.dest)
+
+
+def _is_invariant(instr, assigned, live_at_header):
+    if instr.dest is None or assigned[instr.dest] != 1 or instr.dest in live_at_header:
+        return False
+    if any(_is_var(v) and assigned[v] for v in instr.operands()):
+        return False
+    return not _may_trap(instr)
+
+
+# --------------------------
+# Dead Store Elimination
+# --------------------------
+def eliminate_dead_stores(cfg):
+    """
+    Remove assignments whose value is never read, repeating until removing
+    one no longer makes another dead. Divisions that could trap are kept,
+    as the AST optimizer keeps them.
+    """
+    changed = True
+    while changed:
+        changed = False
+        live_in = liveness(cfg)
+        for block in cfg.blocks:
+            live = _live_out(block, live_in)
+            live.update(v for v in block.terminator.operands() if _is_var(v))
+            kept = []
+            for instr in reversed(block.instrs):
+                if instr.dest is not None:
+                    if instr.dest not in live and not _may_trap(instr):
+                        changed = True
+                        continue
+                    live.discard(instr.dest)
+                live.update(v for v in instr.operands() if _is_var(v))
+                kept.append(instr)
+            kept.reverse()
+            block.instrs = kept
+
+
+def _prune_declarations(cfg):
+    used = set()
+    for block in cfg.blocks:
+        for instr in block.instrs:
+            used.update(v for v in instr.operands() if _is_var(v))
+            if instr.dest is not None:
+                used.add(instr.dest)
+        used.update(v for v in block.terminator.operands() if _is_var(v))
+    cfg.variables = [name for name in cfg.variables if name in used]
+    cfg.temps = [name for name in cfg.temps if name in used]
+
+
+# --------------------------
+# Helpers
+# --------------------------
+def _is_var(operand):
+    return type(operand) is str
+
+def _may_trap(instr):
+    """
+    True if instr could divide by zero at run time.
+    """
+    return instr.op == "/" and (_is_var(instr.b) or instr.b == 0)
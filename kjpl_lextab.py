@@ -0,0 +1,11 @@
+# kjpl_lextab.py. This file automatically created by PLY (version 3.11). Don't edit!
+_tabversion   = '3.10'
+_lextokens    = set(('AND', 'ASSIGN', 'BOOL', 'COLON', 'COMMA', 'DIVIDE', 'ELSE', 'EQ', 'FALSE', 'FLOAT', 'FLOAT_NUMBER', 'FOR', 'FUNCTION', 'GEQ', 'GT', 'IDENTIFIER', 'IF', 'INT', 'INTEGER', 'LBRACE', 'LBRACKET', 'LEQ', 'LET', 'LPAREN', 'LT', 'MINUS', 'MODULO', 'NEQ', 'NOT', 'NULL', 'OR', 'PLUS', 'PRINT', 'RBRACE', 'RBRACKET', 'RETURN', 'RPAREN', 'SEMICOLON', 'STRING', 'STRING_LITERAL', 'TIMES', 'TRUE', 'WHILE'))
+_lexreflags   = 64
+_lexliterals  = ''
+_lexstateinfo = {'INITIAL': 'inclusive'}
+_lexstatere   = {'INITIAL': [('(?P<t_IDENTIFIER>[a-zA-Z_][a-zA-Z0-9_]*)|(?P<t_FLOAT_NUMBER>\\d+\\.\\d+([eE][+-]?\\d+)? | \\d+[eE][+-]?\\d+)|(?P<t_INTEGER>\\d+)|(?P<t_STRING_LITERAL>\\"(?:\\\\"|.)*?\\" | \\\'(?:\\\\\\\'|.)*?\\\')|(?P<t_SINGLE_LINE_COMMENT>//.*)|(?P<t_MULTI_LINE_COMMENT>/\\*(.|\\n)*?\\*/)|(?P<t_newline>\\n+)|(?P<t_OR>\\|\\|)|(?P<t_PLUS>\\+)|(?P<t_TIMES>\\*)|(?P<t_EQ>==)|(?P<t_NEQ>!=)|(?P<t_LEQ><=)|(?P<t_GEQ>>=)|(?P<t_AND>&&)|(?P<t_LPAREN>\\()|(?P<t_RPAREN>\\))|(?P<t_LBRACE>\\{)|(?P<t_RBRACE>\\})|(?P<t_LBRACKET>\\[)|(?P<t_RBRACKET>\\])|(?P<t_MINUS>-)|(?P<t_DIVIDE>/)|(?P<t_MODULO>%)|(?P<t_LT><)|(?P<t_GT>>)|(?P<t_NOT>!)|(?P<t_COMMA>,)|(?P<t_SEMICOLON>;)|(?P<t_ASSIGN>=)|(?P<t_COLON>:)', [None, ('t_IDENTIFIER', 'IDENTIFIER'), ('t_FLOAT_NUMBER', 'FLOAT_NUMBER'), None, ('t_INTEGER', 'INTEGER'), ('t_STRING_LITERAL', 'STRING_LITERAL'), ('t_SINGLE_LINE_COMMENT', 'SINGLE_LINE_COMMENT'), ('t_MULTI_LINE_COMMENT', 'MULTI_LINE_COMMENT'), None, ('t_newline', 'newline'), (None, 'OR'), (None, 'PLUS'), (None, 'TIMES'), (None, 'EQ'), (None, 'NEQ'), (None, 'LEQ'), (None, 'GEQ'), (None, 'AND'), (None, 'LPAREN'), (None, 'RPAREN'), (None, 'LBRACE'), (None, 'RBRACE'), (None, 'LBRACKET'), (None, 'RBRACKET'), (None, 'MINUS'), (None, 'DIVIDE'), (None, 'MODULO'), (None, 'LT'), (None, 'GT'), (None, 'NOT'), (None, 'COMMA'), (None, 'SEMICOLON'), (None, 'ASSIGN'), (None, 'COLON')])]}
+_lexstateignore = {'INITIAL': ' \t\r'}
+_lexstateerrorf = {'INITIAL': 't_error'}
+_lexstateeoff = {}
+_kjpl_version = '1'
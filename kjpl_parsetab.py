@@ -0,0 +1,64 @@
+
+# kjpl_parsetab.py
+# This file is automatically generated. Do not edit.
+# pylint: disable=W,C,R
+_tabversion = '3.10'
+
+_lr_method = 'LALR'
+
+_lr_signature = 'leftPLUSMINUSleftTIMESDIVIDEAND ASSIGN BOOL COLON COMMA DIVIDE ELSE EQ FALSE FLOAT FLOAT_NUMBER FOR FUNCTION GEQ GT IDENTIFIER IF INT INTEGER LBRACE LBRACKET LEQ LET LPAREN LT MINUS MODULO NEQ NOT NULL OR PLUS PRINT RBRACE RBRACKET RETURN RPAREN SEMICOLON STRING STRING_LITERAL TIMES TRUE WHILE\n    program : statements\n    \n    statements : statements statement\n               | statement\n    \n    statement : assignment_stmt\n              | print_stmt\n              | if_stmt\n              | while_stmt\n              | empty\n    \n    assignment_stmt : IDENTIFIER ASSIGN expression SEMICOLON\n    \n    print_stmt : PRINT LPAREN expression RPAREN SEMICOLON\n    \n    if_stmt : IF LPAREN condition RPAREN LBRACE statements RBRACE\n            | IF LPAREN condition RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE\n    \n    while_stmt : WHILE LPAREN condition RPAREN LBRACE statements RBRACE\n    \n    condition : expression EQ expression\n              | expression NEQ expression\n              | expression LT expression\n              | expression GT expression\n              | expression LEQ expression\n              | expression GEQ expression\n    \n    expression : expression PLUS term\n               | expression MINUS term\n               | term\n    \n    term : term TIMES factor\n         | term DIVIDE factor\n         | factor\n    \n    factor : INTEGER\n           | FLOAT_NUMBER\n           | STRING_LITERAL\n           | TRUE\n           | FALSE\n           | IDENTIFIER\n           | LPAREN expression RPAREN\n    \n    empty :\n    '
+    
+_lr_action_items = {'IDENTIFIER':([0,2,3,4,5,6,7,8,13,14,15,16,17,27,32,33,34,35,36,40,41,42,43,44,45,52,53,60,61,62,63,64,66,67,68,],[9,9,-3,-4,-5,-6,-7,-8,-2,18,18,18,18,18,-9,18,18,18,18,18,18,18,18,18,18,-10,9,9,9,9,-11,-13,9,9,-12,]),'PRINT':([0,2,3,4,5,6,7,8,13,32,52,53,60,61,62,63,64,66,67,68,],[10,10,-3,-4,-5,-6,-7,-8,-2,-9,-10,10,10,10,10,-11,-13,10,10,-12,]),'IF':([0,2,3,4,5,6,7,8,13,32,52,53,60,61,62,63,64,66,67,68,],[11,11,-3,-4,-5,-6,-7,-8,-2,-9,-10,11,11,11,11,-11,-13,11,11,-12,]),'WHILE':([0,2,3,4,5,6,7,8,13,32,52,53,60,61,62,63,64,66,67,68,],[12,12,-3,-4,-5,-6,-7,-8,-2,-9,-10,12,12,12,12,-11,-13,12,12,-12,]),'$end':([0,1,2,3,4,5,6,7,8,13,32,52,63,64,68,],[-33,0,-1,-3,-4,-5,-6,-7,-8,-2,-9,-10,-11,-13,-12,]),'RBRACE':([3,4,5,6,7,8,13,32,52,53,60,61,62,63,64,66,67,68,],[-3,-4,-5,-6,-7,-8,-2,-9,-10,-33,-33,63,64,-11,-13,-33,68,-12,]),'ASSIGN':([9,],[14,]),'LPAREN':([10,11,12,14,15,16,17,27,33,34,35,36,40,41,42,43,44,45,],[15,16,17,27,27,27,27,27,27,27,27,27,27,27,27,27,27,27,]),'INTEGER':([14,15,16,17,27,33,34,35,36,40,41,42,43,44,45,],[22,22,22,22,22,22,22,22,22,22,22,22,22,22,22,]),'FLOAT_NUMBER':([14,15,16,17,27,33,34,35,36,40,41,42,43,44,45,],[23,23,23,23,23,23,23,23,23,23,23,23,23,23,23,]),'STRING_LITERAL':([14,15,16,17,27,33,34,35,36,40,41,42,43,44,45,],[24,24,24,24,24,24,24,24,24,24,24,24,24,24,24,]),'TRUE':([14,15,16,17,27,33,34,35,36,40,41,42,43,44,45,],[25,25,25,25,25,25,25,25,25,25,25,25,25,25,25,]),'FALSE':([14,15,16,17,27,33,34,35,36,40,41,42,43,44,45,],[26,26,26,26,26,26,26,26,26,26,26,26,26,26,26,]),'TIMES':([18,20,21,22,23,24,25,26,47,48,49,50,51,],[-31,35,-25,-26,-27,-28,-29,-30,35,35,-23,-24,-32,]),'DIVIDE':([18,20,21,22,23,24,25,26,47,48,49,50,51,],[-31,36,-25,-26,-27,-28,-29,-30,36,36,-23,-24,-32,]),'SEMICOLON':([18,19,20,21,22,23,24,25,26,38,47,48,49,50,51,],[-31,32,-22,-25,-26,-27,-28,-29,-30,52,-20,-21,-23,-24,-32,]),'PLUS':([18,19,20,21,22,23,24,25,26,28,30,37,47,48,49,50,51,54,55,56,57,58,59,],[-31,33,-22,-25,-26,-27,-28,-29,-30,33,33,33,-20,-21,-23,-24,-32,33,33,33,33,33,33,]),'MINUS':([18,19,20,21,22,23,24,25,26,28,30,37,47,48,49,50,51,54,55,56,57,58,59,],[-31,34,-22,-25,-26,-27,-28,-29,-30,34,34,34,-20,-21,-23,-24,-32,34,34,34,34,34,34,]),'RPAREN':([18,20,21,22,23,24,25,26,28,29,31,37,47,48,49,50,51,54,55,56,57,58,59,],[-31,-22,-25,-26,-27,-28,-29,-30,38,39,46,51,-20,-21,-23,-24,-32,-14,-15,-16,-17,-18,-19,]),'EQ':([18,20,21,22,23,24,25,26,30,47,48,49,50,51,],[-31,-22,-25,-26,-27,-28,-29,-30,40,-20,-21,-23,-24,-32,]),'NEQ':([18,20,21,22,23,24,25,26,30,47,48,49,50,51,],[-31,-22,-25,-26,-27,-28,-29,-30,41,-20,-21,-23,-24,-32,]),'LT':([18,20,21,22,23,24,25,26,30,47,48,49,50,51,],[-31,-22,-25,-26,-27,-28,-29,-30,42,-20,-21,-23,-24,-32,]),'GT':([18,20,21,22,23,24,25,26,30,47,48,49,50,51,],[-31,-22,-25,-26,-27,-28,-29,-30,43,-20,-21,-23,-24,-32,]),'LEQ':([18,20,21,22,23,24,25,26,30,47,48,49,50,51,],[-31,-22,-25,-26,-27,-28,-29,-30,44,-20,-21,-23,-24,-32,]),'GEQ':([18,20,21,22,23,24,25,26,30,47,48,49,50,51,],[-31,-22,-25,-26,-27,-28,-29,-30,45,-20,-21,-23,-24,-32,]),'LBRACE':([39,46,65,],[53,60,66,]),'ELSE':([63,],[65,]),}
+
+_lr_action = {}
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = {}
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'program':([0,],[1,]),'statements':([0,53,60,66,],[2,61,62,67,]),'statement':([0,2,53,60,61,62,66,67,],[3,13,3,3,13,13,3,13,]),'assignment_stmt':([0,2,53,60,61,62,66,67,],[4,4,4,4,4,4,4,4,]),'print_stmt':([0,2,53,60,61,62,66,67,],[5,5,5,5,5,5,5,5,]),'if_stmt':([0,2,53,60,61,62,66,67,],[6,6,6,6,6,6,6,6,]),'while_stmt':([0,2,53,60,61,62,66,67,],[7,7,7,7,7,7,7,7,]),'empty':([0,2,53,60,61,62,66,67,],[8,8,8,8,8,8,8,8,]),'expression':([14,15,16,17,27,40,41,42,43,44,45,],[19,28,30,30,37,54,55,56,57,58,59,]),'term':([14,15,16,17,27,33,34,40,41,42,43,44,45,],[20,20,20,20,20,47,48,20,20,20,20,20,20,]),'factor':([14,15,16,17,27,33,34,35,36,40,41,42,43,44,45,],[21,21,21,21,21,21,21,49,50,21,21,21,21,21,21,]),'condition':([16,17,],[29,31,]),}
+
+_lr_goto = {}
+for _k, _v in _lr_goto_items.items():
+   for _x, _y in zip(_v[0], _v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = {}
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> program","S'",1,None,None,None),
+  ('program -> statements','program',1,'p_program','parser.py',21),
+  ('statements -> statements statement','statements',2,'p_statements','parser.py',27),
+  ('statements -> statement','statements',1,'p_statements','parser.py',28),
+  ('statement -> assignment_stmt','statement',1,'p_statement','parser.py',40),
+  ('statement -> print_stmt','statement',1,'p_statement','parser.py',41),
+  ('statement -> if_stmt','statement',1,'p_statement','parser.py',42),
+  ('statement -> while_stmt','statement',1,'p_statement','parser.py',43),
+  ('statement -> empty','statement',1,'p_statement','parser.py',44),
+  ('assignment_stmt -> IDENTIFIER ASSIGN expression SEMICOLON','assignment_stmt',4,'p_assignment_stmt','parser.py',50),
+  ('print_stmt -> PRINT LPAREN expression RPAREN SEMICOLON','print_stmt',5,'p_print_stmt','parser.py',60),
+  ('if_stmt -> IF LPAREN condition RPAREN LBRACE statements RBRACE','if_stmt',7,'p_if_stmt','parser.py',66),
+  ('if_stmt -> IF LPAREN condition RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE','if_stmt',11,'p_if_stmt','parser.py',67),
+  ('while_stmt -> WHILE LPAREN condition RPAREN LBRACE statements RBRACE','while_stmt',7,'p_while_stmt','parser.py',76),
+  ('condition -> expression EQ expression','condition',3,'p_condition','parser.py',82),
+  ('condition -> expression NEQ expression','condition',3,'p_condition','parser.py',83),
+  ('condition -> expression LT expression','condition',3,'p_condition','parser.py',84),
+  ('condition -> expression GT expression','condition',3,'p_condition','parser.py',85),
+  ('condition -> expression LEQ expression','condition',3,'p_condition','parser.py',86),
+  ('condition -> expression GEQ expression','condition',3,'p_condition','parser.py',87),
+  ('expression -> expression PLUS term','expression',3,'p_expression','parser.py',93),
+  ('expression -> expression MINUS term','expression',3,'p_expression','parser.py',94),
+  ('expression -> term','expression',1,'p_expression','parser.py',95),
+  ('term -> term TIMES factor','term',3,'p_term','parser.py',104),
+  ('term -> term DIVIDE factor','term',3,'p_term','parser.py',105),
+  ('term -> factor','term',1,'p_term','parser.py',106),
+  ('factor -> INTEGER','factor',1,'p_factor','parser.py',115),
+  ('factor -> FLOAT_NUMBER','factor',1,'p_factor','parser.py',116),
+  ('factor -> STRING_LITERAL','factor',1,'p_factor','parser.py',117),
+  ('factor -> TRUE','factor',1,'p_factor','parser.py',118),
+  ('factor -> FALSE','factor',1,'p_factor','parser.py',119),
+  ('factor -> IDENTIFIER','factor',1,'p_factor','parser.py',120),
+  ('factor -> LPAREN expression RPAREN','factor',3,'p_factor','parser.py',121),
+  ('empty -> <empty>','empty',0,'p_empty','parser.py',138),
+]
+_kjpl_version = '5'
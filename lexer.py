@@ -1,6 +1,9 @@
 # lexer.py
 import ply.lex as lex
 
+# Bump whenever the token stream for a given source can change
+LEXER_VERSION = "1"
+
 # -------------------------------------
 # Token List
 # -------------------------------------
@@ -131,7 +134,28 @@ def t_error(t):
 # -------------------------------------
 # Build the Lexer
 # -------------------------------------
-lexer = lex.lex()
+def _build_lexer():
+    """
+    Load the lexer from the tables shipped in kjpl_lextab.py (see
+    build_tables.py), skipping rule validation and regex assembly.
+    Falls back to a full build if the tables are missing or stale.
+    """
+    try:
+        import kjpl_lextab
+    except ImportError:
+        kjpl_lextab = None
+
+    if (kjpl_lextab is not None
+            and getattr(kjpl_lextab, "_kjpl_version", None) == LEXER_VERSION
+            and kjpl_lextab._lextokens == set(tokens)):
+        lexobj = lex.Lexer()
+        lexobj.readtab(kjpl_lextab, globals())
+        lexobj.lexoptimize = True
+        lex.lexer = lexobj  # lex.lex() registers the default lexer the same way
+        return lexobj
+    return lex.lex()
+
+lexer = _build_lexer()
 
 # -------------------------------------
 # Helper Function for Testing
@@ -150,6 +174,20 @@ def tokenize_input(input_text):
         })
     return tokens
 
+# -------------------------------------
+# Token Serialization (for stage caching)
+# -------------------------------------
+def dump_tokens(toks):
+    return [[tok.type, tok.value, tok.lineno, tok.lexpos] for tok in toks]
+
+def load_tokens(items):
+    toks = []
+    for item in items:
+        tok = lex.LexToken()
+        tok.type, tok.value, tok.lineno, tok.lexpos = item
+        toks.append(tok)
+    return toks
+
 if __name__ == "__main__":
     # Test the lexer
     sample_code = """
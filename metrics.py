@@ -0,0 +1,251 @@
+# metrics.py
+import threading
+import time
+import tracemalloc
+
+# --------------------------
+# Shared tracemalloc state
+# --------------------------
+# tracemalloc is process-wide: compilations that track memory share one
+# tracing session, which the last of them to finish stops (only if one of
+# them started it), and the peak is only reset when no stage is measuring.
+_tracing_lock = threading.Lock()
+_tracing_users = 0       # Compilations tracking memory right now
+_tracing_owned = False   # Whether those compilations switched tracing on
+_measuring = 0           # Stages between their baseline and their peak reading
+
+
+def _acquire_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+
+
+def _release_tracing():
+    global _tracing_users, _tracing_owned
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+def _start_peak():
+    """
+    Return the traced memory now, resetting the peak unless another stage's
+    measurement is in flight, whose peak that would cut off.
+    """
+    global _measuring
+    with _tracing_lock:
+        if _measuring == 0:
+            tracemalloc.reset_peak()
+        _measuring += 1
+        return tracemalloc.get_traced_memory()[0]
+
+
+def _end_peak():
+    global _measuring
+    with _tracing_lock:
+        _measuring -= 1
+        return tracemalloc.get_traced_memory()[1]
+
+
+class StageMetrics:
+    """
+    Measurements of one pipeline stage. Times are in seconds; peak_memory
+    is in bytes and None unless memory was tracked. A stage whose result
+    came from the stage cache is recorded with cached=True and zero times.
+    """
+    __slots__ = ("stage", "wall_time", "cpu_time", "peak_memory", "cached")
+
+    def __init__(self, stage, wall_time=0.0, cpu_time=0.0, peak_memory=None, cached=False):
+        self.stage = stage
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.peak_memory = peak_memory
+        self.cached = cached
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class CompilationMetrics:
+    """
+    Measurements of one compilation, stage by stage.
+
+    Pass one to KJPLCompiler.compile(metrics=...). Every stage that runs
+    records its wall time and the CPU time of the compiling thread. With
+    track_memory, it also records the peak memory allocated above what was
+    live when it started, as seen by tracemalloc; tracing is switched on
+    while any such compilation runs if it was off. Tracing slows
+    allocation-heavy code several times over, and its peak is process-wide,
+    so memory figures of concurrent compilations include each other's
+    allocations.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.stages = {}        # Stage name -> StageMetrics, in pipeline order
+        self.tokens = None      # Token count, when the lexer ran
+        self.ast_nodes = None   # AST node count, when the parser ran
+        self.cache_hit = False  # Output served whole from the compilation cache
+        self.error = None       # Name of the exception that ended the compilation
+        self.wall_time = 0.0
+        self._start = None
+        self._tracing = False   # Holds a reference on the shared tracing session
+
+    # --------------------------
+    # Recording (used by KJPLCompiler)
+    # --------------------------
+    def begin(self):
+        if self.track_memory and not self._tracing:
+            _acquire_tracing()
+            self._tracing = True
+        self._start = time.perf_counter()
+
+    def end(self, error=None):
+        self.wall_time = time.perf_counter() - self._start
+        if error is not None:
+            self.error = type(error).__name__
+        if self._tracing:
+            _release_tracing()
+            self._tracing = False
+
+    def measure(self, stage, function, *args):
+        """
+        Call function(*args) and record its cost as stage. The stage is
+        recorded even if the call raises.
+        """
+        track_memory = self.track_memory and tracemalloc.is_tracing()
+        if track_memory:
+            baseline = _start_peak()
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            return function(*args)
+        finally:
+            record = StageMetrics(stage, time.perf_counter() - wall, time.thread_time() - cpu)
+            if track_memory:
+                record.peak_memory = max(0, _end_peak() - baseline)
+            self.stages[stage] = record
+
+    def reused(self, stage):
+        self.stages[stage] = StageMetrics(stage, cached=True)
+
+    def count_tokens(self, tokens):
+        """
+        Pass a token stream through, counting it as it is consumed.
+        """
+        self.tokens = 0
+        for token in tokens:
+            self.tokens += 1
+            yield token
+
+    # --------------------------
+    # Reporting
+    # --------------------------
+    @property
+    def peak_memory(self):
+        peaks = [stage.peak_memory for stage in self.stages.values() if stage.peak_memory is not None]
+        return max(peaks) if peaks else None
+
+    def as_dict(self):
+        return {
+            "wall_time": self.wall_time,
+            "tokens": self.tokens,
+            "ast_nodes": self.ast_nodes,
+            "peak_memory": self.peak_memory,
+            "cache_hit": self.cache_hit,
+            "error": self.error,
+            "stages": [stage.as_dict() for stage in self.stages.values()],
+        }
+
+    def report(self):
+        """
+        Return a table of the stages as text.
+        """
+        lines = [f"{'stage':<14}{'wall ms':>10}{'cpu ms':>10}{'peak KiB':>11}"]
+        for stage in self.stages.values():
+            peak = f"{stage.peak_memory / 1024:.1f}" if stage.peak_memory is not None else "-"
+            wall = f"{stage.wall_time * 1000:.3f}" if not stage.cached else "cached"
+            lines.append(f"{stage.stage:<14}{wall:>10}{stage.cpu_time * 1000:>10.3f}{peak:>11}")
+        lines.append(f"{'total':<14}{self.wall_time * 1000:>10.3f}")
+        counts = [f"{self.tokens} tokens"] if self.tokens is not None else []
+        if self.ast_nodes is not None:
+            counts.append(f"{self.ast_nodes} AST nodes")
+        if self.cache_hit:
+            counts.append("compilation cache hit")
+        if self.error:
+            counts.append(f"failed with {self.error}")
+        if counts:
+            lines.append(", ".join(counts))
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """
+    Running totals over many compilations, for a long-running service.
+
+    Give one to KJPLCompiler(metrics=...) and every compile is measured and
+    added here. Safe to share between threads. to_prometheus() renders the
+    totals in the Prometheus text exposition format.
+    """
+
+    def __init__(self, track_memory=False):
+        self.track_memory = track_memory
+        self.compilations = {"ok": 0, "error": 0, "cached": 0}
+        self.stages = {}  # Stage name -> [runs, cached runs, wall s, cpu s, max peak bytes]
+        self.tokens = 0
+        self.ast_nodes = 0
+        self.wall_time = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, metrics):
+        outcome = "cached" if metrics.cache_hit else "error" if metrics.error else "ok"
+        with self._lock:
+            self.compilations[outcome] += 1
+            self.wall_time += metrics.wall_time
+            self.tokens += metrics.tokens or 0
+            self.ast_nodes += metrics.ast_nodes or 0
+            for stage in metrics.stages.values():
+                totals = self.stages.setdefault(stage.stage, [0, 0, 0.0, 0.0, 0])
+                totals[0] += 1
+                totals[1] += stage.cached
+                totals[2] += stage.wall_time
+                totals[3] += stage.cpu_time
+                totals[4] = max(totals[4], stage.peak_memory or 0)
+
+    def to_prometheus(self, prefix="kjpl"):
+        with self._lock:
+            compilations = dict(self.compilations)
+            stages = {stage: list(totals) for stage, totals in self.stages.items()}
+            scalars = (self.wall_time, self.tokens, self.ast_nodes)
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        metric("compilations_total", "counter", "Compilations by outcome.",
+               [(f'{{outcome="{outcome}"}}', count) for outcome, count in compilations.items()])
+        metric("compile_seconds_total", "counter", "Wall-clock time spent in compile().", [("", scalars[0])])
+        metric("tokens_total", "counter", "Tokens produced by the lexer.", [("", scalars[1])])
+        metric("ast_nodes_total", "counter", "AST nodes produced by the parser.", [("", scalars[2])])
+        for index, (name, help_text) in enumerate((
+            ("stage_runs_total", "Times each stage ran or was reused."),
+            ("stage_cache_hits_total", "Times each stage was reused from the stage cache."),
+            ("stage_seconds_total", "Wall-clock time spent in each stage."),
+            ("stage_cpu_seconds_total", "CPU time spent in each stage."),
+        )):
+            metric(name, "counter", help_text,
+                   [(f'{{stage="{stage}"}}', totals[index]) for stage, totals in stages.items()])
+        if self.track_memory:
+            metric("stage_peak_memory_bytes", "gauge", "Largest peak allocation seen in each stage.",
+                   [(f'{{stage="{stage}"}}', totals[4]) for stage, totals in stages.items()])
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,273 @@
+# optimizer.py
+from parser import ast_nodes
+from visitor import build_dispatch_table, fold_expression
+
+# Bump whenever the optimized AST for a given input can change
+OPTIMIZER_VERSION = "2"
+
+# Folded values must fit the C `int` the code generator declares
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+COMPARISONS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class ConstantFolder:
+    """
+    Optimization pass run between semantic analysis and code generation.
+
+    Folds constant arithmetic, applies the identities x + 0, x - 0, x * 1,
+    x / 1 and x * 0 (when x contains no division that could trap), and
+    prunes if/while statements whose condition is constant. Arithmetic
+    follows C int semantics: division truncates toward zero, and nothing
+    is folded if it would divide by zero or leave the int range.
+
+    Changed nodes are rebuilt rather than mutated, so the input tree is
+    left untouched.
+
+    A pruned branch may have been the only place a variable is assigned
+    before it is read. Unfolded, the code generator would declare it as
+    zero before the top-level statement holding the branch, so the folder
+    puts a zero assignment there instead. symbol_table (the one filled in by
+    semantic analysis) gives the variables' types when the tree's
+    identifiers were not resolved, as in a tree restored from the stage
+    cache.
+    """
+
+    def __init__(self, symbol_table=None):
+        self.symbol_table = symbol_table
+        self._pruned = []  # Assignment targets in branches pruned since the last top-level statement
+        # Statement handlers return the list of statements to emit instead
+        self._folders = build_dispatch_table(self, "_fold_", self._keep, lambda cls: cls.type)
+
+    def optimize(self, program, assigned=()):
+        """
+        Fold a program. assigned holds the names of variables assigned
+        before it, when the program continues another one (see incremental.py).
+        """
+        return ast_nodes.ProgramNode(
+            statements=self._fold_top_level(program.statements, set(assigned)),
+            lineno=program.lineno,
+        )
+
+    # --------------------------
+    # Statements
+    # --------------------------
+    def _fold_top_level(self, statements, assigned):
+        """
+        Fold the top-level statements of a program or function body, zero
+        initializing before each one the variables first assigned in one
+        of its pruned branches.
+        """
+        folded = []
+        saved, self._pruned = self._pruned, []
+        for statement in statements:
+            kept = self._folders[statement.kind](statement)
+            for identifier in self._pruned:
+                if identifier.name not in assigned:
+                    assigned.add(identifier.name)
+                    folded.append(ast_nodes.AssignmentNode(
+                        identifier, self._zero(identifier, statement.lineno), lineno=statement.lineno,
+                    ))
+            self._pruned = []
+            assigned.update(identifier.name for identifier in _assignment_targets([statement]))
+            folded += kept
+        self._pruned = saved
+        return folded
+
+    def _fold_block(self, statements):
+        folded = []
+        for statement in statements:
+            folded += self._folders[statement.kind](statement)
+        return folded
+
+    def _keep(self, node):
+        return [node]
+
+    def _fold_assignment(self, node):
+        expression = self._fold_expression(node.expression)
+        if expression is node.expression:
+            return [node]
+        return [ast_nodes.AssignmentNode(node.identifier, expression, lineno=node.lineno)]
+
+    def _fold_print(self, node):
+        expression = self._fold_expression(node.expression)
+        if expression is node.expression:
+            return [node]
+        return [ast_nodes.PrintNode(expression, lineno=node.lineno)]
+
+    def _fold_return(self, node):
+        return [ast_nodes.ReturnNode(self._fold_expression(node.expression), lineno=node.lineno)]
+
+    def _fold_if(self, node):
+        condition, value = self._fold_comparison(node.condition)
+        if value is True:
+            self._pruned += _assignment_targets(node.else_block or [])
+            return self._fold_block(node.then_block)
+        if value is False:
+            self._pruned += _assignment_targets(node.then_block)
+            return self._fold_block(node.else_block) if node.else_block else []
+        else_block = self._fold_block(node.else_block) if node.else_block else None
+        return [ast_nodes.IfNode(condition, self._fold_block(node.then_block), else_block, lineno=node.lineno)]
+
+    def _fold_while(self, node):
+        condition, value = self._fold_comparison(node.condition)
+        if value is False:
+            self._pruned += _assignment_targets(node.body)
+            return []  # The body never runs
+        return [ast_nodes.WhileNode(condition, self._fold_block(node.body), lineno=node.lineno)]
+
+    def _fold_function(self, node):
+        return_expression = node.return_expression
+        if return_expression is not None:
+            return_expression = self._fold_expression(return_expression)
+        return [ast_nodes.FunctionNode(
+            node.name, node.params, self._fold_top_level(node.body, set(node.params)), return_expression,
+            lineno=node.lineno,
+        )]
+
+    def _zero(self, identifier, lineno):
+        """
+        Return the literal a variable is zero initialized with.
+        """
+        symbol = identifier.symbol
+        if symbol is None and self.symbol_table is not None:
+            symbol = self.symbol_table.resolve(identifier.name)
+        var_type = symbol.type if symbol is not None else "int"
+        if var_type == "float":
+            return ast_nodes.NumberNode(0.0, lineno=lineno)
+        if var_type == "string":
+            return ast_nodes.StringNode("", lineno=lineno)
+        if var_type == "bool":
+            return ast_nodes.BooleanNode(False, lineno=lineno)
+        return ast_nodes.NumberNode(0, lineno=lineno)
+
+    # --------------------------
+    # Expressions
+    # --------------------------
+    def _fold_comparison(self, node):
+        """
+        Return (folded condition, True/False if it is constant else None).
+        """
+        left = self._fold_expression(node.left)
+        right = self._fold_expression(node.right)
+        if _is_int(left) and _is_int(right):
+            return node, COMPARISONS[node.operator](left.value, right.value)
+        if left is node.left and right is node.right:
+            return node, None
+        return ast_nodes.ConditionNode(left, node.operator, right, lineno=node.lineno), None
+
+    def _fold_expression(self, node):
+        return fold_expression(node, _operand, self._combine)
+
+    def _combine(self, node, left, right):
+        if _is_int(left) and _is_int(right):
+            value = evaluate(node.operator, left.value, right.value)
+            if value is not None:
+                return ast_nodes.NumberNode(value, lineno=node.lineno)
+
+        simplified = _simplify(node.operator, left, right)
+        if simplified is not None:
+            return simplified
+        if left is node.left and right is node.right:
+            return node
+        return ast_nodes.BinaryOpNode(left, node.operator, right, lineno=node.lineno)
+
+
+# --------------------------
+# Helpers
+# --------------------------
+def _operand(node):
+    return node
+
+def _assignment_targets(statements):
+    """
+    Return the identifiers assigned in statements and the blocks nested in
+    them (not in functions, which have their own scope), in order.
+    """
+    targets = []
+    stack = list(reversed(statements))
+    while stack:
+        statement = stack.pop()
+        if statement.kind == ast_nodes.AssignmentNode.kind:
+            targets.append(statement.identifier)
+        elif statement.kind == ast_nodes.IfNode.kind:
+            stack += reversed(statement.then_block + (statement.else_block or []))
+        elif statement.kind == ast_nodes.WhileNode.kind:
+            stack += reversed(statement.body)
+    return targets
+
+def _is_int(node, value=None):
+    if node.kind != ast_nodes.NumberNode.kind or type(node.value) is not int:
+        return False
+    return value is None or node.value == value
+
+def evaluate(operator, a, b):
+    """
+    Evaluate a C int operation, or return None if it cannot be folded.
+    """
+    if not (INT_MIN <= a <= INT_MAX and INT_MIN <= b <= INT_MAX):
+        return None
+    if operator == "+":
+        result = a + b
+    elif operator == "-":
+        result = a - b
+    elif operator == "*":
+        result = a * b
+    elif operator == "/":
+        if b == 0:
+            return None
+        result = abs(a) // abs(b)
+        if (a < 0) != (b < 0):
+            result = -result  # C truncates toward zero
+    else:
+        return None
+    if not INT_MIN <= result <= INT_MAX:
+        return None  # Signed overflow is undefined in C; leave it to gcc
+    return result
+
+def _simplify(operator, left, right):
+    """
+    Apply algebraic identities, or return None if none applies.
+    """
+    if operator == "+":
+        if _is_int(right, 0):
+            return left
+        if _is_int(left, 0):
+            return right
+    elif operator == "-":
+        if _is_int(right, 0):
+            return left
+    elif operator == "*":
+        if _is_int(right, 1):
+            return left
+        if _is_int(left, 1):
+            return right
+        if _is_int(right, 0) and not _may_trap(left):
+            return right
+        if _is_int(left, 0) and not _may_trap(right):
+            return left
+    elif operator == "/":
+        if _is_int(right, 1):
+            return left
+    return None
+
+def _may_trap(node):
+    """
+    True if evaluating node could divide by zero at run time.
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if node.kind == ast_nodes.BinaryOpNode.kind:
+            if node.operator == "/":
+                return True
+            stack += (node.left, node.right)
+    return False
@@ -1,6 +1,10 @@
+import copy
+
 from ply import yacc
 from lexer import tokens  # Import tokens from lexer.py
-import ast_nodes  # Custom AST node classes (defined below)
+
+# Bump whenever the grammar, the shape of ast_nodes or the dump_ast format changes
+PARSER_VERSION = "5"
 
 # Precedence rules for operators (adjust based on KJPL's rules)
 precedence = (
@@ -16,7 +20,7 @@ def p_program(p):
     '''
     program : statements
     '''
-    p[0] = ast_nodes.ProgramNode(statements=p[1])
+    p[0] = ast_nodes.ProgramNode(statements=p[1], lineno=1)
 
 def p_statements(p):
     '''
@@ -24,9 +28,12 @@ def p_statements(p):
                | statement
     '''
     if len(p) == 3:
-        p[0] = p[1] + [p[2]]
+        # Extend the list in place: copying it would make long programs quadratic
+        if p[2] is not None:
+            p[1].append(p[2])
+        p[0] = p[1]
     else:
-        p[0] = [p[1]]
+        p[0] = [p[1]] if p[1] is not None else []
 
 def p_statement(p):
     '''
@@ -42,13 +49,17 @@ def p_assignment_stmt(p):
     '''
     assignment_stmt : IDENTIFIER ASSIGN expression SEMICOLON
     '''
-    p[0] = ast_nodes.AssignmentNode(identifier=p[1], expression=p[3])
+    p[0] = ast_nodes.AssignmentNode(
+        identifier=p.parser.node_factory.IdentifierNode(name=p[1], lineno=p.lineno(1)),
+        expression=p[3],
+        lineno=p.lineno(1),
+    )
 
 def p_print_stmt(p):
     '''
     print_stmt : PRINT LPAREN expression RPAREN SEMICOLON
     '''
-    p[0] = ast_nodes.PrintNode(expression=p[3])
+    p[0] = ast_nodes.PrintNode(expression=p[3], lineno=p.lineno(1))
 
 def p_if_stmt(p):
     '''
@@ -56,21 +67,26 @@ def p_if_stmt(p):
             | IF LPAREN condition RPAREN LBRACE statements RBRACE ELSE LBRACE statements RBRACE
     '''
     if len(p) == 8:
-        p[0] = ast_nodes.IfNode(condition=p[3], then_block=p[6], else_block=None)
+        p[0] = ast_nodes.IfNode(condition=p[3], then_block=p[6], else_block=None, lineno=p.lineno(1))
     else:
-        p[0] = ast_nodes.IfNode(condition=p[3], then_block=p[6], else_block=p[10])
+        p[0] = ast_nodes.IfNode(condition=p[3], then_block=p[6], else_block=p[10], lineno=p.lineno(1))
 
 def p_while_stmt(p):
     '''
     while_stmt : WHILE LPAREN condition RPAREN LBRACE statements RBRACE
     '''
-    p[0] = ast_nodes.WhileNode(condition=p[3], body=p[6])
+    p[0] = ast_nodes.WhileNode(condition=p[3], body=p[6], lineno=p.lineno(1))
 
 def p_condition(p):
     '''
-    condition : expression COMPARISON expression
+    condition : expression EQ expression
+              | expression NEQ expression
+              | expression LT expression
+              | expression GT expression
+              | expression LEQ expression
+              | expression GEQ expression
     '''
-    p[0] = ast_nodes.ConditionNode(left=p[1], operator=p[2], right=p[3])
+    p[0] = p.parser.node_factory.ConditionNode(left=p[1], operator=p[2], right=p[3], lineno=p.lineno(2))
 
 def p_expression(p):
     '''
@@ -79,7 +95,7 @@ def p_expression(p):
                | term
     '''
     if len(p) == 4:
-        p[0] = ast_nodes.BinaryOpNode(left=p[1], operator=p[2], right=p[3])
+        p[0] = p.parser.node_factory.BinaryOpNode(left=p[1], operator=p[2], right=p[3], lineno=p.lineno(2))
     else:
         p[0] = p[1]
 
@@ -90,22 +106,32 @@ def p_term(p):
          | factor
     '''
     if len(p) == 4:
-        p[0] = ast_nodes.BinaryOpNode(left=p[1], operator=p[2], right=p[3])
+        p[0] = p.parser.node_factory.BinaryOpNode(left=p[1], operator=p[2], right=p[3], lineno=p.lineno(2))
     else:
         p[0] = p[1]
 
 def p_factor(p):
     '''
-    factor : NUMBER
+    factor : INTEGER
+           | FLOAT_NUMBER
+           | STRING_LITERAL
+           | TRUE
+           | FALSE
            | IDENTIFIER
            | LPAREN expression RPAREN
     '''
-    if isinstance(p[1], int):
-        p[0] = ast_nodes.NumberNode(value=p[1])
-    elif p[1] == '(':
+    token = p.slice[1].type
+    nodes = p.parser.node_factory
+    if token in ('INTEGER', 'FLOAT_NUMBER'):
+        p[0] = nodes.NumberNode(value=p[1], lineno=p.lineno(1))
+    elif token == 'STRING_LITERAL':
+        p[0] = nodes.StringNode(value=p[1], lineno=p.lineno(1))
+    elif token in ('TRUE', 'FALSE'):
+        p[0] = nodes.BooleanNode(value=token == 'TRUE', lineno=p.lineno(1))
+    elif token == 'LPAREN':
         p[0] = p[2]
     else:
-        p[0] = ast_nodes.IdentifierNode(name=p[1])
+        p[0] = nodes.IdentifierNode(name=p[1], lineno=p.lineno(1))
 
 def p_empty(p):
     '''
@@ -126,51 +152,319 @@ def p_error(p):
 # Abstract Syntax Tree (AST) Nodes
 # --------------------------
 class ast_nodes:
-    class ProgramNode:
-        def __init__(self, statements):
+    class Node:
+        """
+        Base class for every AST node.
+
+        Nodes use __slots__ instead of a per-instance __dict__. Each subclass
+        lists its child fields in _fields (in constructor order) and carries a
+        string `type` tag and an integer `kind` tag; `lineno` is the source
+        line the node starts on (0 when built by hand).
+        """
+        __slots__ = ("lineno",)
+        _fields = ()
+        type = None
+        kind = -1
+
+        def __repr__(self):
+            fields = ", ".join(f"{field}={getattr(self, field)!r}" for field in self._fields)
+            return f"{type(self).__name__}({fields})"
+
+    class ProgramNode(Node):
+        __slots__ = _fields = ("statements",)
+        type = "program"
+        kind = 0
+
+        def __init__(self, statements, lineno=0):
             self.statements = statements
+            self.lineno = lineno
 
-    class AssignmentNode:
-        def __init__(self, identifier, expression):
+    class AssignmentNode(Node):
+        __slots__ = _fields = ("identifier", "expression")
+        type = "assignment"
+        kind = 1
+
+        def __init__(self, identifier, expression, lineno=0):
             self.identifier = identifier
             self.expression = expression
+            self.lineno = lineno
+
+    class PrintNode(Node):
+        __slots__ = _fields = ("expression",)
+        type = "print"
+        kind = 2
 
-    class PrintNode:
-        def __init__(self, expression):
+        def __init__(self, expression, lineno=0):
             self.expression = expression
+            self.lineno = lineno
 
-    class IfNode:
-        def __init__(self, condition, then_block, else_block):
+    class IfNode(Node):
+        __slots__ = _fields = ("condition", "then_block", "else_block")
+        type = "if"
+        kind = 3
+
+        def __init__(self, condition, then_block, else_block, lineno=0):
             self.condition = condition
             self.then_block = then_block
             self.else_block = else_block
+            self.lineno = lineno
+
+    class WhileNode(Node):
+        __slots__ = _fields = ("condition", "body")
+        type = "while"
+        kind = 4
 
-    class WhileNode:
-        def __init__(self, condition, body):
+        def __init__(self, condition, body, lineno=0):
             self.condition = condition
             self.body = body
+            self.lineno = lineno
 
-    class ConditionNode:
-        def __init__(self, left, operator, right):
+    class FunctionNode(Node):
+        __slots__ = _fields = ("name", "params", "body", "return_expression")
+        type = "function"
+        kind = 5
+
+        def __init__(self, name, params, body, return_expression=None, lineno=0):
+            self.name = name
+            self.params = params
+            self.body = body
+            self.return_expression = return_expression
+            self.lineno = lineno
+
+    class ReturnNode(Node):
+        __slots__ = _fields = ("expression",)
+        type = "return"
+        kind = 6
+
+        def __init__(self, expression, lineno=0):
+            self.expression = expression
+            self.lineno = lineno
+
+    class ConditionNode(Node):
+        __slots__ = _fields = ("left", "operator", "right")
+        type = "condition"
+        kind = 7
+
+        def __init__(self, left, operator, right, lineno=0):
             self.left = left
             self.operator = operator
             self.right = right
+            self.lineno = lineno
+
+    class BinaryOpNode(Node):
+        __slots__ = _fields = ("left", "operator", "right")
+        type = "binary_op"
+        kind = 8
 
-    class BinaryOpNode:
-        def __init__(self, left, operator, right):
+        def __init__(self, left, operator, right, lineno=0):
             self.left = left
             self.operator = operator
             self.right = right
+            self.lineno = lineno
+
+    class NumberNode(Node):
+        __slots__ = _fields = ("value",)
+        type = "number"
+        kind = 9
 
-    class NumberNode:
-        def __init__(self, value):
+        def __init__(self, value, lineno=0):
             self.value = value
+            self.lineno = lineno
 
-    class IdentifierNode:
-        def __init__(self, name):
+    class IdentifierNode(Node):
+        __slots__ = ("name", "symbol")
+        _fields = ("name",)
+        type = "identifier"
+        kind = 10
+
+        def __init__(self, name, lineno=0):
             self.name = name
+            self.symbol = None  # symbols.Symbol, set by semantic analysis
+            self.lineno = lineno
+
+    class StringNode(Node):
+        __slots__ = _fields = ("value",)
+        type = "string"
+        kind = 11
+
+        def __init__(self, value, lineno=0):
+            self.value = value
+            self.lineno = lineno
+
+    class BooleanNode(Node):
+        __slots__ = _fields = ("value",)
+        type = "boolean"
+        kind = 12
+
+        def __init__(self, value, lineno=0):
+            self.value = value
+            self.lineno = lineno
+
+# Node classes indexed by their kind tag
+ast_nodes.KINDS = (
+    ast_nodes.ProgramNode, ast_nodes.AssignmentNode, ast_nodes.PrintNode,
+    ast_nodes.IfNode, ast_nodes.WhileNode, ast_nodes.FunctionNode,
+    ast_nodes.ReturnNode, ast_nodes.ConditionNode, ast_nodes.BinaryOpNode,
+    ast_nodes.NumberNode, ast_nodes.IdentifierNode, ast_nodes.StringNode,
+    ast_nodes.BooleanNode,
+)
+
+# --------------------------
+# Hash-Consing
+# --------------------------
+class ExpressionInterner:
+    """
+    Node factory that hash-conses expression nodes: it has the expression
+    node constructors of ast_nodes, but returns the node already built for
+    a structurally identical expression instead of a new one. An AST
+    parsed with it is a DAG in which every distinct subexpression exists
+    once, so its memory scales with the distinct subexpressions.
+
+    Children are interned before their parents, so a node's key holds its
+    children themselves, compared by identity. Line numbers are not part
+    of the key: a shared node has the line of its first occurrence.
+
+    Nodes requested more than once are collected in `shared`, for passes
+    that memoize their results per node (SemanticAnalyzer, CodeGenerator).
+    Interned nodes must be treated as immutable, apart from the `symbol`
+    of identifiers, which is the same for every occurrence in a scope.
+    """
+
+    def __init__(self):
+        self.table = {}      # Structural key -> node
+        self.shared = set()  # Nodes returned more than once
+        self.requests = 0
+
+    def _intern(self, key, cls, fields, lineno):
+        self.requests += 1
+        node = self.table.get(key)
+        if node is None:
+            node = self.table[key] = cls(*fields, lineno)
+        else:
+            self.shared.add(node)
+        return node
+
+    def BinaryOpNode(self, left, operator, right, lineno=0):
+        cls = ast_nodes.BinaryOpNode
+        return self._intern((cls.kind, left, operator, right), cls, (left, operator, right), lineno)
+
+    def ConditionNode(self, left, operator, right, lineno=0):
+        cls = ast_nodes.ConditionNode
+        return self._intern((cls.kind, left, operator, right), cls, (left, operator, right), lineno)
+
+    def NumberNode(self, value, lineno=0):
+        # The type is part of the key so that 1 and 1.0 stay apart
+        cls = ast_nodes.NumberNode
+        return self._intern((cls.kind, type(value), value), cls, (value,), lineno)
+
+    def IdentifierNode(self, name, lineno=0):
+        cls = ast_nodes.IdentifierNode
+        return self._intern((cls.kind, name), cls, (name,), lineno)
+
+    def StringNode(self, value, lineno=0):
+        cls = ast_nodes.StringNode
+        return self._intern((cls.kind, value), cls, (value,), lineno)
+
+    def BooleanNode(self, value, lineno=0):
+        cls = ast_nodes.BooleanNode
+        return self._intern((cls.kind, value), cls, (value,), lineno)
+
+# --------------------------
+# AST Serialization (for stage caching)
+# --------------------------
+def _child_nodes(node):
+    """
+    Yield the direct child nodes of `node` in field order.
+    """
+    for field in node._fields:
+        value = getattr(node, field)
+        if isinstance(value, ast_nodes.Node):
+            yield value
+        elif isinstance(value, list):
+            yield from (item for item in value if isinstance(item, ast_nodes.Node))
+
+def dump_ast(root):
+    """
+    Convert an AST into a flat, JSON-compatible list of nodes in post-order.
+
+    Each entry is [class name, lineno, field values...], where a child node
+    is written as {"node": index of its entry}; the root is the last entry.
+    The tree is walked with an explicit stack, so deeply nested expressions
+    neither hit the recursion limit nor nest in the JSON.
+    """
+    entries = []
+    refs = []  # {"node": index} of finished subtrees, in visiting order
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        children = list(_child_nodes(node))
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(children))
+            continue
+        first = len(refs) - len(children)
+        done = iter(refs[first:])
+        del refs[first:]
+        entry = [type(node).__name__, node.lineno]
+        for field in node._fields:
+            value = getattr(node, field)
+            if isinstance(value, ast_nodes.Node):
+                value = next(done)
+            elif isinstance(value, list):
+                value = [next(done) if isinstance(item, ast_nodes.Node) else item for item in value]
+            entry.append(value)
+        refs.append({"node": len(entries)})
+        entries.append(entry)
+    return entries
+
+def load_ast(entries):
+    """
+    Rebuild an AST produced by dump_ast. Children always precede their
+    parent in the list, so one pass in order rebuilds it without recursion.
+    """
+    nodes = []
+
+    def resolve(value):
+        return nodes[value["node"]] if isinstance(value, dict) else value
+
+    for name, lineno, *fields in entries:
+        values = [[resolve(item) for item in value] if isinstance(value, list) else resolve(value)
+                  for value in fields]
+        nodes.append(getattr(ast_nodes, name)(*values, lineno=lineno))
+    return nodes[-1]
 
 # --------------------------
 # Build the Parser
 # --------------------------
-parser = yacc.yacc()
+def _build_parser():
+    """
+    Load the LALR tables shipped in kjpl_parsetab.py (see build_tables.py)
+    without introspecting the grammar. Falls back to generating the tables
+    in memory, without writing parser.out or parsetab.py, if the shipped
+    tables are missing or stale.
+    """
+    try:
+        import kjpl_parsetab
+    except ImportError:
+        kjpl_parsetab = None
+
+    if kjpl_parsetab is not None and getattr(kjpl_parsetab, "_kjpl_version", None) == PARSER_VERSION:
+        try:
+            lr = yacc.LRTable()
+            lr.read_table(kjpl_parsetab)
+            lr.bind_callables(globals())
+            return yacc.LRParser(lr, p_error)
+        except yacc.VersionError:
+            pass  # Tables written by a different PLY release
+    return yacc.yacc(debug=False, write_tables=False)
+
+parser = _build_parser()
+parser.node_factory = ast_nodes  # Or an ExpressionInterner, to hash-cons expressions
+
+def clone_parser(template=parser):
+    """
+    Return a parser sharing the LALR tables of template but not its parse
+    state, the counterpart of lexer.clone(). A PLY parser keeps the stacks
+    of the parse in progress on itself, so concurrent parses need one each.
+    """
+    return copy.copy(template)
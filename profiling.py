@@ -0,0 +1,237 @@
+# profiling.py
+"""
+Profile one compilation by grammar production, lexer rule and visitor method.
+
+    python profiling.py FILE [-O LEVEL] [--limit N] [--collapsed OUT.folded]
+"""
+import argparse
+import copy
+import sys
+import time
+
+# Prefixes of the methods profiled on each visitor, and its dispatch tables
+VISITORS = {
+    "semantic": ("semantic_analyzer", ("_check_", "_infer_"), ("_checkers", "_inferers")),
+    "codegen": ("code_generator", ("visit_",), ("_visitors",)),
+}
+
+
+class CompilationProfiler:
+    """
+    Attributes the time of one compilation to the pipeline stages, PLY
+    lexer rules, grammar productions, and the semantic analyzer's and code
+    generator's visitor methods.
+
+    Pass one to KJPLCompiler.compile(profiler=...). That compilation runs
+    on a private context whose lexer rules, production actions and visitor
+    methods are wrapped, bypassing the caches; other compilations are not
+    affected. Each entry counts calls and accumulates total time (including
+    profiled calls it makes, counted once under recursion) and self time
+    (excluding them); each call path's self time is kept for collapsed-stack
+    output.
+
+    Attribution:
+    - A token is charged to the rule that produced it, including the cost
+      of matching any input skipped before it. The actions of rules that
+      discard their match (t_newline, comments) are entries of their own.
+      Rules are attributed for the ply lexer backend only.
+    - Productions are attributed for the ply parser backend only; with the
+      rd backend all parsing is the self time of the syntax stage.
+    - Parser work outside production actions (table lookups, shifts) is the
+      self time of the syntax stage.
+    - Wrapping costs around a microsecond per call, so compare entries with
+      each other rather than with unprofiled compile times.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.entries = {}  # (category, name) -> [calls, total seconds, self seconds]
+        self.stacks = {}   # "frame;frame;..." -> self seconds
+        self._stack = []   # [key, seconds spent in profiled callees] per call in progress
+        self._produced_by = None  # Function rule that returned the current token
+
+    # --------------------------
+    # Instrumentation
+    # --------------------------
+    def instrument(self, context):
+        """
+        Wrap the lexer, parser and visitors of a CompilationContext.
+        """
+        self._instrument_lexer(context.lexer)
+        self._instrument_parser(context.parser)
+        for category, (attribute, prefixes, tables) in VISITORS.items():
+            self._instrument_visitor(getattr(context, attribute), category, prefixes, tables)
+
+    def _instrument_lexer(self, lexer):
+        lexer.lexre = [
+            (regex, [self._wrap_rule(entry) for entry in functions]) for regex, functions in lexer.lexre
+        ]
+        token = lexer.token
+
+        def profiled_token():
+            self._produced_by = None
+            self._stack.append([None, 0.0])
+            start = self.clock()
+            tok = None
+            try:
+                tok = token()
+                return tok
+            finally:
+                if self._produced_by is not None:
+                    rule = self._produced_by
+                else:
+                    rule = f"t_{tok.type}" if tok is not None else "<end of input>"
+                self._stack[-1][0] = ("lexer", rule)
+                self._exit(self.clock() - start)
+
+        lexer.token = profiled_token
+
+    def _wrap_rule(self, entry):
+        if not entry or not entry[0]:
+            return entry  # String rules are charged through the token they produce
+        function, token_type = entry
+        name = function.__name__
+
+        def profiled_rule(tok):
+            start = self.clock()
+            result = function(tok)
+            elapsed = self.clock() - start
+            if result:
+                self._produced_by = name
+            else:
+                self._stack.append([("lexer", name), 0.0])
+                self._exit(elapsed)
+            return result
+
+        return profiled_rule, token_type
+
+    def _instrument_parser(self, parser):
+        productions = []
+        for production in parser.productions:
+            if production.callable is not None:
+                production = copy.copy(production)
+                production.callable = self.wrap("grammar", f"{production.func} [{production.str}]", production.callable)
+            productions.append(production)
+        parser.productions = productions
+
+    def _instrument_visitor(self, visitor, category, prefixes, tables):
+        wrapped = {}
+        for name in dir(type(visitor)):
+            if name.startswith(prefixes):
+                method = getattr(visitor, name)
+                wrapped[name] = self.wrap(category, f"{type(visitor).__name__}.{name}", method)
+                setattr(visitor, name, wrapped[name])
+        # The dispatch tables hold the bound methods resolved at construction
+        for table in tables:
+            setattr(visitor, table, [wrapped.get(handler.__name__, handler) for handler in getattr(visitor, table)])
+
+    def wrap(self, category, name, function):
+        """
+        Return function wrapped to be profiled as (category, name).
+        """
+        key = (category, name)
+
+        def profiled(*args):
+            self._stack.append([key, 0.0])
+            start = self.clock()
+            try:
+                return function(*args)
+            finally:
+                self._exit(self.clock() - start)
+
+        profiled.__name__ = getattr(function, "__name__", name)
+        return profiled
+
+    def _exit(self, elapsed):
+        """
+        Close the innermost call in progress, which took elapsed seconds.
+        """
+        key, callees = self._stack[-1]
+        # A token's frame is unnamed until its rule is known; rules it skipped
+        # input with are recorded beside it rather than under it
+        path = ";".join(f"{frame[0][0]}:{frame[0][1]}" for frame in self._stack if frame[0] is not None)
+        self._stack.pop()
+        self_time = elapsed - callees
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[2] += self_time
+        if all(frame[0] != key for frame in self._stack):
+            entry[1] += elapsed  # Not inside another call of itself
+        self.stacks[path] = self.stacks.get(path, 0.0) + self_time
+        if self._stack:
+            self._stack[-1][1] += elapsed
+
+    # --------------------------
+    # Reporting
+    # --------------------------
+    @property
+    def total_time(self):
+        return sum(self.stacks.values())
+
+    def report(self, limit=None):
+        """
+        Return the entries sorted by self time as a text table, preceded by
+        the self time of each category.
+        """
+        total = self.total_time or 1.0
+        by_category = {}
+        for (category, _), (_, _, self_time) in self.entries.items():
+            by_category[category] = by_category.get(category, 0.0) + self_time
+        lines = [f"Profiled {self.total_time * 1000:.2f} ms"]
+        for category, self_time in sorted(by_category.items(), key=lambda item: -item[1]):
+            lines.append(f"  {category:<10}{self_time * 1000:10.3f} ms {self_time / total:7.1%}")
+        lines.append("")
+        lines.append(f"{'self ms':>10}{'self %':>8}{'total ms':>10}{'calls':>9}{'us/call':>11}  entry")
+        rows = sorted(self.entries.items(), key=lambda item: -item[1][2])
+        for (category, name), (calls, total_time, self_time) in rows[:limit]:
+            lines.append(
+                f"{self_time * 1000:10.3f}{self_time / total:8.1%}{total_time * 1000:10.3f}"
+                f"{calls:9d}{self_time / calls * 1e6:11.2f}  {category}:{name}"
+            )
+        return "\n".join(lines)
+
+    def write_collapsed(self, stream):
+        """
+        Write the call paths in the collapsed-stack format read by
+        flamegraph.pl and speedscope: one "frame;frame;frame weight" line
+        per path, weighted by self time in microseconds.
+        """
+        for path, self_time in sorted(self.stacks.items()):
+            weight = round(self_time * 1e6)
+            if weight > 0:
+                stream.write(f"{path} {weight}\n")
+
+
+# --------------------------
+# Command Line
+# --------------------------
+def main(argv=None):
+    from compiler import KJPLCompiler
+
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("file", help="KJPL source file")
+    arg_parser.add_argument("-O", "--opt-level", type=int, default=0, choices=KJPLCompiler.OPT_LEVELS)
+    arg_parser.add_argument("--limit", type=int, default=30, help="entries to list (default 30)")
+    arg_parser.add_argument("--collapsed", default=None, help="write collapsed stacks for a flame graph here")
+    args = arg_parser.parse_args(argv)
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        source_code = f.read()
+    profiler = CompilationProfiler()
+    status = 0
+    try:
+        KJPLCompiler(opt_level=args.opt_level).compile(source_code, profiler=profiler)
+    except Exception as e:
+        print(f"Compilation failed: {e}", file=sys.stderr)
+        status = 1
+    print(profiler.report(args.limit))
+    if args.collapsed:
+        with open(args.collapsed, "w", encoding="utf-8") as f:
+            profiler.write_collapsed(f)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# rdparser.py
+"""
+Hand-written parser backend: a loop-based recursive-descent parser for
+statements with precedence climbing for expressions. It builds the same
+ast_nodes tree as the PLY parser in parser.py, including line numbers,
+without PLY's per-reduction overhead.
+"""
+from parser import ast_nodes, precedence
+
+# -------------------------------------
+# Operator Tables
+# -------------------------------------
+def _binding_powers(precedence):
+    """
+    Map each binary operator token to (power, power required of its right
+    operand), from a PLY precedence table listed lowest binding first.
+    """
+    powers = {}
+    for power, (associativity, *operators) in enumerate(precedence, 1):
+        if associativity not in ("left", "right"):
+            raise ValueError(f"Unsupported associativity '{associativity}' in precedence table.")
+        right_power = power + 1 if associativity == "left" else power
+        for operator in operators:
+            powers[operator] = (power, right_power)
+    return powers
+
+BINARY_OPERATORS = _binding_powers(precedence)
+COMPARISONS = frozenset(("EQ", "NEQ", "LT", "GT", "LEQ", "GEQ"))
+
+# -------------------------------------
+# Parser
+# -------------------------------------
+class RecursiveDescentParser:
+    """
+    Parses one token stream. Tokens are anything with type, value and
+    lineno attributes (ply LexTokens or fastlexer Tokens), consumed one at
+    a time with a single token of lookahead, so a generator works as well
+    as a list.
+
+    Unlike the PLY parser, which reports a syntax error and then recovers
+    by discarding input, the first syntax error raises SyntaxError.
+
+    Nodes are constructed with positional arguments: keyword arguments
+    cost a measurable share of the parse on large programs. Expression
+    nodes come from node_factory, ast_nodes or a parser.ExpressionInterner.
+    """
+
+    def __init__(self, tokens, node_factory=ast_nodes):
+        self._tokens = iter(tokens)
+        self._nodes = node_factory
+        self.token = next(self._tokens, None)  # Lookahead; None at end of input
+        self._statement_parsers = {
+            "IDENTIFIER": self._assignment,
+            "PRINT": self._print,
+            "IF": self._if,
+            "WHILE": self._while,
+        }
+
+    def parse(self):
+        try:
+            statements = self._statements()
+        except RecursionError:
+            raise SyntaxError(f"Syntax error at line {self._line()}: Nesting too deep") from None
+        if self.token is not None:
+            self._error()
+        return ast_nodes.ProgramNode(statements, 1)
+
+    def statement(self):
+        """
+        Parse the single statement at the lookahead token and return it,
+        leaving the token after it as the lookahead. Used to parse a program
+        one top-level statement at a time (see incremental.py).
+        """
+        statement = self._statement_parsers.get(self.token.type) if self.token is not None else None
+        if statement is None:
+            self._error()
+        try:
+            return statement()
+        except RecursionError:
+            raise SyntaxError(f"Syntax error at line {self._line()}: Nesting too deep") from None
+
+    # --------------------------
+    # Token Handling
+    # --------------------------
+    def _advance(self):
+        token = self.token
+        self.token = next(self._tokens, None)
+        return token
+
+    def _expect(self, token_type):
+        token = self.token
+        if token is None or token.type != token_type:
+            self._error()
+        self.token = next(self._tokens, None)
+        return token
+
+    def _line(self):
+        return self.token.lineno if self.token is not None else "end"
+
+    def _error(self):
+        """
+        Raise the message p_error prints for the lookahead token.
+        """
+        if self.token is None:
+            raise SyntaxError("Syntax error: Unexpected end of input")
+        raise SyntaxError(f"Syntax error at line {self.token.lineno}: Unexpected token '{self.token.value}'")
+
+    # --------------------------
+    # Statements
+    # --------------------------
+    def _statements(self):
+        """
+        Parse statements up to a token that cannot start one.
+        """
+        statements = []
+        parsers = self._statement_parsers
+        while self.token is not None:
+            statement = parsers.get(self.token.type)
+            if statement is None:
+                break
+            statements.append(statement())
+        return statements
+
+    def _block(self):
+        self._expect("LBRACE")
+        statements = self._statements()
+        self._expect("RBRACE")
+        return statements
+
+    def _assignment(self):
+        name = self._advance()
+        self._expect("ASSIGN")
+        expression = self._expression()
+        self._expect("SEMICOLON")
+        return ast_nodes.AssignmentNode(self._nodes.IdentifierNode(name.value, name.lineno), expression, name.lineno)
+
+    def _print(self):
+        keyword = self._advance()
+        self._expect("LPAREN")
+        expression = self._expression()
+        self._expect("RPAREN")
+        self._expect("SEMICOLON")
+        return ast_nodes.PrintNode(expression, keyword.lineno)
+
+    def _if(self):
+        keyword = self._advance()
+        condition = self._parenthesized_condition()
+        then_block = self._block()
+        else_block = None
+        if self.token is not None and self.token.type == "ELSE":
+            self._advance()
+            else_block = self._block()
+        return ast_nodes.IfNode(condition, then_block, else_block, keyword.lineno)
+
+    def _while(self):
+        keyword = self._advance()
+        condition = self._parenthesized_condition()
+        body = self._block()
+        return ast_nodes.WhileNode(condition, body, keyword.lineno)
+
+    def _parenthesized_condition(self):
+        self._expect("LPAREN")
+        left = self._expression()
+        operator = self.token
+        if operator is None or operator.type not in COMPARISONS:
+            self._error()
+        self._advance()
+        right = self._expression()
+        self._expect("RPAREN")
+        return self._nodes.ConditionNode(left, operator.value, right, operator.lineno)
+
+    # --------------------------
+    # Expressions
+    # --------------------------
+    def _expression(self, min_power=1):
+        """
+        Precedence climbing: parse operands joined by operators that bind at
+        least as tightly as min_power. Operators of one level are folded in
+        a loop, so long chains do not deepen the recursion.
+        """
+        left = self._factor()
+        while True:
+            operator = self.token
+            if operator is None:
+                return left
+            powers = BINARY_OPERATORS.get(operator.type)
+            if powers is None or powers[0] < min_power:
+                return left
+            self.token = next(self._tokens, None)
+            right = self._expression(powers[1])
+            left = self._nodes.BinaryOpNode(left, operator.value, right, operator.lineno)
+
+    def _factor(self):
+        token = self.token
+        if token is None:
+            self._error()
+        token_type = token.type
+        nodes = self._nodes
+        if token_type == "IDENTIFIER":
+            node = nodes.IdentifierNode(token.value, token.lineno)
+        elif token_type in ("INTEGER", "FLOAT_NUMBER"):
+            node = nodes.NumberNode(token.value, token.lineno)
+        elif token_type == "STRING_LITERAL":
+            node = nodes.StringNode(token.value, token.lineno)
+        elif token_type in ("TRUE", "FALSE"):
+            node = nodes.BooleanNode(token_type == "TRUE", token.lineno)
+        elif token_type == "LPAREN":
+            self._advance()
+            node = self._expression()
+            self._expect("RPAREN")
+            return node
+        else:
+            self._error()
+        self.token = next(self._tokens, None)
+        return node
+
+
+def parse(tokens, node_factory=ast_nodes):
+    """
+    Parse a token stream into a ProgramNode, raising SyntaxError on the
+    first syntax error.
+    """
+    return RecursiveDescentParser(tokens, node_factory).parse()
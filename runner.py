@@ -0,0 +1,303 @@
+# runner.py
+"""
+Compile KJPL programs to native executables and run them.
+
+    python runner.py [-j N] [-O LEVEL] [--cflags "-O2"] [--cache-dir DIR] [--timeout S] FILE...
+"""
+import argparse
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import compiler
+from cache import CompilationCache
+
+# -------------------------------------
+# Results
+# -------------------------------------
+# Times are in seconds: KJPL to C, C to executable (0.0 when the artifact
+# was cached) and the run itself. stdout is None when the program did not
+# run; error and error_type then say why.
+RunResult = namedtuple("RunResult", [
+    "unit", "stdout", "returncode", "error", "error_type", "compile_time", "build_time", "run_time", "cached",
+])
+
+
+class BuildError(Exception):
+    """
+    Raised when the C compiler rejects generated code.
+    """
+
+
+# -------------------------------------
+# Runner
+# -------------------------------------
+class NativeRunner:
+    """
+    Builds generated C with the local C compiler and runs the executables.
+
+    Executables are cached in cache_dir, keyed by a hash of the C code, the
+    compiler's path and version, and the flags, so identical inputs are
+    built once. Builds of the same code requested from several threads at
+    once are coalesced into one. Without cache_dir the artifacts live in a
+    temporary directory removed by close(). The cache is capped at
+    max_disk_bytes; least recently used executables are evicted first.
+
+    A runner may be shared by threads; run_many() builds and runs many
+    programs in parallel on a thread pool (the C compiler and the programs
+    are subprocesses, so threads do not contend for the GIL while they wait).
+    """
+
+    def __init__(self, cache_dir=None, cc=None, cflags=("-O2",), kjpl_compiler=None,
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.cc = cc or os.environ.get("CC") or shutil.which("gcc") or shutil.which("cc")
+        if not self.cc:
+            raise BuildError("No C compiler found. Install gcc or set CC.")
+        self.cflags = tuple(cflags)
+        # rd raises on syntax errors instead of running what survives them
+        self.compiler = kjpl_compiler or compiler.KJPLCompiler(lexer_backend="fast", parser_backend="rd")
+        self.max_disk_bytes = max_disk_bytes
+        self._temporary = cache_dir is None
+        self.cache_dir = tempfile.mkdtemp(prefix="kjpl-native-") if cache_dir is None else cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.disk_bytes = sum(size for _, size, _ in self._disk_entries())
+        self._cc_version = None
+        self._lock = threading.Lock()
+        self._in_flight = {}  # Artifact key -> Future of the executable's path
+
+        # Counters
+        self.hits = 0
+        self.builds = 0
+        self.coalesced = 0
+        self.build_time = 0.0  # Seconds spent in the C compiler
+
+    def close(self):
+        """
+        Remove the artifacts of a runner without a cache_dir.
+        """
+        if self._temporary:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --------------------------
+    # Building
+    # --------------------------
+    def artifact_key(self, c_code):
+        """
+        Hash the C code together with everything that affects the executable.
+        """
+        if self._cc_version is None:
+            result = subprocess.run([self.cc, "--version"], capture_output=True, text=True)
+            self._cc_version = (result.stdout or result.stderr).partition("\n")[0]
+        return CompilationCache.make_key(c_code, self._cc_version, {"cc": self.cc, "cflags": self.cflags})
+
+    def build(self, c_code):
+        """
+        Return (path of the executable built from c_code, seconds spent
+        building it, whether it came from the cache). Raises BuildError if
+        the C compiler fails.
+        """
+        key = self.artifact_key(c_code)
+        path = os.path.join(self.cache_dir, key)
+        with self._lock:
+            future = self._in_flight.get(key)
+            building = future is None
+            if building:
+                if os.path.exists(path):
+                    self.hits += 1
+                    self._touch(path)
+                    return path, 0.0, True
+                future = self._in_flight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not building:
+            return future.result(), 0.0, True  # Raises the BuildError of the build waited for
+
+        start = time.perf_counter()
+        try:
+            self._compile_c(c_code, path)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.builds += 1
+            self.build_time += seconds
+            self.disk_bytes += os.path.getsize(path)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._evict()
+        future.set_result(path)
+        return path, seconds, False
+
+    def _compile_c(self, c_code, path):
+        """
+        Build path from c_code. Both files are written under temporary names
+        and the executable renamed into place, so concurrent processes
+        sharing cache_dir never run a partial file.
+        """
+        fd, source_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".c")
+        binary_path = source_path[:-2] + ".tmp"
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(c_code)
+            result = subprocess.run(
+                [self.cc, *self.cflags, "-o", binary_path, source_path], capture_output=True, text=True,
+            )
+            if result.returncode != 0:
+                raise BuildError(f"{os.path.basename(self.cc)} failed:\n{result.stderr.strip()}")
+            os.replace(binary_path, path)
+        finally:
+            for leftover in (source_path, binary_path):
+                try:
+                    os.remove(leftover)
+                except OSError:
+                    pass
+
+    # --------------------------
+    # Cache Maintenance
+    # --------------------------
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)  # Mark as recently used for eviction
+        except OSError:
+            pass
+
+    def _evict(self):
+        """
+        Remove least recently used executables until the cache fits its budget.
+        """
+        # Caller holds self._lock
+        entries = sorted(self._disk_entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+        self.disk_bytes = total
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if "." in name:
+                continue  # Builds in progress
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.builds + self.coalesced
+            return {
+                "hits": self.hits,
+                "builds": self.builds,
+                "coalesced": self.coalesced,
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+                "build_time": self.build_time,
+                "disk_bytes": self.disk_bytes,
+            }
+
+    # --------------------------
+    # Running
+    # --------------------------
+    def run(self, source, stdin=None, timeout=None, unit=None):
+        """
+        Compile KJPL source, build it and run it. Returns a RunResult;
+        compilation, build and run errors are captured in it, not raised.
+        """
+        compile_time = build_time = run_time = 0.0
+        cached = False
+        try:
+            start = time.perf_counter()
+            c_code = self.compiler.compile(source)
+            compile_time = time.perf_counter() - start
+            path, build_time, cached = self.build(c_code)
+            start = time.perf_counter()
+            try:
+                result = subprocess.run([path], input=stdin, capture_output=True, text=True, timeout=timeout)
+            finally:
+                run_time = time.perf_counter() - start
+        except Exception as e:
+            return RunResult(unit, None, None, str(e), type(e).__name__, compile_time, build_time, run_time, cached)
+        return RunResult(unit, result.stdout, result.returncode, None, None, compile_time, build_time, run_time, cached)
+
+    def run_many(self, sources, workers=None, timeout=None):
+        """
+        Compile, build and run every source on `workers` threads (default:
+        one per CPU). Returns the RunResults in order.
+        """
+        sources = list(sources)
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(sources) <= 1:
+            return [self.run(source, timeout=timeout, unit=index) for index, source in enumerate(sources)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(self.run, source, None, timeout, index) for index, source in enumerate(sources)]
+            return [future.result() for future in futures]
+
+
+# -------------------------------------
+# Command Line
+# -------------------------------------
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("files", nargs="+", help="KJPL source files")
+    arg_parser.add_argument("-j", "--workers", type=int, default=None, help="parallel builds (default: CPU count)")
+    arg_parser.add_argument("-O", "--opt-level", type=int, default=0, choices=compiler.KJPLCompiler.OPT_LEVELS)
+    arg_parser.add_argument("--cflags", default="-O2", help="C compiler flags")
+    arg_parser.add_argument("--cache-dir", default=None, help="keep executables here between runs")
+    arg_parser.add_argument("--timeout", type=float, default=None, help="seconds each program may run")
+    args = arg_parser.parse_args(argv)
+
+    compiler.logger.setLevel(logging.WARNING)
+    sources = []
+    for path in args.files:
+        with open(path, "r", encoding="utf-8") as f:
+            sources.append(f.read())
+
+    kjpl_compiler = compiler.KJPLCompiler(lexer_backend="fast", parser_backend="rd", opt_level=args.opt_level)
+    with NativeRunner(args.cache_dir, cflags=args.cflags.split(), kjpl_compiler=kjpl_compiler) as runner:
+        results = runner.run_many(sources, workers=args.workers, timeout=args.timeout)
+    failed = 0
+    for path, result in zip(args.files, results):
+        if result.stdout is None:
+            failed += 1
+            print(f"{path}: {result.error_type}: {result.error}", file=sys.stderr)
+            continue
+        if len(args.files) > 1:
+            print(f"==> {path} <==")
+        sys.stdout.write(result.stdout)
+        failed += result.returncode != 0
+        build = "cached" if result.cached else f"{result.build_time * 1000:.1f} ms"
+        print(
+            f"{path}: compile {result.compile_time * 1000:.1f} ms, build {build}, "
+            f"run {result.run_time * 1000:.1f} ms, exit {result.returncode}",
+            file=sys.stderr,
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
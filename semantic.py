@@ -1,76 +1,238 @@
+from parser import ast_nodes
+from symbols import NON_NUMERIC_TYPES, SymbolTable, literal_type
+from visitor import OPERATOR_KINDS, build_dispatch_table, fold_expression
+
+# Bump whenever the checks or the symbol table format change
+SEMANTIC_VERSION = "3"
+
+
 class SemanticAnalyzer:
     def __init__(self):
-        self.symbol_table = {}  # Tracks variables and their types
+        self.symbol_table = SymbolTable()  # Shared with code generation
         self.errors = []        # Collects semantic errors
+        self._shared = None     # Shared nodes of a hash-consed AST
+        self._types = {}        # Shared node -> its inferred type
+
+        # Handlers resolved once per node kind, by the node's type tag
+        by_type = lambda cls: cls.type
+        self._checkers = build_dispatch_table(self, "_check_", self._check_nothing, by_type)
+        self._inferers = build_dispatch_table(self, "_infer_", self._infer_unknown, by_type)
 
-    def analyze(self, syntax_tree):
+    def analyze(self, syntax_tree, symbol_table=None, shared=None):
         """
-        Traverse the syntax tree and perform semantic checks.
+        Traverse the syntax tree and perform semantic checks. With
+        symbol_table, the tree is checked as a continuation of the program
+        that declared the variables in it, and the table is extended in place.
+        shared is the set of expression nodes that occur more than once in a
+        hash-consed AST (parser.ExpressionInterner.shared); their types are
+        inferred once.
         """
+        self.reset()
+        if symbol_table is not None:
+            self.symbol_table = symbol_table
+        self._shared = shared
         self._check_statements(syntax_tree)
         return self.errors
 
+    def reset(self):
+        """
+        Forget the results of the previous analysis.
+        """
+        self.symbol_table = SymbolTable()
+        self.errors = []
+        self._shared = None
+        self._types = {}
+
+    def dump_state(self):
+        """
+        Return the analysis results as JSON-compatible data.
+        """
+        return {"symbol_table": self.symbol_table.dump(), "errors": list(self.errors)}
+
+    def load_state(self, state):
+        """
+        Restore analysis results produced by dump_state.
+        """
+        self.symbol_table = SymbolTable.load(state["symbol_table"])
+        self.errors = list(state["errors"])
+
     def _check_statements(self, node):
         """
         Check a block of statements (e.g., assignments, function calls).
         """
-        for statement in node.statements:
-            if statement.type == "assignment":
-                self._check_assignment(statement)
-            elif statement.type == "print":
-                self._check_print(statement)
-            # Add other statement types (e.g., loops, conditionals) here
+        self._check_block(node.statements)
+
+    def _check_statement(self, statement):
+        """
+        Dispatch a single statement to its checker.
+        """
+        self._checkers[statement.kind](statement)
+
+    def _check_nothing(self, node):
+        """
+        Statements without checks.
+        """
+
+    def _check_function(self, node):
+        """
+        Check a function body in its own scope, with int parameters.
+        """
+        self.symbol_table.enter_function(node.name)
+        self._types = {}  # Names may resolve differently in the function's scope
+        for param in node.params:
+            self.symbol_table.declare(param, "int")
+        self._check_block(node.body)
+        if node.return_expression is not None:
+            self._infer_type(node.return_expression)
+        self.symbol_table.exit_function()
+        self._types = {}
+
+    def _check_return(self, node):
+        self._infer_type(node.expression)
 
     def _check_assignment(self, node):
         """
         Check variable assignments (e.g., x = 10 + "hello").
         """
-        var_name = node.left.value
-        var_type = self._infer_type(node.left)  # Type of left-hand side (LHS)
-        expr_type = self._infer_type(node.right)  # Type of right-hand side (RHS)
+        var_name = node.identifier.name
+        expr_type = self._infer_type(node.expression)  # Type of right-hand side (RHS)
 
         # Check if variable exists in symbol table
-        if var_name not in self.symbol_table:
-            self.symbol_table[var_name] = expr_type  # Implicit declaration (modify if KJPL requires explicit)
+        symbol = self.symbol_table.resolve(var_name)
+        if symbol is None:
+            symbol = self.symbol_table.declare(var_name, expr_type)  # Implicit declaration (modify if KJPL requires explicit)
         else:
             # Ensure type consistency
-            if self.symbol_table[var_name] != expr_type:
+            if symbol.type != expr_type:
                 self.errors.append(
-                    f"Type mismatch: '{var_name}' is {self.symbol_table[var_name]}, but assigned {expr_type}."
+                    f"Type mismatch: '{var_name}' is {symbol.type}, but assigned {expr_type}."
                 )
+        node.identifier.symbol = symbol
 
     def _check_print(self, node):
         """
         Check validity of print statements (e.g., print(undeclared_var)).
         """
-        for arg in node.args:
-            if arg.type == "identifier":
-                if arg.value not in self.symbol_table:
-                    self.errors.append(f"Undefined variable '{arg.value}' in print statement.")
-            # Add type-checking logic if needed (e.g., print only accepts integers)
+        arg = node.expression
+        if arg.type == "identifier":
+            arg.symbol = self.symbol_table.resolve(arg.name)
+            if arg.symbol is None:
+                self.errors.append(f"Undefined variable '{arg.name}' in print statement.")
+        else:
+            self._infer_type(arg)
+        # Add type-checking logic if needed (e.g., print only accepts integers)
+
+    def _check_if(self, node):
+        """
+        Check an if statement's condition and both of its blocks.
+        """
+        self._check_condition(node.condition)
+        self._check_block(node.then_block)
+        if node.else_block:
+            self._check_block(node.else_block)
+
+    def _check_while(self, node):
+        """
+        Check a while loop's condition and body.
+        """
+        self._check_condition(node.condition)
+        self._check_block(node.body)
+
+    def _check_condition(self, node):
+        """
+        Check that both sides of a comparison have the same type.
+        """
+        left_type = self._infer_type(node.left)
+        right_type = self._infer_type(node.right)
+        if left_type != right_type:
+            self.errors.append(
+                f"Type mismatch in comparison: {left_type} vs {right_type}."
+            )
+
+    def _check_block(self, statements):
+        """
+        Check a nested list of statements (e.g., an if or while body).
+        """
+        for statement in statements:
+            self._check_statement(statement)
 
     def _infer_type(self, node):
         """
         Determine the type of an expression (e.g., 10 + "hello" is invalid).
         """
-        if node.type == "number":
-            return "int"
-        elif node.type == "string":
-            return "str"
-        elif node.type == "identifier":
-            if node.value in self.symbol_table:
-                return self.symbol_table[node.value]
+        if self._shared is None:
+            return fold_expression(node, self._infer_operand, self._combine_types)
+        return self._infer_shared(node)
+
+    def _infer_shared(self, root):
+        """
+        _infer_type for a hash-consed AST: fold_expression, except that the
+        type of a shared node is remembered once it has been inferred without
+        errors, and later occurrences of the node reuse it. Declared types
+        never change, so the remembered type stays right; a node whose
+        inference reported errors is checked again so each occurrence
+        reports them, as it would in a tree.
+        """
+        shared = self._shared
+        types = self._types
+        errors = self.errors
+        values = []
+        stack = [(root, None)]
+        while stack:
+            node, error_count = stack.pop()
+            if error_count is not None:
+                # Operands done; error_count is len(errors) before them
+                right = values.pop()
+                value = self._combine_types(node, values.pop(), right)
+                if len(errors) == error_count and node in shared:
+                    types[node] = value
             else:
-                self.errors.append(f"Undefined variable '{node.value}'.")
-                return "unknown"
-        elif node.type == "binary_op":
-            left_type = self._infer_type(node.left)
-            right_type = self._infer_type(node.right)
-            if left_type != right_type:
-                self.errors.append(
-                    f"Type mismatch in operation: {left_type} vs {right_type}."
-                )
-                return "error"
-            return left_type  # Assume valid if types match
-        # Add more types (e.g., boolean, arrays) as needed
+                value = types.get(node)
+                if value is None:
+                    if node.kind in OPERATOR_KINDS:
+                        stack.append((node, len(errors)))
+                        stack.append((node.right, None))
+                        stack.append((node.left, None))
+                        continue
+                    error_count = len(errors)
+                    value = self._inferers[node.kind](node)
+                    if len(errors) == error_count and node in shared:
+                        types[node] = value
+            values.append(value)
+        return values[0]
+
+    def _infer_operand(self, node):
+        return self._inferers[node.kind](node)
+
+    def _infer_number(self, node):
+        return literal_type(node)
+
+    def _infer_string(self, node):
+        return literal_type(node)
+
+    def _infer_boolean(self, node):
+        return literal_type(node)
+
+    def _infer_identifier(self, node):
+        node.symbol = self.symbol_table.resolve(node.name)
+        if node.symbol is not None:
+            return node.symbol.type
+        self.errors.append(f"Undefined variable '{node.name}'.")
+        return "unknown"
+
+    def _combine_types(self, node, left_type, right_type):
+        if left_type != right_type:
+            self.errors.append(
+                f"Type mismatch in operation: {left_type} vs {right_type}."
+            )
+            return "error"
+        if node.kind == ast_nodes.BinaryOpNode.kind and left_type in NON_NUMERIC_TYPES:
+            self.errors.append(
+                f"Unsupported operand type for '{node.operator}': {left_type}."
+            )
+            return "error"
+        return left_type  # No implicit int/float promotion
+
+    def _infer_unknown(self, node):
+        # Add more types (e.g., arrays) as needed
         return "unknown"
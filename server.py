@@ -0,0 +1,324 @@
+# server.py
+"""
+HTTP compile service for the web front end (index.html).
+
+    python server.py [--host HOST] [--port PORT] [-j N] [--executor process|thread] [-O LEVEL] [--parser rd|ply] [--max-pending N]
+
+POST /compile (or /api/compile) with {"code": "..."} answers 200 with
+{"c_code": "..."}, or {"error": "...", "error_type": "..."} when the
+program does not compile, which is what index.html displays.
+GET /health and GET /stats report liveness and service counters.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+import batch
+import compiler
+
+logger = logging.getLogger(__name__)
+
+COMPILE_PATHS = ("/compile", "/api/compile")
+
+Request = namedtuple("Request", ["method", "path", "version", "headers", "body"])
+
+
+# -------------------------------------
+# Errors
+# -------------------------------------
+class HTTPError(Exception):
+    """
+    A request the server answers with an error status and closes.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceOverloaded(Exception):
+    """
+    Raised when max_pending distinct compilations are already queued or running.
+    """
+
+
+# -------------------------------------
+# Compile Service
+# -------------------------------------
+class CompileService:
+    """
+    Compiles sources on a pool of workers from an asyncio event loop.
+
+    Requests for a source that is already being compiled wait for that
+    compilation instead of starting another (request coalescing). At most
+    max_pending distinct compilations are queued or running; beyond that new
+    ones are refused with ServiceOverloaded so the server sheds load instead
+    of queueing without bound.
+
+    The default process executor sidesteps the GIL; the thread executor
+    shares one thread-safe KJPLCompiler and suits small deployments.
+
+    The default "rd" parser rejects a program with a syntax error, so the
+    client gets the error; "ply" recovers and would return C compiled from
+    what was left of the program.
+    """
+    EXECUTORS = ("process", "thread")
+
+    def __init__(self, workers=None, executor="process", opt_level=0, lexer_backend="ply",
+                 cache_dir=None, max_pending=64, parser_backend="rd"):
+        if executor not in self.EXECUTORS:
+            raise ValueError(f"Unknown executor '{executor}'. Expected one of {self.EXECUTORS}.")
+        self.workers = workers
+        self.executor_kind = executor
+        self.options = {
+            "opt_level": opt_level, "lexer_backend": lexer_backend, "parser_backend": parser_backend,
+            "cache_dir": cache_dir,
+        }
+        self.max_pending = max_pending
+        self.executor = None
+        self.in_flight = {}  # Source digest -> future of its batch.UnitResult
+
+        # Counters
+        self.requests = 0
+        self.compilations = 0
+        self.coalesced = 0
+        self.rejected = 0
+
+    def start(self):
+        if self.executor_kind == "process":
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=batch.init_worker, initargs=(self.options,),
+            )
+        else:
+            batch.warm_up(self.options)
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    async def compile(self, source):
+        """
+        Compile source on the pool and return its batch.UnitResult.
+        """
+        key = hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            if len(self.in_flight) >= self.max_pending:
+                self.rejected += 1
+                raise ServiceOverloaded(f"{len(self.in_flight)} compilations pending")
+            future = asyncio.get_running_loop().run_in_executor(
+                self.executor, batch.compile_source, source, self.options,
+            )
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+            self.compilations += 1
+        # A client that disconnects must not cancel a compilation others wait for
+        return await asyncio.shield(future)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "compilations": self.compilations,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "pending": len(self.in_flight),
+            "max_pending": self.max_pending,
+        }
+
+
+# -------------------------------------
+# HTTP Server
+# -------------------------------------
+class CompileServer:
+    """
+    A small HTTP/1.1 server (keep-alive, Content-Length bodies, CORS) in
+    front of a CompileService.
+    """
+
+    def __init__(self, service, allow_origin="*", max_body_bytes=1 << 20, idle_timeout=30.0):
+        self.service = service
+        self.allow_origin = allow_origin
+        self.max_body_bytes = max_body_bytes
+        self.idle_timeout = idle_timeout  # Seconds to wait for the next request on a connection
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.idle_timeout)
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                status, payload, headers = await self._dispatch(request)
+                keep_alive = self._keep_alive(request)
+                await self._respond(writer, status, payload, headers, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass  # Idle, truncated or reset connections are simply dropped
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        Read one request, or return None when the client closed the connection.
+        """
+        try:
+            line = await reader.readline()
+            if not line:
+                return None
+            try:
+                method, target, version = line.decode("latin-1").split()
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line") from None
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+                if len(headers) > 100:
+                    raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+        except (asyncio.LimitOverrunError, ValueError):
+            raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header line too long") from None
+
+        if "transfer-encoding" in headers:
+            raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked bodies are not supported")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length") from None
+        if length < 0:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if length > self.max_body_bytes:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Body exceeds {self.max_body_bytes} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return Request(method.upper(), target.split("?", 1)[0], version.upper(), headers, body)
+
+    async def _dispatch(self, request):
+        """
+        Return the status, JSON payload and extra headers for a request.
+        """
+        if request.method == "OPTIONS":  # CORS preflight from the front end
+            return HTTPStatus.NO_CONTENT, None, {
+                "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
+                "Access-Control-Allow-Headers": "Content-Type",
+                "Access-Control-Max-Age": "86400",
+            }
+        if request.path in COMPILE_PATHS:
+            if request.method != "POST":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Method not allowed"}, {"Allow": "POST, OPTIONS"}
+            return await self._compile(request)
+        if request.path in ("/health", "/stats"):
+            if request.method != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "Method not allowed"}, {"Allow": "GET"}
+            payload = {"status": "ok"} if request.path == "/health" else self.service.stats()
+            return HTTPStatus.OK, payload, {}
+        return HTTPStatus.NOT_FOUND, {"error": "Not found"}, {}
+
+    async def _compile(self, request):
+        self.service.requests += 1
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return HTTPStatus.BAD_REQUEST, {"error": "Request body must be JSON"}, {}
+        code = data.get("code") if isinstance(data, dict) else None
+        if not isinstance(code, str) or not code:
+            return HTTPStatus.BAD_REQUEST, {"error": "No code provided"}, {}
+
+        try:
+            result = await self.service.compile(code)
+        except ServiceOverloaded:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Server busy, try again"}, {"Retry-After": "1"}
+        except Exception as e:
+            logger.error("Compile worker failed: %s", e)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error"}, {}
+        if result.c_code is None:
+            return HTTPStatus.OK, {"error": result.error, "error_type": result.error_type}, {}
+        return HTTPStatus.OK, {"c_code": result.c_code}, {}
+
+    @staticmethod
+    def _keep_alive(request):
+        connection = request.headers.get("connection", "").lower()
+        if request.version == "HTTP/1.0":
+            return connection == "keep-alive"
+        return connection != "close"
+
+    async def _respond(self, writer, status, payload, headers=None, keep_alive=True):
+        body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        if payload is not None:
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(body)}")
+        lines.append(f"Access-Control-Allow-Origin: {self.allow_origin}")
+        lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host, port, service, ready=None, **server_options):
+    """
+    Run the server until cancelled. ready, if given, is called with the
+    bound (host, port) once the server accepts connections.
+    """
+    service.start()
+    http_server = CompileServer(service, **server_options)
+    try:
+        server = await asyncio.start_server(http_server.handle_connection, host, port)
+        address = server.sockets[0].getsockname()[:2]
+        if ready is not None:
+            ready(address)
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+# -------------------------------------
+# Command Line
+# -------------------------------------
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8000)
+    arg_parser.add_argument("-j", "--workers", type=int, default=None, help="compile workers (default: CPU count)")
+    arg_parser.add_argument("--executor", default="process", choices=CompileService.EXECUTORS)
+    arg_parser.add_argument("-O", "--opt-level", type=int, default=0, choices=compiler.KJPLCompiler.OPT_LEVELS)
+    arg_parser.add_argument("--lexer", default="ply", choices=compiler.KJPLCompiler.LEXER_BACKENDS)
+    arg_parser.add_argument("--parser", default="rd", choices=compiler.KJPLCompiler.PARSER_BACKENDS)
+    arg_parser.add_argument("--cache-dir", default=None, help="on-disk compilation cache shared by the workers")
+    arg_parser.add_argument("--max-pending", type=int, default=64,
+                            help="distinct compilations queued or running before requests get 503")
+    arg_parser.add_argument("--allow-origin", default="*", help="Access-Control-Allow-Origin for the front end")
+    args = arg_parser.parse_args(argv)
+
+    compiler.logger.setLevel(logging.WARNING)  # Per-stage INFO lines would drown the server's own
+    service = CompileService(
+        workers=args.workers, executor=args.executor, opt_level=args.opt_level,
+        lexer_backend=args.lexer, cache_dir=args.cache_dir, max_pending=args.max_pending,
+        parser_backend=args.parser,
+    )
+    ready = lambda address: print(f"Serving on http://{address[0]}:{address[1]}", file=sys.stderr)
+    try:
+        asyncio.run(serve(args.host, args.port, service, ready, allow_origin=args.allow_origin))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+# symbols.py
+from parser import ast_nodes
+
+# C spelling of each KJPL type. Floats are doubles so literals keep the
+# precision the lexer parsed them with.
+C_TYPES = {
+    "int": "int",
+    "float": "double",
+    "string": "const char *",
+    "bool": "bool",
+}
+
+# printf conversion for each KJPL type
+PRINTF_FORMATS = {
+    "int": "%d",
+    "float": "%g",
+    "string": "%s",
+    "bool": "%s",  # Printed as true/false
+}
+
+# Initial value of a variable declared before its first assignment
+ZERO_VALUES = {
+    "int": "0",
+    "float": "0.0",
+    "string": '""',
+    "bool": "false",
+}
+
+# Types the arithmetic operators reject
+NON_NUMERIC_TYPES = frozenset(("string", "bool"))
+
+
+class Symbol:
+    """
+    A variable: its name, KJPL type, and the scope and slot it lives in.
+    """
+    __slots__ = ("name", "type", "scope", "slot")
+
+    def __init__(self, name, var_type, scope, slot):
+        self.name = name
+        self.type = var_type
+        self.scope = scope
+        self.slot = slot
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, {self.type!r}, slot={self.slot})"
+
+
+class Scope:
+    """
+    One level of the scope chain. Symbols live in an array indexed by slot;
+    `slots` maps an interned identifier id to its slot.
+    """
+    __slots__ = ("name", "parent", "slots", "symbols")
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.slots = {}
+        self.symbols = []
+
+    def define(self, ident, name, var_type):
+        symbol = Symbol(name, var_type, self, len(self.symbols))
+        self.slots[ident] = symbol.slot
+        self.symbols.append(symbol)
+        return symbol
+
+    def resolve(self, ident):
+        """
+        Return the innermost symbol for ident along the chain, or None.
+        """
+        scope = self
+        while scope is not None:
+            slot = scope.slots.get(ident)
+            if slot is not None:
+                return scope.symbols[slot]
+            scope = scope.parent
+        return None
+
+
+class SymbolTable:
+    """
+    Scoped variables and their KJPL types.
+
+    Filled in by semantic analysis, which also stores each identifier's
+    resolved Symbol on the node, and handed to the code generator, which
+    reads the symbols to pick C declarations and printf formats without
+    looking names up again.
+
+    Identifiers are interned to dense integer ids. The main program has one
+    scope and every function another; blocks do not open scopes, since a
+    variable assigned in a block stays visible after it. Function scopes
+    are roots of their chain because main's variables are locals of main()
+    in the generated C, so a function's parameters and locals shadow
+    same-named variables of the program.
+    """
+
+    def __init__(self):
+        self.ids = {}  # Identifier -> interned id
+        self.main = Scope("main")
+        self.functions = {}  # Function name -> Scope
+        self.scope = self.main
+
+    def intern(self, name):
+        ident = self.ids.get(name)
+        if ident is None:
+            ident = self.ids[name] = len(self.ids)
+        return ident
+
+    # --------------------------
+    # Scopes
+    # --------------------------
+    def enter_function(self, name):
+        """
+        Make the scope of function name current, creating it if needed.
+        """
+        scope = self.functions.get(name)
+        if scope is None:
+            scope = self.functions[name] = Scope(name)
+        self.scope = scope
+        return scope
+
+    def exit_function(self):
+        self.scope = self.main
+
+    # --------------------------
+    # Symbols
+    # --------------------------
+    def declare(self, name, var_type):
+        """
+        Define name in the current scope and return its Symbol.
+        """
+        return self.scope.define(self.intern(name), name, var_type)
+
+    def resolve(self, name):
+        """
+        Return the Symbol name refers to in the current scope, or None.
+        """
+        ident = self.ids.get(name)
+        return None if ident is None else self.scope.resolve(ident)
+
+    def lookup(self, name):
+        """
+        Return the type of name in the current scope, or None if undeclared.
+        """
+        symbol = self.resolve(name)
+        return None if symbol is None else symbol.type
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    # --------------------------
+    # Serialization
+    # --------------------------
+    def dump(self):
+        """
+        Return the table as JSON-compatible data, symbols in slot order.
+        """
+        return {
+            "main": [[symbol.name, symbol.type] for symbol in self.main.symbols],
+            "functions": {
+                name: [[symbol.name, symbol.type] for symbol in scope.symbols]
+                for name, scope in self.functions.items()
+            },
+        }
+
+    @classmethod
+    def load(cls, data):
+        table = cls()
+        for name, var_type in data["main"]:
+            table.declare(name, var_type)
+        for function, symbols in data["functions"].items():
+            table.enter_function(function)
+            for name, var_type in symbols:
+                table.declare(name, var_type)
+        table.exit_function()
+        return table
+
+
+def literal_type(node):
+    """
+    Return the KJPL type of a literal node.
+    """
+    if node.kind == ast_nodes.NumberNode.kind:
+        return "float" if type(node.value) is float else "int"
+    if node.kind == ast_nodes.StringNode.kind:
+        return "string"
+    return "bool"
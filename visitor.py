@@ -0,0 +1,101 @@
+# visitor.py
+from parser import ast_nodes
+
+
+def build_dispatch_table(obj, prefix, default, tag=lambda cls: cls.__name__):
+    """
+    Resolve obj's handler for every node class once, up front.
+
+    Returns a list indexed by node kind, so passes dispatch with
+    `table[node.kind](node)` instead of building a method name and calling
+    getattr for every node. The handler for a class is the bound method
+    named prefix + tag(cls) (e.g. "visit_BinaryOpNode", or "_check_if" with
+    tag=lambda cls: cls.type); classes without one map to default.
+    """
+    return [getattr(obj, prefix + tag(cls), default) for cls in ast_nodes.KINDS]
+
+
+# Nodes with `left`, `operator` and `right` children
+OPERATOR_KINDS = frozenset((ast_nodes.BinaryOpNode.kind, ast_nodes.ConditionNode.kind))
+
+
+def fold_expression(root, leaf, combine):
+    """
+    Evaluate an expression tree bottom-up with an explicit stack.
+
+    leaf(node) gives the value of an operand; combine(node, left, right)
+    gives the value of an operator node from its operands' values. Operands
+    are evaluated left to right, as a recursive visitor would, but the
+    Python stack depth stays constant however deep the tree is.
+    """
+    values = []
+    stack = [(root, False)]
+    while stack:
+        node, operands_done = stack.pop()
+        if operands_done:
+            right = values.pop()
+            values.append(combine(node, values.pop(), right))
+        elif node.kind in OPERATOR_KINDS:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+        else:
+            values.append(leaf(node))
+    return values[0]
+
+
+def infix_parts(root, leaf, shared=None, memo=None, max_memo_length=4096):
+    """
+    Return the fully parenthesized infix text of an expression as a list of
+    strings, e.g. ["(", "a", " + ", "1", ")"], using leaf(node) for operands.
+
+    Built with an explicit stack so deep chains neither recurse nor copy
+    ever-longer intermediate strings; "".join() the result once.
+
+    With shared, a set of operator nodes that occur more than once in a
+    hash-consed AST, and memo, a dict, the text of each shared node is
+    built once, stored in memo and reused wherever the node occurs again.
+    Texts longer than max_memo_length are not stored, so nested shared
+    subexpressions do not keep every prefix of a long chain alive.
+    """
+    parts = []
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            parts.append(item)
+        elif type(item) is tuple:
+            # All of a shared node's parts are in: collapse them into its text
+            start, node = item
+            text = "".join(parts[start:])
+            del parts[start:]
+            parts.append(text)
+            if len(text) <= max_memo_length:
+                memo[node] = text
+        elif item.kind in OPERATOR_KINDS:
+            if shared is not None and item in shared:
+                text = memo.get(item)
+                if text is not None:
+                    parts.append(text)
+                    continue
+                stack.append((len(parts), item))
+            stack += (")", item.right, f" {item.operator} ", item.left, "(")
+        else:
+            parts.append(leaf(item))
+    return parts
+
+
+def count_nodes(root):
+    """
+    Return the number of AST nodes under root (a node or a list of them).
+    """
+    count = 0
+    stack = [root]
+    while stack:
+        item = stack.pop()
+        if type(item) is list:
+            stack += item
+        elif isinstance(item, ast_nodes.Node):
+            count += 1
+            stack += [getattr(item, field) for field in item._fields]
+    return count
@@ -0,0 +1,458 @@
+# vm.py
+"""
+Bytecode backend: lower a checked AST to register bytecode and run it in
+an interpreter loop, so a program can be executed without generating C
+and building it with a C compiler.
+"""
+import array
+import math
+import re
+import sys
+
+from optimizer import INT_MAX, INT_MIN
+from parser import ast_nodes
+from symbols import literal_type
+from visitor import build_dispatch_table, fold_expression
+
+# -------------------------------------
+# Instruction Set
+# -------------------------------------
+# Every instruction is four ints, `op a b c`, operands being register
+# numbers or instruction numbers:
+#
+#     MOVE a b         r[a] = r[b]
+#     ADD..DIV a b c   r[a] = r[b] <op> r[c]   (C int semantics)
+#     FADD..FDIV a b c r[a] = r[b] <op> r[c]   (doubles)
+#     JUMP a           continue at instruction a
+#     IF_EQ..IF_GE a b c   continue at instruction c if r[a] <op> r[b]
+#     PRINT a b        print r[a] with formatter b
+#     HALT
+#
+# Opcodes are grouped so the interpreter tells the groups apart with one
+# or two comparisons.
+MOVE = 0
+ADD, SUB, MUL, DIV = 1, 2, 3, 4
+FADD, FSUB, FMUL, FDIV = 5, 6, 7, 8
+IF_EQ, IF_NE, IF_LT, IF_GT, IF_LE, IF_GE = 9, 10, 11, 12, 13, 14
+JUMP = 15
+PRINT = 16
+HALT = 17
+
+OPCODE_NAMES = (
+    "MOVE", "ADD", "SUB", "MUL", "DIV", "FADD", "FSUB", "FMUL", "FDIV",
+    "IF_EQ", "IF_NE", "IF_LT", "IF_GT", "IF_LE", "IF_GE", "JUMP", "PRINT", "HALT",
+)
+
+ARITHMETIC = {"+": ADD, "-": SUB, "*": MUL, "/": DIV}
+FLOAT_OFFSET = FADD - ADD
+
+# Branch taken when the comparison is false, to skip a block
+BRANCH_UNLESS = {"==": IF_NE, "!=": IF_EQ, "<": IF_GE, ">=": IF_LT, ">": IF_LE, "<=": IF_GT}
+BRANCH_IF = {"==": IF_EQ, "!=": IF_NE, "<": IF_LT, ">=": IF_GE, ">": IF_GT, "<=": IF_LE}
+
+# How PRINT formats a value of each KJPL type, as printf does in the C output
+FORMATTERS = (str, "%g".__mod__, lambda value: "true" if value else "false")
+PRINT_FORMATS = {"int": 0, "float": 1, "string": 0, "bool": 2}
+
+# Initial value of each variable, as declared by the C output
+ZERO_VALUES = {"int": 0, "float": 0.0, "string": "", "bool": False}
+
+# C escape sequences in string literals, which printf output shows decoded
+_C_ESCAPE = re.compile(r"\\(?:([0-7]{1,3})|x([0-9A-Fa-f]+)|(.))", re.DOTALL)
+_C_SIMPLE_ESCAPES = {
+    "n": "\n", "t": "\t", "r": "\r", "0": "\0", "a": "\a", "b": "\b",
+    "f": "\f", "v": "\v", "\\": "\\", "'": "'", '"': '"', "?": "?",
+}
+
+
+def _c_string(value):
+    """
+    Return the text a C string literal with the given body prints as.
+    """
+    if "\\" not in value:
+        return value
+
+    def decode(match):
+        octal, hexadecimal, char = match.groups()
+        if octal is not None:
+            return chr(int(octal, 8) & 0xFF)
+        if hexadecimal is not None:
+            return chr(int(hexadecimal, 16) & 0xFF)
+        return _C_SIMPLE_ESCAPES.get(char, char)
+
+    return _C_ESCAPE.sub(decode, value)
+
+
+class BytecodeError(Exception):
+    pass
+
+
+class VMError(Exception):
+    """
+    A runtime error of the program being run (where the native build
+    would crash).
+    """
+
+
+# -------------------------------------
+# Code Objects
+# -------------------------------------
+class Code:
+    """
+    A compiled program: the instruction stream (an array of ints, four per
+    instruction), the source line of each instruction, and the register
+    file it starts with. Registers hold the variables first, at their
+    symbol table slots, then expression temporaries, then the constants.
+    """
+    __slots__ = ("instructions", "lines", "registers", "names")
+
+    def __init__(self, instructions, lines, registers, names):
+        self.instructions = instructions
+        self.lines = lines
+        self.registers = registers
+        self.names = names  # Register number -> variable name or constant repr
+
+    def disassemble(self):
+        """
+        Return the instructions as text, one per line.
+        """
+        lines = []
+        code = self.instructions
+        for pc in range(0, len(code), 4):
+            op, a, b, c = code[pc:pc + 4]
+            if op == MOVE:
+                operands = f"{self.names[a]}, {self.names[b]}"
+            elif op <= FDIV:
+                operands = f"{self.names[a]}, {self.names[b]}, {self.names[c]}"
+            elif op <= IF_GE:
+                operands = f"{self.names[a]}, {self.names[b]} -> {c}"
+            elif op == JUMP:
+                operands = f"-> {a}"
+            elif op == PRINT:
+                operands = self.names[a]
+            else:
+                operands = ""
+            lines.append(f"{pc // 4:>5}  {OPCODE_NAMES[op]:<6} {operands}".rstrip())
+        return "\n".join(lines)
+
+
+# -------------------------------------
+# Lowering
+# -------------------------------------
+class BytecodeCompiler:
+    """
+    Lower a ProgramNode checked by semantic analysis to a Code object.
+    Variables get the registers of their symbol table slots, so no name is
+    looked up at run time, and each operation is specialized for the type
+    semantic analysis gave its operands.
+
+    A while loop is laid out with its condition after the body, so each
+    iteration runs a single conditional branch.
+    """
+
+    def __init__(self):
+        self._compilers = build_dispatch_table(self, "_compile_", self._unsupported, lambda cls: cls.type)
+        self._reset(None)
+
+    def compile(self, program, symbol_table):
+        self._reset(symbol_table)
+        self._block(program.statements)
+        self._emit(HALT, 0, 0, 0, program.lineno)
+
+        variables = symbol_table.main.symbols
+        temps_base = len(variables)
+        constants_base = temps_base + self._max_temps
+        registers = [ZERO_VALUES.get(symbol.type, 0) for symbol in variables]
+        registers += [0] * self._max_temps
+        registers += [value for _, value in self._constants]  # (type, value) keys, in number order
+
+        # Constants were numbered from -1 down while temps were allocated;
+        # opcodes and instruction numbers are never negative
+        code = [constants_base - value - 1 if value < 0 else value for value in self._code]
+        names = [symbol.name for symbol in variables]
+        names += [f"t{index}" for index in range(self._max_temps)]
+        names += [repr(value) for _, value in self._constants]
+        return Code(array.array("i", code), self._lines, registers, names)
+
+    def _reset(self, symbol_table):
+        self.symbol_table = symbol_table
+        self._code = []
+        self._lines = []
+        self._constants = {}   # (type, value) -> constant number
+        self._temps = 0        # Temporaries in use
+        self._max_temps = 0
+        self._root = None      # Expression being lowered and the register it goes to
+        self._dest = None
+
+    def _emit(self, op, a, b, c, lineno):
+        """
+        Append an instruction and return its number.
+        """
+        self._code += (op, a, b, c)
+        self._lines.append(lineno)
+        return len(self._lines) - 1
+
+    def _patch(self, number, operand, value):
+        self._code[number * 4 + operand] = value
+
+    # --------------------------
+    # Statements
+    # --------------------------
+    def _block(self, statements):
+        for statement in statements:
+            self._compilers[statement.kind](statement)
+
+    def _unsupported(self, node):
+        raise BytecodeError(f"Cannot compile {type(node).__name__} to bytecode")
+
+    def _compile_assignment(self, node):
+        target = self._variable(node.identifier)
+        value, _ = self._expression(node.expression, target)
+        self._temps = 0
+        if value != target:
+            self._emit(MOVE, target, value, 0, node.lineno)
+
+    def _compile_print(self, node):
+        value, value_type = self._expression(node.expression)
+        self._temps = 0
+        self._emit(PRINT, value, PRINT_FORMATS.get(value_type, 0), 0, node.lineno)
+
+    def _compile_if(self, node):
+        skip = self._branch(node.condition, BRANCH_UNLESS)
+        self._block(node.then_block)
+        if node.else_block:
+            end = self._emit(JUMP, 0, 0, 0, node.lineno)
+            self._patch(skip, 3, len(self._lines))
+            self._block(node.else_block)
+            self._patch(end, 1, len(self._lines))
+        else:
+            self._patch(skip, 3, len(self._lines))
+
+    def _compile_while(self, node):
+        enter = self._emit(JUMP, 0, 0, 0, node.lineno)
+        body = len(self._lines)
+        self._block(node.body)
+        self._patch(enter, 1, len(self._lines))
+        branch = self._branch(node.condition, BRANCH_IF)
+        self._patch(branch, 3, body)
+
+    def _branch(self, condition, branches):
+        """
+        Emit the comparison of condition as a branch with its target left
+        to be patched, and return the branch's number.
+        """
+        left, _ = self._expression(condition.left)
+        right, _ = self._expression(condition.right)
+        self._temps = 0
+        return self._emit(branches[condition.operator], left, right, 0, condition.lineno)
+
+    # --------------------------
+    # Expressions
+    # --------------------------
+    def _expression(self, root, dest=None):
+        """
+        Emit the instructions computing root and return (register holding
+        it, its KJPL type). The outermost operation writes straight into
+        dest when given. Temporaries are reused as soon as they are read;
+        the statement frees the ones still holding results when done.
+        """
+        self._dest = dest
+        self._root = root
+        return fold_expression(root, self._operand, self._operation)
+
+    def _operand(self, node):
+        if node.kind == ast_nodes.IdentifierNode.kind:
+            symbol = self._symbol(node)
+            return symbol.slot, symbol.type
+        node_type = literal_type(node)
+        value = node.value
+        if node_type == "string":
+            value = _c_string(value)
+        elif node_type == "int" and not INT_MIN <= value <= INT_MAX:
+            value = _wrap(value)
+        key = (node_type, value)
+        number = self._constants.get(key)
+        if number is None:
+            number = self._constants[key] = len(self._constants)
+        return -number - 1, node_type
+
+    def _operation(self, node, left, right):
+        (a, operand_type), (b, _) = left, right
+        # Operands still in temporaries are the last ones allocated
+        base = len(self.symbol_table.main.symbols)
+        self._temps -= (a >= base) + (b >= base)
+        if node is self._root and self._dest is not None:
+            target = self._dest
+        else:
+            target = base + self._temps
+            self._temps += 1
+            self._max_temps = max(self._max_temps, self._temps)
+        op = ARITHMETIC[node.operator]
+        if operand_type == "float":
+            op += FLOAT_OFFSET
+        self._emit(op, target, a, b, node.lineno)
+        return target, operand_type
+
+    def _variable(self, identifier):
+        return self._symbol(identifier).slot
+
+    def _symbol(self, identifier):
+        """
+        Return the Symbol an IdentifierNode refers to, resolving it by name
+        when semantic analysis did not (as CodeGenerator._symbol does).
+        """
+        symbol = identifier.symbol
+        if symbol is None:
+            symbol = self.symbol_table.resolve(identifier.name)
+            if symbol is None:
+                raise BytecodeError(f"Undefined variable '{identifier.name}'")
+            identifier.symbol = symbol
+        return symbol
+
+
+def compile_program(program, symbol_table):
+    return BytecodeCompiler().compile(program, symbol_table)
+
+
+# -------------------------------------
+# Interpreter
+# -------------------------------------
+def _wrap(value):
+    """
+    Wrap an int to the 32-bit two's complement range, as C int arithmetic
+    does in practice on overflow.
+    """
+    return (value - INT_MIN) % (1 << 32) + INT_MIN
+
+
+def _float_divide(a, b):
+    try:
+        return a / b
+    except ZeroDivisionError:
+        # IEEE 754, as in C: +-inf, or nan for 0.0 / 0.0
+        if a == 0 or a != a:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def run(code, out=None, buffer_lines=4096):
+    """
+    Run a Code object. With out (a text stream), the output is written to
+    it as the program runs, in blocks of buffer_lines lines, and None is
+    returned; otherwise the output is returned as a string.
+
+    Raises VMError on integer division by zero, after delivering the
+    output printed before it.
+    """
+    # One tuple per instruction: unpacking it is cheaper than indexing the array
+    instructions = code.instructions.tolist()
+    instructions = list(zip(*[iter(instructions)] * 4))
+    registers = list(code.registers)
+    output = []
+    try:
+        _execute(instructions, registers, output, out, buffer_lines, code.lines)
+    except VMError:
+        if out is not None:
+            _flush(out, output)
+        raise
+    if out is None:
+        return "".join(line + "\n" for line in output)
+    _flush(out, output)
+    return None
+
+
+def _flush(out, output):
+    if output:
+        out.write("\n".join(output) + "\n")
+        output.clear()
+
+
+def _execute(code, r, output, out, buffer_lines, lines):
+    """
+    The interpreter loop. Kept in one function with everything in locals,
+    and tested in order of how often each group of opcodes runs.
+    """
+    formatters = FORMATTERS
+    wrap = _wrap
+    low, high = INT_MIN, INT_MAX
+    pc = 0
+    while True:
+        op, a, b, c = code[pc]
+        if op <= DIV:
+            if op == ADD:
+                value = r[b] + r[c]
+                if not low <= value <= high:
+                    value = wrap(value)
+            elif op == SUB:
+                value = r[b] - r[c]
+                if not low <= value <= high:
+                    value = wrap(value)
+            elif op == MUL:
+                value = r[b] * r[c]
+                if not low <= value <= high:
+                    value = wrap(value)
+            elif op == MOVE:
+                value = r[b]
+            else:
+                x = r[b]
+                y = r[c]
+                if y == 0:
+                    raise VMError(f"Division by zero at line {lines[pc]}")
+                value = x // y
+                if value < 0 and value * y != x:
+                    value += 1  # C truncates toward zero
+                if value > high:
+                    value = wrap(value)
+            r[a] = value
+            pc += 1
+        elif op >= IF_EQ and op <= IF_GE:
+            x = r[a]
+            y = r[b]
+            if op == IF_LT:
+                taken = x < y
+            elif op == IF_GE:
+                taken = x >= y
+            elif op == IF_LE:
+                taken = x <= y
+            elif op == IF_GT:
+                taken = x > y
+            elif op == IF_NE:
+                taken = x != y
+            else:
+                taken = x == y
+            pc = c if taken else pc + 1
+        elif op == JUMP:
+            pc = a
+        elif op <= FDIV:
+            x = r[b]
+            y = r[c]
+            if op == FADD:
+                r[a] = x + y
+            elif op == FSUB:
+                r[a] = x - y
+            elif op == FMUL:
+                r[a] = x * y
+            else:
+                r[a] = _float_divide(x, y)
+            pc += 1
+        elif op == PRINT:
+            output.append(formatters[b](r[a]))
+            if out is not None and len(output) >= buffer_lines:
+                _flush(out, output)
+            pc += 1
+        else:
+            return
+
+
+def execute(program, symbol_table, out=None):
+    """
+    Lower and run a checked ProgramNode; see run().
+    """
+    return run(compile_program(program, symbol_table), out)
+
+
+if __name__ == "__main__":
+    from compiler import KJPLCompiler
+
+    source = sys.stdin.read() if len(sys.argv) < 2 else open(sys.argv[1], encoding="utf-8").read()
+    run(KJPLCompiler(parser_backend="rd", lexer_backend="fast").compile_bytecode(source), sys.stdout)